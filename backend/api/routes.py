@@ -1,19 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, Body, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Body
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from typing import List, Optional
+from typing import List
 import logging
 import asyncio
-from fastapi.concurrency import run_in_threadpool
+import json
 
 from backend.core.database import get_db, Course, SessionLocal
 from backend.core.auth import authenticate_user, create_access_token, get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES, create_user
 from backend.core.database import User as UserModel, Major
 from backend.models.schemas import Token, UserCreate, CourseResponse, ChatMessage, User as UserSchema, MajorResponse
 from backend.services.courses import get_or_create_course, add_course_to_user, remove_course_from_user, get_user_courses, parse_course_from_string
-from backend.services.query_engine import get_advice, classify_intent, generate_acknowledgment, process_general_query
+from backend.services.query_engine import aget_advice, astream_advice, acourse_lookup_response, detect_course_lookup, aclassify_query, generate_acknowledgment, aprocess_general_query, embeddings, recommendation_precomputer, pipeline_flight, retrieval_flight
 from backend.services.majors import get_available_majors, add_major_to_user, remove_major_from_user, get_user_majors
+from backend.services.intent import get_intent_stats
+from backend.services.response_cache import invalidate_user_responses, response_cache
+from backend.services.profile_events import notify_profile_changed
+from backend.services.jobs import QueueFullError
+from backend.services.advising_jobs import advising_jobs, job_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -22,9 +28,6 @@ logger = logging.getLogger(__name__)
 # Create API router
 router = APIRouter()
 
-# In-memory response cache
-_processing_responses = {}
-
 # Authentication endpoints
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -105,6 +108,8 @@ async def add_course_json(
         
         if not result:
             raise HTTPException(status_code=400, detail="Failed to add course to user")
+        
+        invalidate_user_responses(current_user.id)
             
         # Format response for frontend
         return {
@@ -130,6 +135,8 @@ async def remove_course(
         if not course:
             raise HTTPException(status_code=404, detail="Course not found or not associated with user")
         
+        invalidate_user_responses(current_user.id)
+        
         return {"status": "success", "message": f"Course {course.course_code} removed successfully"}
     except HTTPException:
         raise
@@ -164,6 +171,8 @@ async def update_course(
             
         db.commit()
         db.refresh(course)
+        invalidate_user_responses(current_user.id)
+        notify_profile_changed(current_user.id)
         
         return {
             "id": course.id,
@@ -201,8 +210,8 @@ async def recommend_me(
         if not courses:
             return {"recommendations": "You haven't added any courses yet. Please add your completed courses to get recommendations."}
         
-        # Get recommendations using the new function signature
-        recommendations = get_advice(db, current_user.id)
+        # Get recommendations without blocking the event loop
+        recommendations = await aget_advice(db, current_user.id)
         
         return {"recommendations": recommendations}
     except Exception as e:
@@ -211,7 +220,6 @@ async def recommend_me(
 @router.post("/advising")
 async def advising_chat(
     message: ChatMessage,
-    background_tasks: BackgroundTasks,
     current_user: UserModel = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -221,64 +229,107 @@ async def advising_chat(
         if not message_text:
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
-        # Classify the intent of the query using LLM only
-        intent = classify_intent(message_text)
-        logger.info(f"Intent classification result: {intent}")
+        # Direct questions about one course are answered from the catalog right away
+        lookup_response = await acourse_lookup_response(message_text)
+        if lookup_response:
+            return {"response": lookup_response}
+        
+        # Classify intent and category together (locally when confident, one LLM call otherwise)
+        intent, category = await aclassify_query(message_text)
+        logger.info(f"Intent classification result: {intent} ({category})")
         
         if intent == "COURSE":
-            # For course-related queries, send acknowledgment first
-            acknowledgment = generate_acknowledgment(message_text)
+            # Queue the query; any worker process can run it and answer the lookup
+            try:
+                job_id = await advising_jobs.submit(current_user.id, {"query": message_text, "intent": intent})
+            except QueueFullError as e:
+                logger.warning(f"Advising job rejected: {e}")
+                return {"response": "I'm still working on your earlier questions. Please wait for those answers before asking another one."}
             
-            # Process query in background
-            background_tasks.add_task(
-                process_advising_query_background,
-                db, current_user.id, message_text
-            )
+            # For course-related queries, send acknowledgment first
+            acknowledgment = generate_acknowledgment(message_text, category)
             
-            # Return acknowledgment with processing flag
-            return {"response": acknowledgment, "processing": True}
+            # Return acknowledgment with processing flag and the job to poll
+            return {"response": acknowledgment, "processing": True, "job_id": job_id}
         else:
             # For general conversation, process immediately
-            response = process_general_query(message_text)
+            response = await aprocess_general_query(message_text)
             return {"response": response}
             
     except Exception as e:
         logger.error(f"Error in advising_chat: {e}")
         return {"response": "I'm sorry, I encountered an error. Please try again later or try rephrasing your question."}
 
-async def process_advising_query_background(db: Session, user_id: int, query: str):
-    """Process an advising query in the background and store the result"""
-    try:
-        # Create a new session since we're in a background task
-        db_session = SessionLocal()
-        
-        # Run the CPU-intensive process in a thread pool
-        result = await run_in_threadpool(
-            lambda: get_advice(db_session, user_id, query)
-        )
-        
-        # Store the result in the cache
-        _processing_responses[user_id] = result
-        
-    except Exception as e:
-        logger.error(f"Background processing error: {e}")
-        _processing_responses[user_id] = "I encountered an error while processing your request. Please try again."
-    finally:
-        db_session.close()
-
-@router.get("/advising/pending")
+@router.get("/advising/pending/{job_id}")
 async def check_pending_response(
+    job_id: str,
     current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Check if there's a pending response for the user"""
-    response = _processing_responses.get(current_user.id)
+    """Check whether the advising job has finished, returning its response if so"""
+    job = await advising_jobs.get(job_id)
+    if job is not None and job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+def _sse_event(event: str, data) -> str:
+    # One Server-Sent Events frame; JSON keeps newlines in tokens from splitting it
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/advising/stream")
+async def advising_stream(
+    message: ChatMessage,
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """
+    Answer an advising query over Server-Sent Events instead of a job to poll.
+    Events, in order: "ack" with the acknowledgment, "status" as the pipeline
+    moves between stages, one "course" per ranked course card, "token" for each
+    piece of the message, then "done" with the full response (or "error").
+    """
+    message_text = message.message
+    if not message_text:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
     
-    if response:
-        # Remove from cache after retrieving
-        del _processing_responses[current_user.id]
-        return {"response": response, "pending": False}
+    # Lookups are answered from the catalog at once, with no classification or acknowledgment
+    intent, category = None, None
+    if not await asyncio.to_thread(detect_course_lookup, message_text):
+        intent, category = await aclassify_query(message_text)
+        logger.info(f"Intent classification result: {intent} ({category})")
+    user_id = current_user.id
     
-    return {"pending": True}
+    async def events():
+        if intent == "COURSE":
+            yield _sse_event("ack", generate_acknowledgment(message_text, category))
+        # The request's session closes before streaming starts, so the stream opens its own
+        db = SessionLocal()
+        try:
+            async for event, data in astream_advice(db, user_id, message_text, intent=intent):
+                yield _sse_event(event, data)
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/advising/intent-stats")
+async def get_advising_intent_stats(current_user: UserModel = Depends(get_current_active_user)):
+    """Report how many intent classifications were served without an LLM call"""
+    return get_intent_stats()
+
+@router.get("/advising/cache-stats")
+async def get_advising_cache_stats(current_user: UserModel = Depends(get_current_active_user)):
+    """Report hit rates and sizes of the response, embedding and precomputed recommendation caches, and how often identical requests were coalesced"""
+    return {
+        "responses": response_cache.stats(),
+        "embeddings": embeddings.stats(),
+        "precomputed": recommendation_precomputer.stats(),
+        "jobs": await advising_jobs.stats(),
+        "coalesced": {"pipeline": pipeline_flight.stats(), "retrieval": retrieval_flight.stats()}
+    }
 
 # Major endpoints
 @router.get("/majors/available", response_model=List[str])
@@ -330,6 +381,8 @@ async def add_major(
         if not major:
             raise HTTPException(status_code=404, detail="User not found")
         
+        invalidate_user_responses(current_user.id)
+        
         return major
     except HTTPException:
         raise
@@ -351,6 +404,8 @@ async def remove_major(
         if not major:
             raise HTTPException(status_code=404, detail="Major not found or not associated with user")
         
+        invalidate_user_responses(current_user.id)
+        
         return {"status": "success", "message": f"Major {major.name} removed successfully"}
     except HTTPException:
         raise
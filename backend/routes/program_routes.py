@@ -6,6 +6,7 @@ from backend.core.database import get_db
 from backend.core.auth import get_current_user
 from backend.models.schemas import UserProgramCreate, UserProgramResponse, UserResponse
 from backend.services import programs
+from backend.services.response_cache import invalidate_user_responses
 
 router = APIRouter(
     prefix="/programs",
@@ -35,6 +36,7 @@ def assign_program_template(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Program template {program_id} not found",
         )
+    invalidate_user_responses(current_user.id)
     return result
 
 @router.post("/", response_model=UserProgramResponse)
@@ -52,6 +54,7 @@ def create_program(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Could not create program",
         )
+    invalidate_user_responses(current_user.id)
     return result
 
 @router.get("/", response_model=List[UserProgramResponse])
@@ -64,6 +67,23 @@ def get_programs(
     """
     return programs.get_user_programs(db, current_user.id)
 
+@router.get("/audit", response_model=dict)
+def get_degree_audit(
+    current_user: UserResponse = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the user's degree audit: satisfied, partially satisfied and remaining
+    requirements for each of their programs.
+    """
+    audit = programs.get_remaining_courses(db, current_user.id)
+    if audit is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User progress data not found",
+        )
+    return audit
+
 @router.get("/{program_name}", response_model=UserProgramResponse)
 def get_program(
     program_name: str,
@@ -96,6 +116,7 @@ def delete_program(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Program {program_name} not found",
         )
+    invalidate_user_responses(current_user.id)
     return {"detail": "Program deleted successfully"}
 
 @router.put("/{program_name}", response_model=UserProgramResponse)
@@ -117,6 +138,7 @@ def update_program(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Program {program_name} not found",
         )
+    invalidate_user_responses(current_user.id)
     return result
 
 @router.get("/progress", response_model=dict)
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 from backend.core.database import get_db
 from backend.core.auth import get_current_user
 from backend.models.schemas import UserResponse
-from backend.services.query_engine import get_advice
+from backend.services.query_engine import aget_advice
 
 router = APIRouter(
     prefix="/recommendations",
@@ -14,7 +14,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=dict)
-def get_course_recommendations(
+async def get_course_recommendations(
     query: Optional[str] = Query(None, description="The user's query for course recommendations"),
     current_user: UserResponse = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -26,7 +26,7 @@ def get_course_recommendations(
     """
     try:
         # Use the RAG system to get recommendations
-        recommendation = get_advice(db, current_user.id, query)
+        recommendation = await aget_advice(db, current_user.id, query)
         return {"recommendation": recommendation}
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,81 @@
+"""
+Advising Jobs for Academic Advisor
+Course queries take several LLM round trips, so the chat endpoint answers with
+an acknowledgment and queues the query here. The result is looked up by job ID
+from any worker process.
+
+Functions:
+- run_advising_job: Job handler running the advising pipeline for one query
+- job_response: Shapes a job's state into the /advising/pending response
+"""
+
+import os
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.core.database import SessionLocal
+from backend.services.jobs import Job, JobQueue, SQLiteJobStore, JOB_STATUS_DONE
+from backend.services.query_engine import aget_advice
+
+logger = logging.getLogger(__name__)
+
+ADVISING_JOB_DB_PATH = os.getenv(
+    "ADVISING_JOB_DB_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "cache" / "jobs.sqlite3"),
+)
+# Concurrent pipelines per worker process; each mostly waits on OpenAI
+ADVISING_JOB_WORKERS = int(os.getenv("ADVISING_JOB_WORKERS", "4"))
+# Questions a user can have in flight at once
+ADVISING_JOBS_PER_USER = int(os.getenv("ADVISING_JOBS_PER_USER", "2"))
+ADVISING_JOB_QUEUE_LIMIT = int(os.getenv("ADVISING_JOB_QUEUE_LIMIT", "500"))
+
+# Shown when the pipeline fails, as the old background task did
+JOB_ERROR_MESSAGE = "I encountered an error while processing your request. Please try again."
+
+
+async def run_advising_job(job: Job) -> Any:
+    """
+    Runs the advising pipeline for a queued query.
+
+    Args:
+        job: Job whose payload holds the query and its classified intent
+
+    Returns:
+        The advice response (a dict for course recommendations, a string otherwise)
+    """
+    db = SessionLocal()
+    try:
+        return await aget_advice(db, job.user_id, job.payload["query"], intent=job.payload.get("intent"))
+    finally:
+        db.close()
+
+
+def job_response(job: Optional[Job]) -> Dict[str, Any]:
+    """
+    Shapes a job's state into the /advising/pending response.
+
+    Args:
+        job: The job, or None if it doesn't exist or its result expired
+
+    Returns:
+        {"pending": True, "status": ...} while the job runs, otherwise
+        {"pending": False, "response": ...}
+    """
+    if job is None:
+        return {"pending": False, "status": "expired", "response": JOB_ERROR_MESSAGE}
+    if not job.finished:
+        return {"pending": True, "status": job.status}
+    if job.status == JOB_STATUS_DONE and job.result:
+        return {"pending": False, "status": job.status, "response": job.result}
+    return {"pending": False, "status": job.status, "response": JOB_ERROR_MESSAGE}
+
+
+advising_jobs = JobQueue(
+    SQLiteJobStore(ADVISING_JOB_DB_PATH),
+    run_advising_job,
+    kind="advising",
+    concurrency=ADVISING_JOB_WORKERS,
+    per_user_limit=ADVISING_JOBS_PER_USER,
+    queue_limit=ADVISING_JOB_QUEUE_LIMIT,
+)
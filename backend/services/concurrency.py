@@ -0,0 +1,262 @@
+"""
+Shared Concurrency for Academic Advisor
+One process-wide layer for work that runs off the caller's thread and for the
+HTTP connections to OpenAI. Each backend gets a lane with its own limit on a
+single bounded thread pool, so a burst of vector searches can't starve the
+reasoning calls and no request creates threads of its own. All OpenAI clients
+share keep-alive connection pools (HTTP/2 when the h2 package is installed), so
+concurrent calls reuse connections instead of each paying for a TLS handshake.
+The async pool is opened on the event loop that first uses it, since its
+connections can't be shared across loops, and closed on application shutdown.
+
+The pool has one thread per lane slot, so a task admitted to its lane always
+has a thread. A task must not wait on tasks of its own lane, or a full lane
+can deadlock; waiting on other lanes is fine.
+
+Classes:
+- SharedExecutor: Bounded thread pool with a concurrency limit per lane
+
+Functions:
+- openai_http_clients: Shared sync and async HTTP clients for the OpenAI SDK
+- aclose_openai_http_clients: Closes the async client's connections on shutdown
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+import importlib.util
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from backend.services.metrics import Gauge, Histogram, LATENCY_BUCKETS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Concurrent tasks per lane: sync reasoning calls, vector searches and background precomputation
+EXECUTOR_LIMITS = {
+    "openai": int(os.getenv("OPENAI_CONCURRENCY", "8")),
+    "vector": int(os.getenv("VECTOR_SEARCH_CONCURRENCY", "8")),
+    "precompute": int(os.getenv("PRECOMPUTE_WORKERS", "2")),
+}
+
+# Connection pool shared by the OpenAI clients
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# Seconds an idle connection is kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 multiplexes concurrent calls over one connection; needs the h2 package
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+EXECUTOR_QUEUE_WAIT = Histogram(
+    "advisor_executor_queue_wait_seconds", "Time tasks waited for a slot in their lane", LATENCY_BUCKETS
+)
+
+_Task = Tuple[Future, Callable[[], Any], float]
+
+
+class SharedExecutor:
+    """
+    Thread pool shared by the whole process, with a concurrency limit per lane.
+    Tasks over their lane's limit wait in the lane's queue; the thread that
+    finishes a lane's task runs the next one queued for it.
+    """
+
+    def __init__(self, limits: Dict[str, int], name: str = "advisor"):
+        """
+        Args:
+            limits: Maximum concurrent tasks per lane
+            name: Thread name prefix
+        """
+        self.limits = {lane: max(limit, 1) for lane, limit in limits.items()}
+        self._pool = ThreadPoolExecutor(max_workers=sum(self.limits.values()), thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._active = {lane: 0 for lane in self.limits}
+        self._queued: Dict[str, Deque[_Task]] = {lane: deque() for lane in self.limits}
+
+    def submit(self, lane: str, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Runs fn(*args) in the lane, in a copy of the caller's context so metrics
+        stages and request traces carry over.
+
+        Args:
+            lane: Lane to run in, one of the configured limits
+            fn: The work to run
+            *args: Arguments for fn
+
+        Returns:
+            Future for fn's result
+        """
+        if lane not in self.limits:
+            raise ValueError(f"Unknown executor lane '{lane}'")
+        future = Future()
+        # Copied now, on the submitting thread
+        context = contextvars.copy_context()
+        task = (future, lambda: context.run(fn, *args), time.perf_counter())
+        with self._lock:
+            if self._active[lane] >= self.limits[lane]:
+                self._queued[lane].append(task)
+                return future
+            self._active[lane] += 1
+        self._pool.submit(self._work, lane, task)
+        return future
+
+    def _work(self, lane: str, task: Optional[_Task]):
+        while task is not None:
+            future, call, queued_at = task
+            EXECUTOR_QUEUE_WAIT.observe(time.perf_counter() - queued_at, lane=lane)
+            # Skips tasks whose caller cancelled them while they were queued
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = call()
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                task = self._queued[lane].popleft() if self._queued[lane] else None
+                if task is None:
+                    self._active[lane] -= 1
+
+    def map(self, lane: str, fn: Callable[..., Any], *iterables: Iterable[Any]) -> List[Any]:
+        """Runs fn over the zipped iterables concurrently in the lane; results in input order."""
+        futures = [self.submit(lane, fn, *args) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    async def arun(self, lane: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Awaits fn(*args) run in the lane, without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(lane, fn, *args))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Reports each lane's load.
+
+        Returns:
+            Dict of lane to its limit, active and queued task counts, and utilization
+        """
+        with self._lock:
+            return {
+                lane: {
+                    "limit": limit,
+                    "active": self._active[lane],
+                    "queued": len(self._queued[lane]),
+                    "utilization": self._active[lane] / limit,
+                }
+                for lane, limit in self.limits.items()
+            }
+
+
+shared_executor = SharedExecutor(EXECUTOR_LIMITS)
+
+_http_clients: Optional[Tuple[httpx.Client, httpx.AsyncClient]] = None
+_http_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+class _LoopTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport that opens its connection pool on the running event loop at
+    the first request. The OpenAI clients are built at import, before the
+    application's loop exists, and connections opened on one loop can't be used
+    from another, so a request from a different loop gets a pool of its own.
+    """
+
+    def __init__(self, **options: Any):
+        self._options = options
+        self.current: Optional[httpx.AsyncHTTPTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        if self.current is None or self._loop is not loop:
+            # A previous loop's connections can't be closed from here; they go with that loop
+            self.current, self._loop = httpx.AsyncHTTPTransport(**self._options), loop
+        return await self.current.handle_async_request(request)
+
+    async def aclose(self):
+        transport, loop = self.current, self._loop
+        self.current, self._loop = None, None
+        if transport is not None and loop is asyncio.get_running_loop():
+            await transport.aclose()
+
+
+def openai_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    The HTTP clients every OpenAI client in the process uses, created on first
+    call. The async client's connection pool is opened lazily on the event loop
+    that first sends a request, normally the application's.
+
+    Returns:
+        Tuple of (sync client, async client), with the OpenAI SDK's timeouts
+    """
+    global _http_clients
+    if _http_clients is None:
+        with _http_lock:
+            if _http_clients is None:
+                # Imported here so the OpenAI SDK's defaults apply without importing it at module load
+                from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+                limits = httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                )
+                http2 = _http2_available()
+                _http_clients = (
+                    DefaultHttpxClient(limits=limits, http2=http2),
+                    # With a custom transport, the pool settings go to the transport
+                    DefaultAsyncHttpxClient(transport=_LoopTransport(limits=limits, http2=http2)),
+                )
+                logger.info(f"Created shared OpenAI HTTP pools (http2={http2}, max_connections={HTTP_MAX_CONNECTIONS})")
+    return _http_clients
+
+
+async def aclose_openai_http_clients():
+    """Closes the async client's open connections; call on application shutdown."""
+    if _http_clients is not None:
+        # Only the pool is closed, so the OpenAI clients built at import stay usable
+        await _http_clients[1]._transport.aclose()
+
+
+def _connection_pool(client: Any) -> Any:
+    # httpx keeps its connection pool on the transport; neither attribute is public API
+    transport = getattr(client, "_transport", None)
+    transport = getattr(transport, "current", transport)
+    return getattr(transport, "_pool", None)
+
+
+def _collect_executor(field: str):
+    def collect():
+        return [({"lane": lane}, values[field]) for lane, values in shared_executor.stats().items()]
+    return collect
+
+
+def _collect_http_pools():
+    if _http_clients is None:
+        return []
+    samples = []
+    for kind, client in zip(("sync", "async"), _http_clients):
+        pool = _connection_pool(client)
+        if pool is None:
+            continue
+        connections = list(pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        samples.append(({"client": "openai", "kind": kind, "state": "active"}, len(connections) - idle))
+        samples.append(({"client": "openai", "kind": kind, "state": "idle"}, idle))
+    return samples
+
+
+REGISTRY.extend([
+    EXECUTOR_QUEUE_WAIT,
+    Gauge("advisor_executor_active_tasks", "Tasks running per executor lane", _collect_executor("active")),
+    Gauge("advisor_executor_queued_tasks", "Tasks waiting for a slot per executor lane", _collect_executor("queued")),
+    Gauge("advisor_executor_utilization", "Share of each lane's slots in use", _collect_executor("utilization")),
+    Gauge("advisor_http_pool_connections", "Open connections in the shared HTTP pools", _collect_http_pools),
+])
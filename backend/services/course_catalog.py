@@ -0,0 +1,128 @@
+"""
+Course Catalog for Academic Advisor
+Loads the courses scraped into data/business_catalog and provides the course
+code helpers shared by the retrieval and planning services.
+
+Functions:
+- normalize_course_code: Canonical "SUBJ 123" form of a course code
+- extract_course_codes: Finds course codes mentioned in free text
+- load_catalog_courses: Unique catalog courses in the vector metadata format
+- get_catalog_courses: Cached load_catalog_courses for the default catalog
+- course_data_from_metadata: Course metadata in the structure the frontend renders
+"""
+
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List
+
+from backend.services.intent import COURSE_CODE_PATTERN, NON_SUBJECT_WORDS
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "business_catalog"
+
+CODE_PARTS_PATTERN = re.compile(r"^([A-Za-z]{2,4})\s*(\d{3}[A-Za-z]?)$")
+
+
+def normalize_course_code(code: str) -> str:
+    """Uppercases a course code and puts exactly one space between subject and number."""
+    code = (code or "").strip()
+    match = CODE_PARTS_PATTERN.match(code)
+    if not match:
+        return code.upper()
+    return f"{match.group(1).upper()} {match.group(2).upper()}"
+
+
+def extract_course_codes(text: str) -> List[str]:
+    """
+    Finds the course codes mentioned in a piece of text.
+
+    Args:
+        text: Query or catalog text
+
+    Returns:
+        Normalized course codes in order of first appearance
+    """
+    codes = []
+    for match in COURSE_CODE_PATTERN.finditer(text or ""):
+        if match.group(1).lower() in NON_SUBJECT_WORDS:
+            continue
+        code = normalize_course_code(match.group(0))
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def load_catalog_courses(catalog_dir: Path = CATALOG_DIR) -> List[Dict[str, Any]]:
+    """
+    Collects unique courses from the scraped business catalog files.
+
+    Args:
+        catalog_dir: Directory searched recursively for program JSON files
+
+    Returns:
+        One dict per course, using the same field names as the vector metadata
+    """
+    courses = {}
+    for file_path in sorted(Path(catalog_dir).rglob("*.json")):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                program = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading catalog file {file_path}: {e}")
+            continue
+        for course in program.get("courses", []):
+            code = normalize_course_code(course.get("code", ""))
+            if code and code not in courses:
+                courses[code] = {
+                    "class_code": code,
+                    "course_name": course.get("title", ""),
+                    "credits": course.get("credits", ""),
+                    "description": course.get("description", ""),
+                    "prerequisites": course.get("requisites", ""),
+                    "equivalent_to": course.get("equivalent_to", ""),
+                    "additional_info": course.get("additional_info", ""),
+                    "course_url": course.get("course_url") or "",
+                }
+    return list(courses.values())
+
+
+@lru_cache(maxsize=1)
+def get_catalog_courses() -> List[Dict[str, Any]]:
+    """Catalog courses from CATALOG_DIR, read from disk once per process."""
+    courses = load_catalog_courses()
+    logger.info(f"Loaded {len(courses)} catalog courses")
+    return courses
+
+
+def course_data_from_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shapes course metadata into the structure the frontend renders.
+
+    Args:
+        metadata: Vector metadata or catalog record for one course
+
+    Returns:
+        Dict with course_code, course_name, credits, schedule, location and availability
+    """
+    return {
+        "course_code": metadata.get('class_code', 'Unknown'),
+        "course_name": metadata.get('course_name', 'Unknown'),
+        "credits": metadata.get('credits', ''),
+        "description": metadata.get('description', ''),
+        "prerequisites": metadata.get('prerequisites', ''),
+        "instructor": metadata.get('instructor', ''),
+        "schedule": {
+            "days": metadata.get('days', ''),
+            "time": metadata.get('time', '')
+        },
+        "location": metadata.get('classroom', ''),
+        "availability": {
+            "available_seats": metadata.get('available_seats', ''),
+            "total_seats": metadata.get('total_seats', '')
+        },
+        "crn": ""  # Keep empty as we're not using CRN
+    }
@@ -0,0 +1,228 @@
+"""
+Course Lookups for Academic Advisor
+Recognizes direct questions about one course, such as "who teaches CS 315?" or
+"when does MATH 252 meet?", and answers them from the catalog with templates.
+A question is only answered here when the indexed records hold what it asks
+about; anything else, and every planning question, goes to the pipeline.
+
+Classes:
+- CourseLookup: A recognized lookup: the course and the attributes asked about
+- CourseIndex: Catalog sections by course code
+
+Functions:
+- detect_lookup: Recognizes a direct lookup query
+- build_lookup_message: Templated answer to a lookup
+- build_lookup_prompt: Prompt for a cheap model to phrase the templated answer
+"""
+
+import os
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.services.course_catalog import extract_course_codes, normalize_course_code
+
+logger = logging.getLogger(__name__)
+
+# Longer questions are rarely simple lookups
+LOOKUP_MAX_WORDS = int(os.getenv("LOOKUP_MAX_WORDS", "16"))
+
+# A course code inside the lowercased query ("ba 101z", "cs212")
+_CODE = r"[a-z]{1,4}\s?\d{3}[a-z]?"
+
+# Attributes a lookup can ask about, in the order answers list them
+ATTRIBUTE_PATTERNS = {
+    # Only questions about the course itself: "what is BA 101Z (about)?", "describe CS 212",
+    # "what does FIN 316 cover?"; "what do I learn after BA 101Z?" is a planning question
+    "description": re.compile(
+        rf"\b(?:what\s+is|what's|whats|describe|tell\s+me\s+about|description\s+of|topics\s+(?:in|of))\s+{_CODE}\b"
+        rf"|\bwhat\s+does\s+{_CODE}\s+cover\b|\b{_CODE}\s+(?:description|topics)\b"
+    ),
+    "instructor": re.compile(r"\b(who|teach\w*|instructors?|professors?|prof)\b"),
+    "schedule": re.compile(r"\b(when|meet\w*|times?|days?|schedule\w*)\b"),
+    "location": re.compile(r"\b(where|rooms?|classroom|location|building)\b"),
+    # "open" and "available" only count when not followed by to/for ("open to sophomores?")
+    "seats": re.compile(r"\b(seats?|full|capacity|spots?|openings?|(?:open|availab\w*)\b(?!\s+(?:to|for)\b))"),
+    "prerequisites": re.compile(r"\b(pre-?req\w*|need\s+(?:to\s+(?:take|have)\s+)?before)\b"),
+    "credits": re.compile(r"\b(credits?|units?)\b"),
+}
+
+# Record fields that answer each attribute; a lookup needs at least one filled in
+ATTRIBUTE_FIELDS = {
+    "description": ("description",),
+    "instructor": ("instructor",),
+    "schedule": ("days", "time"),
+    "location": ("classroom",),
+    "seats": ("available_seats",),
+    "prerequisites": ("prerequisites",),
+    "credits": ("credits",),
+}
+
+# Words that make a question about a course a planning question
+PLANNING_PATTERN = re.compile(
+    r"\b(should|recommend\w*|suggest\w*|plan\w*|next|after|then|follow\w*|comes|"
+    r"worth|instead|easier|harder|better|fit|count\w*|graduat\w*|major|minor|schedule\s+for\s+me)\b"
+)
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+@dataclass
+class CourseLookup:
+    """A direct question about one course."""
+
+    code: str
+    attributes: List[str]
+
+
+class CourseIndex:
+    """Catalog records grouped by normalized course code; one record per section."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]], code_key: str = "class_code"):
+        self.sections: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            code = normalize_course_code(str(record.get(code_key) or ""))
+            if code:
+                self.sections.setdefault(code, []).append(record)
+        logger.info(f"Course index holds {len(self.sections)} courses")
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.sections
+
+    def get(self, code: str) -> List[Dict[str, Any]]:
+        return self.sections.get(code, [])
+
+
+def detect_lookup(query: str, index: CourseIndex) -> Optional[CourseLookup]:
+    """
+    Recognizes a direct lookup: a short question naming exactly one known course
+    and at least one attribute, with no planning language, whose answer is in
+    the index. The Pinecone corpus may hold schedules or instructors the catalog
+    lacks, so a question the index can't answer is left to the pipeline.
+
+    Args:
+        query: The student's query
+        index: Catalog index used to check the course exists
+
+    Returns:
+        The lookup, or None if the query needs the advising pipeline
+    """
+    if not query or len(WORD_PATTERN.findall(query)) > LOOKUP_MAX_WORDS:
+        return None
+    codes = extract_course_codes(query)
+    if len(codes) != 1 or codes[0] not in index:
+        return None
+
+    text = query.lower()
+    if PLANNING_PATTERN.search(text):
+        return None
+    attributes = [name for name, pattern in ATTRIBUTE_PATTERNS.items() if pattern.search(text)]
+    if not attributes:
+        return None
+    sections = index.get(codes[0])
+    missing = [name for name in attributes if not _has_attribute(sections, name)]
+    if missing:
+        logger.info(f"Index has no {', '.join(missing)} for {codes[0]}; leaving the lookup to the pipeline")
+        return None
+    return CourseLookup(code=codes[0], attributes=attributes)
+
+
+def _field(record: Dict[str, Any], key: str) -> str:
+    return str(record.get(key) or "").strip()
+
+
+def _has_attribute(sections: List[Dict[str, Any]], attribute: str) -> bool:
+    return any(_field(record, key) for record in sections for key in ATTRIBUTE_FIELDS[attribute])
+
+
+def _join(items: List[str]) -> str:
+    items = list(dict.fromkeys(item for item in items if item))
+    if len(items) <= 1:
+        return "".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def _section_label(record: Dict[str, Any]) -> str:
+    days, time = _field(record, "days"), _field(record, "time")
+    return " at ".join(part for part in (days, time) if part)
+
+
+def _describe(attribute: str, code: str, sections: List[Dict[str, Any]]) -> str:
+    first = sections[0]
+    several = len(sections) > 1
+
+    if attribute == "description":
+        name, description = _field(first, "course_name"), _field(first, "description")
+        title = f"{code} ({name})" if name else code
+        return f"{title}: {description}" if description else f"{title} has no catalog description yet."
+
+    if attribute == "instructor":
+        if several:
+            taught = [
+                f"{_field(record, 'instructor')} ({_section_label(record)})" if _section_label(record)
+                else _field(record, "instructor")
+                for record in sections if _field(record, "instructor")
+            ]
+        else:
+            taught = [_field(first, "instructor")]
+        taught = [item for item in taught if item]
+        return f"{code} is taught by {_join(taught)}." if taught else f"The catalog doesn't list an instructor for {code} yet."
+
+    if attribute == "schedule":
+        meetings = [_section_label(record) for record in sections]
+        meetings = [meeting for meeting in meetings if meeting]
+        return f"{code} meets {_join(meetings)}." if meetings else f"The catalog doesn't list meeting times for {code} yet."
+
+    if attribute == "location":
+        rooms = _join([_field(record, "classroom") for record in sections])
+        return f"{code} meets in {rooms}." if rooms else f"The catalog doesn't list a room for {code} yet."
+
+    if attribute == "seats":
+        parts = []
+        for record in sections:
+            available, total = _field(record, "available_seats"), _field(record, "total_seats")
+            if not available:
+                continue
+            label = f" in the {_section_label(record)} section" if several and _section_label(record) else ""
+            if available == "0":
+                parts.append(f"no open seats{label}")
+            else:
+                parts.append(f"{available} of {total} seats open{label}" if total else f"{available} seats open{label}")
+        return f"{code} has {_join(parts)}." if parts else f"The catalog doesn't list seat availability for {code}."
+
+    if attribute == "prerequisites":
+        prerequisites = _field(first, "prerequisites")
+        return f"{code} prerequisites: {prerequisites}" if prerequisites else f"{code} has no listed prerequisites."
+
+    if attribute == "credits":
+        credits = _field(first, "credits")
+        return f"{code} is worth {credits} credits." if credits else f"The catalog doesn't list credits for {code}."
+
+    return ""
+
+
+def build_lookup_message(lookup: CourseLookup, sections: List[Dict[str, Any]]) -> str:
+    """
+    Templated answer to a lookup.
+
+    Args:
+        lookup: The recognized lookup
+        sections: The course's catalog records, one per section
+
+    Returns:
+        One sentence per attribute asked about
+    """
+    return " ".join(_describe(attribute, lookup.code, sections) for attribute in lookup.attributes)
+
+
+def build_lookup_prompt(query: str, facts: str) -> str:
+    """Prompt for a cheap model to phrase the templated answer conversationally."""
+    return f"""
+The student asked: "{query}"
+
+Answer using only these catalog facts:
+{facts}
+
+Write one or two friendly sentences. Do not add information that isn't in the facts.
+"""
@@ -18,6 +18,7 @@ get_user_courses: Retrieves all courses for a specific user
 # IMPORTANT: Updated imports
 from backend.core.database import Course, User
 from backend.models.schemas import CourseBase, CourseCreate, CourseResponse
+from backend.services.profile_events import notify_profile_changed
 
 # Get course by code
 def get_course_by_code(db: Session, course_code: str):
@@ -63,6 +64,7 @@ def add_course_to_user(db: Session, user_id: int, course_id: int):
     
     user.courses.append(course)
     db.commit()
+    notify_profile_changed(user_id)
     return course
 
 # Remove course from user
@@ -78,6 +80,7 @@ def remove_course_from_user(db: Session, user_id: int, course_id: int):
     
     user.courses.remove(course)
     db.commit()
+    notify_profile_changed(user_id)
     return course
 
 # Get user courses
@@ -0,0 +1,299 @@
+"""
+Degree Audit Engine for Academic Advisor
+Compiles each program's required_courses (plain codes, {"course_code": ...}
+entries and {"requirement_name", "options", "courses_needed"} groups) into an
+indexed requirement list, then audits a completed-course set against it in a
+single pass over the student's courses.
+
+Compiled programs are cached by content, so auditing a student is a handful of
+dict lookups and a whole cohort can be audited in one batch.
+
+Classes:
+- CompiledProgram: Requirements of one program with a course -> requirement index
+
+Functions:
+- compile_program: Compiles (and caches) a program's required_courses
+- audit_programs: Audits one student's completed courses against their programs
+- audit_cohort: Audits many students in one batch
+- audit_users: Loads users from the database and audits them in one batch
+- remaining_course_codes: Course codes that would still count toward a requirement
+- render_audit_for_rag: Summarizes an audit as text for the reasoning prompts
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from backend.core.database import User
+from backend.services.course_catalog import normalize_course_code
+
+logger = logging.getLogger(__name__)
+
+# Compiled programs kept in memory, keyed by their serialized requirements
+COMPILED_PROGRAM_CACHE_SIZE = 1024
+
+
+class _Requirement:
+    __slots__ = ("name", "options", "needed")
+
+    def __init__(self, name: str, options: Tuple[str, ...], needed: int):
+        self.name = name
+        self.options = options
+        self.needed = needed
+
+
+class CompiledProgram:
+    """
+    A program's requirements in audit-ready form.
+
+    requirements is the ordered requirement list, and index maps each normalized
+    course code to the positions of the requirements it counts toward.
+    """
+
+    __slots__ = ("program_name", "program_type", "requirements", "index")
+
+    def __init__(self, program_name: str, program_type: str, requirements: List[_Requirement]):
+        self.program_name = program_name
+        self.program_type = program_type
+        self.requirements = requirements
+        self.index: Dict[str, List[int]] = {}
+        for position, requirement in enumerate(requirements):
+            for code in requirement.options:
+                positions = self.index.setdefault(code, [])
+                if position not in positions:
+                    positions.append(position)
+
+
+def _option_code(option: Any) -> Optional[str]:
+    if isinstance(option, str):
+        return normalize_course_code(option) or None
+    if isinstance(option, dict) and option.get("course_code"):
+        return normalize_course_code(option["course_code"])
+    return None
+
+
+def _compile_requirements(required_courses: Any) -> List[_Requirement]:
+    requirements = []
+    if not isinstance(required_courses, list):
+        return requirements
+
+    for entry in required_courses:
+        if isinstance(entry, dict) and "options" in entry:
+            options = tuple(dict.fromkeys(code for code in map(_option_code, entry["options"] or []) if code))
+            if not options:
+                continue
+            try:
+                needed = int(entry.get("courses_needed", 1))
+            except (TypeError, ValueError):
+                needed = 1
+            name = entry.get("requirement_name") or ", ".join(options)
+            requirements.append(_Requirement(name, options, max(1, min(needed, len(options)))))
+        else:
+            code = _option_code(entry)
+            if code:
+                requirements.append(_Requirement(code, (code,), 1))
+    return requirements
+
+
+_compiled_programs: Dict[str, CompiledProgram] = {}
+_compile_lock = threading.Lock()
+
+
+def compile_program(program_name: str, program_type: str, required_courses: Any) -> CompiledProgram:
+    """
+    Compiles a program's required_courses, reusing an earlier compilation of identical content.
+
+    Args:
+        program_name: Name of the program
+        program_type: 'major' or 'minor'
+        required_courses: The UserProgram.required_courses JSON
+
+    Returns:
+        CompiledProgram
+    """
+    key = repr((program_name, program_type, required_courses))
+    compiled = _compiled_programs.get(key)
+    if compiled is not None:
+        return compiled
+
+    compiled = CompiledProgram(program_name, program_type, _compile_requirements(required_courses))
+    with _compile_lock:
+        if len(_compiled_programs) >= COMPILED_PROGRAM_CACHE_SIZE:
+            _compiled_programs.clear()
+        _compiled_programs[key] = compiled
+    return compiled
+
+
+def _expand(completed_courses: Iterable[str], equivalents: Optional[Mapping[str, Set[str]]]) -> Set[str]:
+    completed = set()
+    for code in completed_courses:
+        code = normalize_course_code(code)
+        completed.add(code)
+        if equivalents:
+            completed.update(equivalents.get(code, ()))
+    return completed
+
+
+def _audit_program(compiled: CompiledProgram, completed: Set[str]) -> Dict[str, Any]:
+    # One pass over the student's courses; the index sends each one to its requirements
+    matched: Dict[int, List[str]] = {}
+    for code in completed:
+        for position in compiled.index.get(code, ()):
+            matched.setdefault(position, []).append(code)
+
+    satisfied, partial, remaining = [], [], []
+    for position, requirement in enumerate(compiled.requirements):
+        done = sorted(matched.get(position, ()))
+        status = {
+            "name": requirement.name,
+            "options": list(requirement.options),
+            "courses_needed": requirement.needed,
+            "completed": done[:requirement.needed],
+            "still_needed": max(0, requirement.needed - len(done)),
+        }
+        if len(done) >= requirement.needed:
+            satisfied.append(status)
+        elif done:
+            partial.append(status)
+        else:
+            remaining.append(status)
+
+    total = len(compiled.requirements)
+    return {
+        "program_name": compiled.program_name,
+        "program_type": compiled.program_type,
+        "satisfied": satisfied,
+        "partial": partial,
+        "remaining": remaining,
+        "total_requirements": total,
+        "percent_complete": round(100.0 * len(satisfied) / total, 1) if total else 100.0,
+    }
+
+
+def audit_programs(completed_courses: Iterable[str], programs: Mapping[str, Mapping[str, Any]],
+                   equivalents: Optional[Mapping[str, Set[str]]] = None) -> Dict[str, Any]:
+    """
+    Audits a student's completed courses against their programs.
+    A course counts toward every requirement that lists it, so a course shared by
+    a major and a minor is credited to both.
+
+    Args:
+        completed_courses: Completed course codes
+        programs: Program name -> {"program_type", "required_courses"}, as in UserAcademicContext.programs
+        equivalents: Optional code -> equivalent codes map, e.g. PrerequisiteGraph.equivalents
+
+    Returns:
+        Dict with one audit per program and the course codes that would still count
+    """
+    completed = _expand(completed_courses, equivalents)
+    results = [
+        _audit_program(compile_program(name, data.get("program_type", ""), data.get("required_courses")), completed)
+        for name, data in programs.items()
+    ]
+    return {"programs": results, "remaining_courses": remaining_course_codes(results, completed)}
+
+
+def remaining_course_codes(program_audits: List[Dict[str, Any]], completed: Optional[Set[str]] = None) -> List[str]:
+    """
+    Lists the not-yet-taken courses that would count toward an unmet requirement.
+
+    Args:
+        program_audits: The "programs" list of an audit
+        completed: Normalized completed codes to leave out
+
+    Returns:
+        Course codes in requirement order, without duplicates
+    """
+    completed = completed or set()
+    codes: Dict[str, None] = {}
+    for program in program_audits:
+        for status in program["partial"] + program["remaining"]:
+            for code in status["options"]:
+                if code not in completed:
+                    codes.setdefault(code, None)
+    return list(codes)
+
+
+def audit_cohort(students: Mapping[Any, Tuple[Iterable[str], Mapping[str, Mapping[str, Any]]]],
+                 equivalents: Optional[Mapping[str, Set[str]]] = None) -> Dict[Any, Dict[str, Any]]:
+    """
+    Audits many students in one batch. Students on the same programs share one compilation.
+
+    Args:
+        students: Student key -> (completed course codes, programs)
+        equivalents: Optional code -> equivalent codes map
+
+    Returns:
+        Student key -> audit, as returned by audit_programs
+    """
+    return {
+        key: audit_programs(completed_courses, programs, equivalents)
+        for key, (completed_courses, programs) in students.items()
+    }
+
+
+def audit_users(db: Session, user_ids: List[int],
+                equivalents: Optional[Mapping[str, Set[str]]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Loads users with their courses and programs in three queries, then audits them as a cohort.
+
+    Args:
+        db: Database session
+        user_ids: IDs of the users to audit
+        equivalents: Optional code -> equivalent codes map
+
+    Returns:
+        User ID -> audit; users that don't exist are left out
+    """
+    users = (
+        db.query(User)
+        .options(selectinload(User.courses), selectinload(User.programs))
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    students = {
+        user.id: (
+            [course.course_code for course in user.courses],
+            {
+                program.program_name: {
+                    "program_type": program.program_type,
+                    "required_courses": program.required_courses,
+                }
+                for program in user.programs
+            },
+        )
+        for user in users
+    }
+    return audit_cohort(students, equivalents)
+
+
+def render_audit_for_rag(audit: Dict[str, Any]) -> str:
+    """
+    Summarizes an audit as text so the reasoning model doesn't have to work it out.
+
+    Args:
+        audit: Output of audit_programs
+
+    Returns:
+        Formatted string listing progress and unmet requirements per program
+    """
+    if not audit["programs"]:
+        return ""
+
+    result = ["Degree audit (computed from their completed courses):"]
+    for program in audit["programs"]:
+        result.append(
+            f"- {program['program_name']} {program['program_type']}: "
+            f"{len(program['satisfied'])} of {program['total_requirements']} requirements met"
+        )
+        for status in program["partial"] + program["remaining"]:
+            if len(status["options"]) == 1:
+                result.append(f"  * Still needed: {status['options'][0]}")
+            else:
+                result.append(
+                    f"  * Still needed: {status['name']} - {status['still_needed']} more from "
+                    f"{', '.join(code for code in status['options'] if code not in status['completed'])}"
+                )
+    return "\n".join(result)
@@ -0,0 +1,278 @@
+"""
+Embedding Cache for Academic Advisor
+Wraps an embeddings client with a two-tier cache: an in-memory LRU in front of
+an on-disk SQLite store. The SQLite file runs in WAL mode so every worker
+process on the host shares one cache. Concurrent misses for the same texts
+share one call to the wrapped client.
+
+Classes:
+- CachedEmbeddings: Drop-in Embeddings implementation that only calls the
+  wrapped client for texts it has never seen
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from backend.services.metrics import current_stage, record_cache_hit
+from backend.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "cache" / "embeddings.sqlite3"),
+)
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096"))
+# Rows kept in the SQLite tier, oldest deleted first; about 6 KB each at 1536 dimensions, 0 for no limit
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "20000"))
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# The embeddings API reports no usage, so tokens are estimated at ~4 characters each
+CHARS_PER_TOKEN = 4
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and collapses whitespace so trivially different strings share a key."""
+    return WHITESPACE_PATTERN.sub(" ", (text or "").lower()).strip()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU and a persistent SQLite tier.
+
+    Keys are derived from the model name and the normalized text, so switching
+    models never serves stale vectors. Normalization only shapes the key: the
+    wrapped client embeds the text as given, and texts differing only in case or
+    whitespace share the vector of the first one seen.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+                 max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flight = SingleFlight("embedding")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = self._connection()
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT, dim INTEGER, vector BLOB, created_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS embeddings_created ON embeddings (created_at)")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache disabled disk tier at {self.path}: {e}")
+                self.path = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = vector
+            self._memory_bytes += len(vector) * 4
+            while len(self._memory) > self.memory_size:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted) * 4
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.path:
+            try:
+                placeholders = ",".join("?" for _ in missing)
+                rows = self._connection().execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for key, blob in rows:
+                    vector = _unpack(blob)
+                    found[key] = vector
+                    self._remember(key, vector)
+                with self._lock:
+                    self.disk_hits += len(rows)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading embedding cache: {e}")
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        for key, vector in items.items():
+            self._remember(key, vector)
+        if not self.path or not items:
+            return
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, self.model_name, len(vector), _pack(vector), now) for key, vector in items.items()],
+            )
+            evicted = self._evict_oldest(conn)
+            conn.commit()
+            if evicted:
+                logger.info(f"Evicted {evicted} old embeddings from the disk cache")
+        except sqlite3.Error as e:
+            logger.error(f"Error writing embedding cache: {e}")
+
+    def _evict_oldest(self, conn: sqlite3.Connection) -> int:
+        # Writes follow an embeddings API call, so a count per write costs little
+        if not self.max_rows:
+            return 0
+        excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+        if excess <= 0:
+            return 0
+        return conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY created_at LIMIT ?)",
+            (excess,),
+        ).rowcount
+
+    def _prepare(self, texts: List[str]):
+        keys = [self._key(normalize_text(text)) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        # Unique texts that still need embedding, in first-seen order, sent to the API as given
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        with self._lock:
+            self.misses += len(pending)
+        record_cache_hit("embedding", len(found))
+        stage = current_stage()
+        if stage is not None and pending:
+            estimated = sum(len(text) for text in pending.values()) // CHARS_PER_TOKEN + len(pending)
+            stage.add_tokens(estimated, model=self.model_name)
+        return keys, found, pending
+
+    # Fresh embeddings are fetched through the single flight, keyed on the
+    # pending cache keys, so identical concurrent misses make one API call
+
+    def _embed_pending(self, pending: Dict[str, str]) -> Dict[str, List[float]]:
+        vectors = self.embeddings.embed_documents(list(pending.values()))
+        fresh = dict(zip(pending.keys(), vectors))
+        self._store(fresh)
+        return fresh
+
+    def _embed_pending_query(self, key: str, text: str) -> List[float]:
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    async def _aembed_pending(self, pending: Dict[str, str]) -> Dict[str, List[float]]:
+        vectors = await self.embeddings.aembed_documents(list(pending.values()))
+        fresh = dict(zip(pending.keys(), vectors))
+        self._store(fresh)
+        return fresh
+
+    async def _aembed_pending_query(self, key: str, text: str) -> List[float]:
+        vector = await self.embeddings.aembed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._prepare(texts)
+        if pending:
+            found.update(self._flight.do(tuple(pending), self._embed_pending, pending))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, pending = self._prepare([text])
+        if pending:
+            return self._flight.do(("query", keys[0]), self._embed_pending_query, keys[0], pending[keys[0]])
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._prepare(texts)
+        if pending:
+            found.update(await self._flight.ado(tuple(pending), self._aembed_pending, pending))
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, pending = self._prepare([text])
+        if pending:
+            return await self._flight.ado(("query", keys[0]), self._aembed_pending_query, keys[0], pending[keys[0]])
+        return found[keys[0]]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Reports cache effectiveness and footprint.
+
+        Returns:
+            Dict with hit counts per tier, hit rate and bytes used in memory and on disk
+        """
+        disk_bytes = 0
+        if self.path:
+            for suffix in ("", "-wal"):
+                try:
+                    disk_bytes += os.path.getsize(self.path + suffix)
+                except OSError:
+                    pass
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": disk_bytes,
+                "coalesced": self._flight.stats(),
+            }
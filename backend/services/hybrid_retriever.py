@@ -0,0 +1,297 @@
+"""
+Hybrid Retriever for Academic Advisor
+Combines lexical and vector retrieval over the course corpus. A BM25 inverted
+index covers course code, title, description and prerequisites, and an exact
+hash index over normalized course codes answers queries that name a course
+without an embedding call. Rankings are merged with reciprocal-rank fusion.
+
+Classes:
+- BM25Index: Okapi BM25 over a list of texts
+- HybridRetriever: Exact code lookup, BM25 and vector results fused into one ranking
+
+Functions:
+- tokenize: Lexical tokens of a text, with course codes kept as single tokens
+- reciprocal_rank_fusion: Fuses several rankings of ids into one scored list
+- maximal_marginal_relevance: Reorders candidates to trade relevance for diversity
+"""
+
+import os
+import re
+import math
+import heapq
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.documents import Document
+
+from backend.services.course_catalog import extract_course_codes, normalize_course_code
+
+logger = logging.getLogger(__name__)
+
+# Constant k of reciprocal-rank fusion; 60 is the usual choice and damps the top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# How often each field's tokens are counted, a cheap form of field weighting
+FIELD_WEIGHTS = (
+    ("class_code", 3),
+    ("course_name", 2),
+    ("description", 1),
+    ("prerequisites", 1),
+)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "should", "that", "the",
+    "this", "to", "what", "which", "with", "who", "will", "can", "do", "take",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase terms for the BM25 index.
+    Course codes are also emitted as one joined token ("cs212") so a query for
+    "CS 212" matches "CS212" and prefers documents naming that exact course.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms, with repeats
+    """
+    tokens = [token for token in WORD_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+    tokens.extend(code.replace(" ", "").lower() for code in extract_course_codes(text))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """
+    Fuses rankings with reciprocal-rank fusion, score(d) = sum(w / (k + rank)).
+    Only ranks are used, so lists scored on different scales combine safely.
+
+    Args:
+        rankings: Ranked ids, best first, one list per retriever or query
+        k: RRF constant
+        weights: Optional weight per ranking, defaults to 1.0 each
+
+    Returns:
+        (id, fused score) pairs, best first. Ties keep the order in which ids were first seen.
+    """
+    scores: Dict[str, float] = {}
+    first_seen: Dict[str, int] = {}
+    for index, ranking in enumerate(rankings):
+        weight = weights[index] if weights else 1.0
+        for rank, item in enumerate(ranking, start=1):
+            if item not in first_seen:
+                first_seen[item] = len(first_seen)
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda pair: (-pair[1], first_seen[pair[0]]))
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def maximal_marginal_relevance(relevance: Sequence[float], token_sets: Sequence[Set[str]],
+                               k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Greedy MMR: each pick maximizes lambda * relevance - (1 - lambda) * max similarity
+    to the picks so far. Similarity is the Jaccard overlap of the candidates' terms,
+    which needs no document vectors and works for lexical and vector hits alike.
+
+    Args:
+        relevance: Relevance per candidate, any positive scale
+        token_sets: Terms per candidate
+        k: Number of candidates to pick
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by novelty
+
+    Returns:
+        Indexes of the picked candidates, in pick order
+    """
+    top = max(relevance, default=0.0) or 1.0
+    normalized = [score / top for score in relevance]
+    remaining = list(range(len(relevance)))
+    picked: List[int] = []
+    while remaining and len(picked) < k:
+        # Iterating in relevance order makes ties resolve deterministically
+        best, best_score = None, float("-inf")
+        for index in remaining:
+            redundancy = max((_jaccard(token_sets[index], token_sets[other]) for other in picked), default=0.0)
+            score = lambda_mult * normalized[index] - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = index, score
+        picked.append(best)
+        remaining.remove(best)
+    return picked
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index."""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+
+        total = len(self.doc_lengths)
+        self.average_length = (sum(self.doc_lengths) / total) if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Scores every document sharing a term with the query.
+
+        Args:
+            query: Search text
+            k: Number of results
+
+        Returns:
+            (document index, score) pairs, best first
+        """
+        if k <= 0 or not self.doc_lengths:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.average_length or 1.0)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * length_norm
+                )
+        return heapq.nlargest(k, scores.items(), key=lambda pair: (pair[1], -pair[0]))
+
+
+def _record_text(record: Dict[str, Any]) -> str:
+    parts = []
+    for field, weight in FIELD_WEIGHTS:
+        value = str(record.get(field) or "")
+        if value:
+            parts.extend([value] * weight)
+    return " ".join(parts)
+
+
+class HybridRetriever:
+    """
+    Lexical retrieval over course records, fused with vector search results.
+
+    Records use the vector metadata field names (class_code, course_name,
+    description, prerequisites, ...), so lexical hits become Documents that the
+    rest of the pipeline handles exactly like vector hits.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], text_key: str = "class_code",
+                 covers_vector_corpus: bool = False):
+        """
+        Args:
+            records: Course records to index
+            text_key: Field holding the course code
+            covers_vector_corpus: Whether records are the vector store's own corpus,
+                so an exact code hit returns the same records vector search would
+        """
+        self.records = records
+        self.text_key = text_key
+        self.covers_vector_corpus = covers_vector_corpus
+        # Several records can share a code (one per section), so map to every row
+        self.code_index: Dict[str, List[int]] = {}
+        for row, record in enumerate(records):
+            code = normalize_course_code(str(record.get(text_key) or ""))
+            if code:
+                self.code_index.setdefault(code, []).append(row)
+        self.bm25 = BM25Index([_record_text(record) for record in records])
+        logger.info(f"Hybrid retriever indexed {len(records)} records, {len(self.code_index)} course codes")
+
+    def _to_document(self, row: int) -> Document:
+        metadata = dict(self.records[row])
+        return Document(page_content=str(metadata.get(self.text_key, "")), metadata=metadata)
+
+    def _document_key(self, doc: Document) -> str:
+        # Vector stores move the text key into page_content, so fall back to it
+        code = doc.metadata.get(self.text_key) or doc.metadata.get("course_code") or doc.page_content.strip()
+        return normalize_course_code(str(code)[:50])
+
+    def lookup_codes(self, query: str) -> List[int]:
+        """Rows whose course code appears verbatim in the query, in the order mentioned."""
+        rows = []
+        for code in extract_course_codes(query):
+            rows.extend(self.code_index.get(code, ()))
+        return rows
+
+    def needs_vector_search(self, query: str) -> bool:
+        """
+        False when the query names a known course and the records are the vector
+        corpus, so the exact index answers on its own. Over a different corpus
+        (the scraped catalog standing in for Pinecone) vector hits are still fused.
+        """
+        return not self.covers_vector_corpus or not self.lookup_codes(query)
+
+    def search(self, query: str, k: int, vector_docs: Optional[List[Document]] = None) -> List[Document]:
+        """
+        Ranks courses for one query.
+        Exact code matches come first. The remaining slots are filled by fusing the
+        BM25 ranking with the vector ranking; when the query names a known course of
+        the vector corpus no vector results are expected and BM25 alone fills them
+        (it finds the courses whose prerequisites mention that code).
+
+        Args:
+            query: Search text
+            k: Number of documents to return
+            vector_docs: Vector search results for the query, best first
+
+        Returns:
+            Up to k documents, best first
+        """
+        results: List[Document] = []
+        seen = set()
+        for row in self.lookup_codes(query):
+            doc = self._to_document(row)
+            key = self._document_key(doc)
+            if key not in seen and len(results) < k:
+                seen.add(key)
+                results.append(doc)
+
+        lexical_docs = []
+        for row, score in self.bm25.search(query, k * 2):
+            doc = self._to_document(row)
+            doc.metadata["bm25_score"] = score
+            lexical_docs.append(doc)
+        candidates: Dict[str, Document] = {}
+        rankings = []
+        # Vector documents win ties on identity since they may carry section details
+        for docs in (vector_docs or [], lexical_docs):
+            ranking = []
+            for doc in docs:
+                key = self._document_key(doc)
+                candidates.setdefault(key, doc)
+                if key not in ranking:
+                    ranking.append(key)
+            rankings.append(ranking)
+
+        for key, _ in reciprocal_rank_fusion(rankings):
+            if len(results) >= k:
+                break
+            if key not in seen:
+                seen.add(key)
+                results.append(candidates[key])
+        return results
@@ -0,0 +1,258 @@
+"""
+Local Intent Classifier for Academic Advisor
+Decides COURSE vs GENERAL in-process for confident cases so the LLM classifier
+in query_engine is only consulted for ambiguous queries.
+
+Functions:
+- classify_intent_locally: Returns "COURSE", "GENERAL" or None when unsure
+- classify_category_locally: Returns the detailed COURSE category or None when unsure
+- record_llm_fallback: Records that a query had to go to the LLM classifier
+- get_intent_stats: Reports how many classifications were served locally
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Course codes such as "CS 212", "MATH252" or "BA 101Z"
+COURSE_CODE_PATTERN = re.compile(r"\b([A-Za-z]{2,4})\s?\d{3}[A-Za-z]?\b")
+
+# Ordinary words that can precede a number ("have 100", "only 300")
+NON_SUBJECT_WORDS = {
+    "a", "an", "at", "by", "for", "from", "have", "has", "had", "is", "in", "of",
+    "on", "to", "the", "and", "but", "or", "was", "are", "be", "got", "get",
+    "like", "only", "over", "than", "about", "with", "my", "me", "its", "it",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+
+# Words that indicate academic planning, weighted by how strongly they do so
+COURSE_LEXICON = {
+    "course": 2.0, "courses": 2.0, "class": 2.0, "classes": 2.0,
+    "prerequisite": 3.0, "prerequisites": 3.0, "prereq": 3.0, "prereqs": 3.0,
+    "major": 2.0, "minor": 2.0, "degree": 2.0, "graduate": 1.5, "graduation": 2.0,
+    "requirement": 2.0, "requirements": 2.0, "credits": 2.0, "credit": 1.5,
+    "term": 1.5, "semester": 1.5, "quarter": 1.0, "schedule": 1.5, "enroll": 2.0,
+    "register": 1.5, "registration": 2.0, "elective": 2.0, "electives": 2.0,
+    "take": 1.0, "taking": 1.0, "took": 1.0, "taken": 1.0, "instructor": 1.5,
+    "professor": 1.5, "seats": 1.5, "section": 1.0, "syllabus": 2.0,
+    "gpa": 1.5, "transcript": 2.0, "program": 1.0, "upper": 0.5, "division": 1.0,
+}
+
+# Words typical of purely conversational messages
+GENERAL_LEXICON = {
+    "hi": 1.0, "hello": 1.0, "hey": 1.0, "thanks": 1.5, "thank": 1.5,
+    "bye": 1.5, "goodbye": 1.5, "morning": 0.5, "evening": 0.5, "afternoon": 0.5,
+    "ok": 0.5, "okay": 0.5, "cool": 0.5, "great": 0.5, "awesome": 0.5,
+    "who": 0.5, "you": 0.5, "joke": 1.0, "weather": 1.0, "lol": 1.0,
+}
+
+# Detailed categories of COURSE queries, used to pick the acknowledgment
+QUERY_CATEGORIES = [
+    "COURSE_RECOMMENDATION",
+    "PREREQUISITE_CHECK",
+    "SCHEDULE_PLANNING",
+    "DEGREE_PROGRESS",
+    "COURSE_DETAILS",
+    "MAJOR_REQUIREMENTS",
+]
+
+DEFAULT_CATEGORY = "COURSE_RECOMMENDATION"
+
+# Phrases that point to each detailed category
+CATEGORY_LEXICON = {
+    "PREREQUISITE_CHECK": [
+        "prereq", "prerequisite", "requisite", "before taking", "eligible", "qualify",
+        "allowed to take", "can i take",
+    ],
+    "SCHEDULE_PLANNING": [
+        "schedule", "when does", "what time", "meet", "conflict", "morning", "afternoon",
+        "evening", "days", "timeslot", "time slot",
+    ],
+    "DEGREE_PROGRESS": [
+        "graduate", "graduation", "on track", "progress", "degree", "how many credits",
+        "credits left", "remaining",
+    ],
+    "COURSE_DETAILS": [
+        "tell me about", "what is", "what's", "who teaches", "instructor", "professor",
+        "description", "seats", "how hard", "workload", "about",
+    ],
+    "MAJOR_REQUIREMENTS": [
+        "major", "minor", "requirement", "required", "concentration", "certificate",
+    ],
+    "COURSE_RECOMMENDATION": [
+        "recommend", "suggest", "should i take", "next term", "next semester", "elective",
+        "what to take", "what classes", "what courses",
+    ],
+}
+
+# Minimum lexicon score for a confident COURSE decision
+COURSE_SCORE_THRESHOLD = 2.0
+
+# Messages longer than this are never classified GENERAL locally
+GENERAL_MAX_TOKENS = 8
+
+# Optional trained linear model: {"bias": float, "weights": {token: float}}
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "models" / "intent_model.json"),
+)
+
+# Probability band the linear model must fall outside of to be trusted
+MODEL_CONFIDENCE = 0.85
+
+
+def _load_linear_model(path: str) -> Optional[Dict]:
+    """Loads the optional linear intent model, returning None if it is not shipped."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            model = json.load(f)
+        logger.info(f"Loaded local intent model from {path}")
+        return model
+    except Exception as e:
+        logger.error(f"Error loading intent model {path}: {e}")
+        return None
+
+
+_linear_model = _load_linear_model(INTENT_MODEL_PATH)
+
+
+class IntentStats:
+    """Thread-safe counters for local hits versus LLM fallbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_course = 0
+        self.local_general = 0
+        self.llm_fallbacks = 0
+
+    def record_local(self, intent: str):
+        with self._lock:
+            if intent == "COURSE":
+                self.local_course += 1
+            else:
+                self.local_general += 1
+
+    def record_fallback(self):
+        with self._lock:
+            self.llm_fallbacks += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            local_hits = self.local_course + self.local_general
+            total = local_hits + self.llm_fallbacks
+            return {
+                "local_course": self.local_course,
+                "local_general": self.local_general,
+                "local_hits": local_hits,
+                "llm_fallbacks": self.llm_fallbacks,
+                "total": total,
+                "hit_ratio": local_hits / total if total else 0.0,
+            }
+
+
+intent_stats = IntentStats()
+
+
+def _score_linear_model(tokens) -> Optional[float]:
+    """Returns the linear model's COURSE probability, or None without a model."""
+    if not _linear_model:
+        return None
+    weights = _linear_model.get("weights", {})
+    z = _linear_model.get("bias", 0.0) + sum(weights.get(token, 0.0) for token in tokens)
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def classify_intent_locally(query: str) -> Optional[str]:
+    """
+    Classify a query without calling an LLM when the answer is clear.
+
+    Args:
+        query: The student's query
+
+    Returns:
+        "COURSE" or "GENERAL" for confident cases, None if the LLM should decide
+    """
+    intent = _classify(query)
+    if intent:
+        intent_stats.record_local(intent)
+    return intent
+
+
+def _classify(query: str) -> Optional[str]:
+    if not query or not query.strip():
+        return None
+
+    # A course code is the strongest possible signal
+    for match in COURSE_CODE_PATTERN.finditer(query):
+        if match.group(1).lower() not in NON_SUBJECT_WORDS:
+            return "COURSE"
+
+    tokens = TOKEN_PATTERN.findall(query.lower())
+    course_score = sum(COURSE_LEXICON.get(token, 0.0) for token in tokens)
+    general_score = sum(GENERAL_LEXICON.get(token, 0.0) for token in tokens)
+
+    if course_score >= COURSE_SCORE_THRESHOLD:
+        return "COURSE"
+
+    # Short messages with conversational words and no academic words at all
+    if course_score == 0 and general_score > 0 and len(tokens) <= GENERAL_MAX_TOKENS:
+        return "GENERAL"
+
+    probability = _score_linear_model(tokens)
+    if probability is not None:
+        if probability >= MODEL_CONFIDENCE:
+            return "COURSE"
+        if probability <= 1 - MODEL_CONFIDENCE:
+            return "GENERAL"
+
+    return None
+
+
+def classify_category_locally(query: str) -> Optional[str]:
+    """
+    Pick the detailed category of a COURSE query without calling an LLM.
+
+    Args:
+        query: The student's query
+
+    Returns:
+        One of QUERY_CATEGORIES when a single category clearly wins, None otherwise
+    """
+    if not query or not query.strip():
+        return None
+
+    text = query.lower()
+    scores = {
+        category: sum(1 for phrase in phrases if phrase in text)
+        for category, phrases in CATEGORY_LEXICON.items()
+    }
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_category, best_score = ranked[0]
+    if best_score == 0 or best_score == ranked[1][1]:
+        return None
+    return best_category
+
+
+def record_llm_fallback():
+    """Records that a query was too ambiguous to classify locally."""
+    intent_stats.record_fallback()
+
+
+def get_intent_stats() -> Dict[str, float]:
+    """
+    Gets local classifier counters.
+
+    Returns:
+        Dict with local hits, LLM fallbacks and the local hit ratio
+    """
+    return intent_stats.snapshot()
@@ -0,0 +1,385 @@
+"""
+Background Jobs for Academic Advisor
+A small durable job queue for work that outlives the request that started it.
+Jobs and their results live in a shared store, so any worker process can run
+a job and any process can answer a status lookup; results expire after a TTL.
+
+Classes:
+- Job: One unit of work and its outcome
+- JobStore: Storage interface a queue runs on
+- SQLiteJobStore: JobStore on a local SQLite file in WAL mode, shared by every process on the host
+- JobQueue: Runs queued jobs with bounded concurrency and per-user limits
+- QueueFullError: Raised when a job can't be queued
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING)
+
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "900"))
+# Handlers are cancelled after this long, and a running job not finished by then
+# is assumed lost with its worker and requeued
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.25"))
+# How often a queue evicts expired results and requeues lost jobs
+JOB_MAINTENANCE_INTERVAL = 30.0
+
+
+class QueueFullError(Exception):
+    """Raised when the user's or the queue's limit of active jobs is reached."""
+
+
+@dataclass
+class Job:
+    """One unit of work and its outcome."""
+    id: str
+    user_id: int
+    kind: str
+    payload: Dict[str, Any]
+    status: str = JOB_STATUS_QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    worker: Optional[str] = None
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_STATUS_DONE, JOB_STATUS_FAILED)
+
+
+class JobStore:
+    """
+    Storage interface for JobQueue. Implementations must make claim_next atomic
+    across every process sharing the store, so each job runs once.
+    """
+
+    def add(self, job: Job, per_user_limit: int, queue_limit: int):
+        """Stores a new queued job, raising QueueFullError if a limit would be exceeded."""
+        raise NotImplementedError
+
+    def claim_next(self, worker: str) -> Optional[Job]:
+        """Marks the oldest queued job as running and returns it, or None if the queue is empty."""
+        raise NotImplementedError
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None,
+               ttl: float = JOB_RESULT_TTL, worker: Optional[str] = None) -> bool:
+        """
+        Records a job's outcome; the result is kept for ttl seconds. With a worker,
+        the outcome is only recorded while that worker still owns the running job,
+        so a worker whose job was requeued can't overwrite the new run.
+        Returns whether the outcome was recorded.
+        """
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns a job, or None if it never existed or its result expired."""
+        raise NotImplementedError
+
+    def requeue_stale(self, timeout: float, max_attempts: int) -> int:
+        """Requeues jobs running longer than timeout, failing those out of attempts. Returns the number handled."""
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        """Deletes finished jobs past their TTL. Returns the number deleted."""
+        raise NotImplementedError
+
+    def counts(self) -> Dict[str, int]:
+        """Number of stored jobs per status."""
+        raise NotImplementedError
+
+
+class SQLiteJobStore(JobStore):
+    """
+    JobStore on a SQLite file in WAL mode. Every worker process on the host
+    opens the same file, so jobs queued by one process can run in another.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_user_status ON jobs (user_id, status)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_job(row: tuple) -> Job:
+        (job_id, user_id, kind, payload, status, result, error, attempts, worker, created_at,
+         started_at, finished_at, _) = row
+        return Job(
+            id=job_id, user_id=user_id, kind=kind, payload=json.loads(payload), status=status,
+            result=json.loads(result) if result is not None else None, error=error, attempts=attempts,
+            worker=worker, created_at=created_at, started_at=started_at, finished_at=finished_at,
+        )
+
+    def add(self, job: Job, per_user_limit: int, queue_limit: int):
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock, so the limit checks and the insert are atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" for _ in ACTIVE_STATUSES)
+            user_active = conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN ({placeholders})",
+                (job.user_id, *ACTIVE_STATUSES),
+            ).fetchone()[0]
+            if per_user_limit and user_active >= per_user_limit:
+                raise QueueFullError(f"User {job.user_id} already has {user_active} active jobs")
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (JOB_STATUS_QUEUED,)).fetchone()[0]
+            if queue_limit and queued >= queue_limit:
+                raise QueueFullError(f"Job queue is full with {queued} queued jobs")
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, kind, payload, status, attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (job.id, job.user_id, job.kind, json.dumps(job.payload), job.status, job.created_at),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim_next(self, worker: str) -> Optional[Job]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (JOB_STATUS_RUNNING, worker, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        job = self._to_job(row)
+        job.status, job.worker, job.started_at, job.attempts = JOB_STATUS_RUNNING, worker, now, job.attempts + 1
+        return job
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None,
+               ttl: float = JOB_RESULT_TTL, worker: Optional[str] = None) -> bool:
+        now = time.time()
+        sql = "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?"
+        params = [status, json.dumps(result) if result is not None else None, error, now, now + ttl, job_id]
+        if worker is not None:
+            sql += " AND worker = ? AND status = ?"
+            params += [worker, JOB_STATUS_RUNNING]
+        return self._connection().execute(sql, params).rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute(
+            "SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)", (job_id, time.time())
+        ).fetchone()
+        return self._to_job(row) if row else None
+
+    def requeue_stale(self, timeout: float, max_attempts: int) -> int:
+        conn = self._connection()
+        cutoff, now = time.time() - timeout, time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (JOB_STATUS_FAILED, "Job timed out", now, now + JOB_RESULT_TTL,
+                 JOB_STATUS_RUNNING, cutoff, max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL WHERE status = ? AND started_at < ?",
+                (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING, cutoff),
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return failed + requeued
+
+    def evict_expired(self) -> int:
+        return self._connection().execute(
+            "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+class JobQueue:
+    """
+    Runs jobs from a JobStore on a fixed number of asyncio workers per process.
+
+    The handler receives the Job and returns a JSON-serializable result. Start
+    the queue on application startup; jobs submitted before that, or left queued
+    by a process that exited, are picked up once workers run. A handler still
+    running after timeout seconds is cancelled and its job failed.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[Job], Awaitable[Any]], kind: str,
+                 concurrency: int = 4, per_user_limit: int = 2, queue_limit: int = 1000,
+                 result_ttl: float = JOB_RESULT_TTL, poll_interval: float = JOB_POLL_INTERVAL,
+                 timeout: float = JOB_TIMEOUT):
+        self.store = store
+        self.handler = handler
+        self.kind = kind
+        self.concurrency = concurrency
+        self.per_user_limit = per_user_limit
+        self.queue_limit = queue_limit
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.completed = 0
+        self.failed = 0
+
+    async def submit(self, user_id: int, payload: Dict[str, Any]) -> str:
+        """
+        Queues a job.
+
+        Args:
+            user_id: ID of the user the job runs for
+            payload: JSON-serializable job input
+
+        Returns:
+            The job ID to look the result up with
+
+        Raises:
+            QueueFullError: If the user or the queue has too many active jobs
+        """
+        job = Job(id=uuid.uuid4().hex, user_id=user_id, kind=self.kind, payload=payload, created_at=time.time())
+        await asyncio.to_thread(self.store.add, job, self.per_user_limit, self.queue_limit)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job.id
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def start(self):
+        """Starts the workers on the running event loop."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        logger.info(f"Started {self.concurrency} {self.kind} job workers on {self.worker_name}")
+
+    async def stop(self):
+        """Cancels the workers. Jobs they were running are requeued after JOB_TIMEOUT."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int):
+        worker = f"{self.worker_name}/{index}"
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim_next, worker)
+            except Exception as e:
+                logger.error(f"Error claiming {self.kind} job: {e}")
+                job = None
+            if job is None:
+                # Other processes queue jobs too, so wake up on a timer as well as on local submits
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # The job is requeued once it goes stale; keep the worker alive
+                logger.error(f"Error recording {self.kind} job {job.id}: {e}")
+
+    async def _run(self, job: Job):
+        try:
+            result = await asyncio.wait_for(self.handler(job), self.timeout)
+        except asyncio.CancelledError:
+            # Shutting down; the job stays running and is requeued once it goes stale
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"{self.kind} job {job.id} timed out after {self.timeout:.0f}s")
+            await self._finish(job, JOB_STATUS_FAILED, error="Job timed out")
+        except Exception as e:
+            logger.error(f"{self.kind} job {job.id} failed: {e}")
+            await self._finish(job, JOB_STATUS_FAILED, error=str(e))
+        else:
+            await self._finish(job, JOB_STATUS_DONE, result=result)
+
+    async def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        recorded = await asyncio.to_thread(
+            self.store.finish, job.id, status, result, error, self.result_ttl, job.worker
+        )
+        if not recorded:
+            # The job went stale and was requeued or failed; whoever owns it now records the outcome
+            logger.warning(f"{self.kind} job {job.id} is no longer owned by {job.worker}, dropping its outcome")
+        elif status == JOB_STATUS_DONE:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    async def _maintain(self):
+        while True:
+            try:
+                requeued = await asyncio.to_thread(self.store.requeue_stale, JOB_TIMEOUT, JOB_MAX_ATTEMPTS)
+                evicted = await asyncio.to_thread(self.store.evict_expired)
+                if requeued or evicted:
+                    logger.info(f"Job maintenance: {requeued} stale jobs handled, {evicted} expired results evicted")
+            except Exception as e:
+                logger.error(f"Error in job maintenance: {e}")
+            await asyncio.sleep(JOB_MAINTENANCE_INTERVAL)
+
+    async def stats(self) -> Dict[str, Any]:
+        # The store counts are a database query, so they run in a worker thread
+        counts = await asyncio.to_thread(self.store.counts)
+        return {
+            "workers": self.concurrency if self._tasks else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "jobs": counts,
+        }
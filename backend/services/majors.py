@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from backend.core.database import Major, User
 from backend.models.schemas import MajorCreate
 from backend.services.programs import assign_program_to_user, get_available_programs
+from backend.services.profile_events import notify_profile_changed
 
 # Helper function to get available majors list from JSON file
 def get_available_majors() -> List[str]:
@@ -92,6 +93,7 @@ def add_major_to_user(db: Session, user_id: int, major_name: str) -> Optional[Ma
     else:
         print(f"Warning: No program mapping found for major {major_name}")
     
+    notify_profile_changed(user_id)
     return major
 
 # Remove major from user
@@ -117,6 +119,7 @@ def remove_major_from_user(db: Session, user_id: int, major_id: int) -> Optional
         user.major = user.majors[0].name
         
     db.commit()
+    notify_profile_changed(user_id)
     
     return major
 
@@ -0,0 +1,382 @@
+"""
+Stage Metrics for Academic Advisor
+Records wall time, token usage, estimated cost and cache hits for each stage of
+the advising pipeline (classify, acknowledge, lookup, reason, embed,
+vector_search, dedup, rerank, repair, respond). Aggregates are exported in the Prometheus text format;
+the stages of a single request can also be collected into a timing breakdown.
+
+Classes:
+- Histogram: Cumulative-bucket histogram with labels
+- Counter: Monotonic counter with labels
+- Gauge: Current values read from a callback at scrape time
+- LatencyWindow: Recent latencies of one operation, for budgets derived from them
+- RequestTrace: Stage records collected for one request
+
+Functions:
+- stage: Context manager timing one pipeline stage
+- start_stage / finish_stage: Explicit timing for stages that span yields
+- record_cache_hit: Counts a cache hit against the current stage
+- record_tokens_saved: Counts prompt tokens removed by compaction against the current stage
+- start_request_trace / end_request_trace: Collect a per-request breakdown
+- render_prometheus: All metrics in the Prometheus text exposition format
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from local lookups up to slow reasoning calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# USD per million (prompt, completion) tokens; list prices, update when they change
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "o1-mini": (1.10, 4.40),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+# Requests sending this header get their stage breakdown back in the response headers;
+# off unless enabled, since the breakdown exposes internal timings and spend
+DEBUG_TIMING_HEADER = "X-Debug-Timing"
+DEBUG_TIMING_ENABLED = os.getenv("DEBUG_TIMING_ENABLED", "false").lower() == "true"
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    # Backslash first, so the escapes added for quotes and line feeds aren't doubled
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose values are collected from a callback when rendered, for state owned elsewhere."""
+
+    def __init__(self, name: str, documentation: str,
+                 collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = sorted((_label_key(labels), value) for labels, value in self.collect())
+        except Exception as e:
+            logger.error(f"Error collecting {self.name}: {e}")
+            samples = []
+        for key, value in samples:
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class LatencyWindow:
+    """The most recent latencies of one operation, for timeouts that follow what was observed."""
+
+    def __init__(self, size: int, min_samples: int):
+        """
+        Args:
+            size: Latencies kept; older ones are dropped
+            min_samples: Latencies needed before quantiles are reported
+        """
+        self.min_samples = max(min_samples, 1)
+        self._samples: "deque[float]" = deque(maxlen=max(size, self.min_samples))
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q quantile of the kept latencies, or None until min_samples were observed."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered like prometheus_client's."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            # Per series: one count per bucket, then +Inf count, then sum
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {count:g}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-2]:g}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]:g}")
+        return lines
+
+
+STAGE_LATENCY = Histogram("advisor_stage_latency_seconds", "Wall time of each advising pipeline stage", LATENCY_BUCKETS)
+STAGE_TOKENS = Histogram("advisor_stage_tokens", "Tokens used per LLM call, by kind", TOKEN_BUCKETS)
+STAGE_COST = Counter("advisor_stage_cost_usd_total", "Estimated LLM spend from list prices")
+STAGE_CALLS = Counter("advisor_stage_calls_total", "Stage executions by outcome")
+CACHE_HITS = Counter("advisor_cache_hits_total", "Cache hits observed inside a stage")
+TOKENS_SAVED = Counter("advisor_prompt_tokens_saved_total", "Prompt tokens removed by fitting prompts to their budget")
+
+# Other modules append their own metrics to be rendered alongside the stage metrics
+REGISTRY = [STAGE_LATENCY, STAGE_TOKENS, STAGE_COST, STAGE_CALLS, CACHE_HITS, TOKENS_SAVED]
+
+
+class StageRecord:
+    """Measurements for one execution of one stage."""
+
+    __slots__ = ("stage", "model", "started", "duration", "prompt_tokens", "completion_tokens",
+                 "cost", "cache_hits", "tokens_saved", "status")
+
+    def __init__(self, stage: str, model: Optional[str] = None):
+        self.stage = stage
+        self.model = model
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.cache_hits: Dict[str, int] = {}
+        self.tokens_saved = 0
+        self.status = "ok"
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int = 0, model: Optional[str] = None):
+        """Adds the token usage of one model call made during the stage."""
+        model = model or self.model
+        if model:
+            self.model = model
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        prompt_price, completion_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+        self.cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record_usage(self, response: Any, model: Optional[str] = None):
+        """
+        Reads token usage off a LangChain chat response.
+
+        Args:
+            response: AIMessage returned by invoke/ainvoke
+            model: Model name, when the response metadata doesn't carry it
+        """
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens")
+        completion_tokens = usage.get("output_tokens")
+        metadata = getattr(response, "response_metadata", None) or {}
+        if prompt_tokens is None:
+            token_usage = metadata.get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+        self.add_tokens(int(prompt_tokens or 0), int(completion_tokens or 0), metadata.get("model_name") or model)
+
+    def cache_hit(self, cache: str, count: int = 1):
+        self.cache_hits[cache] = self.cache_hits.get(cache, 0) + count
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "model": self.model,
+            "ms": round(self.duration * 1000, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+            "cache_hits": dict(self.cache_hits),
+            "tokens_saved": self.tokens_saved,
+            "status": self.status,
+        }
+
+
+class RequestTrace:
+    """Stage records of one request, in completion order."""
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, record: StageRecord):
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            records = [record.as_dict() for record in self.records]
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "stages": records,
+        }
+
+    def server_timing(self) -> str:
+        """Stage durations in the Server-Timing header format browsers display."""
+        with self._lock:
+            return ", ".join(
+                f"{record.stage};dur={record.duration * 1000:.1f}" for record in self.records
+            )
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("advisor_request_trace", default=None)
+_current_stage: ContextVar[Optional[StageRecord]] = ContextVar("advisor_current_stage", default=None)
+
+
+def start_request_trace() -> Tuple[RequestTrace, Any]:
+    """Starts collecting stage records for the current request. Returns (trace, reset token)."""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_request_trace(token: Any):
+    _current_trace.reset(token)
+
+
+def current_stage() -> Optional[StageRecord]:
+    return _current_stage.get()
+
+
+def record_cache_hit(cache: str, count: int = 1):
+    """Counts cache hits against the running stage, or against "none" outside any stage."""
+    if count <= 0:
+        return
+    record = _current_stage.get()
+    if record is not None:
+        record.cache_hit(cache, count)
+    else:
+        CACHE_HITS.inc(count, stage="none", cache=cache)
+
+
+def record_tokens_saved(count: int):
+    """Counts prompt tokens that compaction kept out of the running stage's model call."""
+    if count <= 0:
+        return
+    record = _current_stage.get()
+    if record is not None:
+        record.tokens_saved += count
+    else:
+        TOKENS_SAVED.inc(count, stage="none")
+
+
+@contextmanager
+def stage(name: str, model: Optional[str] = None) -> Iterator[StageRecord]:
+    """
+    Times a pipeline stage and exports its measurements when it ends.
+    Works in sync and async code; the record is visible to nested calls through
+    a context variable, so helpers can add tokens or cache hits to it.
+
+    Args:
+        name: Stage name, e.g. "reason"
+        model: Model used by the stage, if known up front
+
+    Yields:
+        StageRecord to attach token usage and cache hits to
+    """
+    record = start_stage(name, model)
+    token = _current_stage.set(record)
+    try:
+        yield record
+    except BaseException:
+        record.status = "error"
+        raise
+    finally:
+        _current_stage.reset(token)
+        finish_stage(record)
+
+
+def start_stage(name: str, model: Optional[str] = None) -> StageRecord:
+    """
+    Starts timing a stage without making it the current stage. For code that
+    yields mid-stage, such as a streaming generator, where a context manager
+    would leak its context variable to the consumer.
+    """
+    return StageRecord(name, model)
+
+
+def finish_stage(record: StageRecord, status: Optional[str] = None):
+    """Stops timing a stage started with start_stage and exports it."""
+    if status:
+        record.status = status
+    record.duration = time.perf_counter() - record.started
+    _export(record)
+
+
+def _export(record: StageRecord):
+    model = record.model or "none"
+    STAGE_LATENCY.observe(record.duration, stage=record.stage, model=model)
+    STAGE_CALLS.inc(stage=record.stage, status=record.status)
+    if record.prompt_tokens or record.completion_tokens:
+        STAGE_TOKENS.observe(record.prompt_tokens, stage=record.stage, model=model, kind="prompt")
+        STAGE_TOKENS.observe(record.completion_tokens, stage=record.stage, model=model, kind="completion")
+    if record.cost:
+        STAGE_COST.inc(record.cost, stage=record.stage, model=model)
+    for cache, count in record.cache_hits.items():
+        CACHE_HITS.inc(count, stage=record.stage, cache=cache)
+    if record.tokens_saved:
+        TOKENS_SAVED.inc(record.tokens_saved, stage=record.stage)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(record)
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
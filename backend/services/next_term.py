@@ -0,0 +1,186 @@
+"""
+Next-Term Recommender for Academic Advisor
+Deterministic recommendations for the default "What courses should I take next
+term?" request. Candidates come from the degree audit, are filtered by
+prerequisite eligibility and ranked by how much degree progress they unlock
+and whether they are actually offered with open seats. Only courses with a
+record in the corpus are recommended. No LLM is involved.
+
+Functions:
+- recommend_next_term: Ranked next-term course list for a student
+- build_next_term_message: Template message shown above the recommendations
+"""
+
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+from backend.services.course_catalog import course_data_from_metadata, normalize_course_code
+from backend.services.prerequisites import PrerequisiteGraph
+from backend.services.user_context import UserAcademicContext
+
+logger = logging.getLogger(__name__)
+
+# Number of courses recommended, matching the 3-5 the reasoning model picks
+NEXT_TERM_LIMIT = int(os.getenv("NEXT_TERM_LIMIT", "5"))
+
+# Ranking weights; a required course beats an elective choice, and a course that
+# unblocks other remaining requirements beats one that doesn't
+REQUIRED_COURSE_WEIGHT = 3.0
+ELECTIVE_GROUP_WEIGHT = 1.5
+PARTIAL_GROUP_BONUS = 0.5
+UNLOCK_WEIGHT = 1.0
+OPEN_SEATS_BONUS = 1.0
+FULL_SECTION_PENALTY = 2.0
+
+COURSE_NUMBER_PATTERN = re.compile(r"(\d{3})")
+
+
+def _seats(value: Any) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _best_section(sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Prefer a section with open seats, then the one with the most seats open
+    return max(sections, key=lambda record: _seats(record.get("available_seats")) or 0)
+
+
+def _course_level(code: str) -> int:
+    match = COURSE_NUMBER_PATTERN.search(code)
+    return int(match.group(1)) if match else 999
+
+
+def _requirement_reasons(context: UserAcademicContext) -> Dict[str, List[Dict[str, Any]]]:
+    """Maps each course that would still count to the unmet requirements it counts toward."""
+    reasons: Dict[str, List[Dict[str, Any]]] = {}
+    for program in context.audit.get("programs", []):
+        for partial, statuses in ((True, program["partial"]), (False, program["remaining"])):
+            for status in statuses:
+                for code in status["options"]:
+                    reasons.setdefault(code, []).append({
+                        "program_name": program["program_name"],
+                        "program_type": program["program_type"],
+                        "name": status["name"],
+                        "still_needed": status["still_needed"],
+                        "required": len(status["options"]) == 1,
+                        "partial": partial,
+                    })
+    return reasons
+
+
+def _reason_text(requirements: List[Dict[str, Any]]) -> str:
+    first = requirements[0]
+    if first["required"]:
+        text = f"Required for your {first['program_name']} {first['program_type']}"
+    else:
+        text = (f"Counts toward {first['name']} ({first['still_needed']} more needed) "
+                f"in your {first['program_name']} {first['program_type']}")
+    if len(requirements) > 1:
+        text += f", and {len(requirements) - 1} other requirement(s)"
+    return text + "."
+
+
+def recommend_next_term(context: UserAcademicContext, records: List[Dict[str, Any]],
+                        graph: PrerequisiteGraph, limit: int = NEXT_TERM_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Ranks the courses a student should take next term.
+
+    Candidates are courses that count toward an unmet requirement, haven't been
+    taken, have a record in the corpus, and whose listed prerequisites are met.
+    Courses without a record are dropped: nothing is known about their
+    prerequisites or sections. Each is scored by the requirements it
+    counts toward, how many other remaining courses list it as a prerequisite, and
+    section availability when the corpus carries schedules and seat counts. Lower
+    level courses win ties, then course code, so the order is fully deterministic.
+
+    Args:
+        context: The student's academic context, including the degree audit
+        records: Course corpus (vector metadata or catalog records)
+        graph: Prerequisite graph of the corpus
+        limit: Maximum number of courses to return
+
+    Returns:
+        Course dicts in the frontend format with a recommendation note, best first;
+        possibly fewer than limit, or none, when few candidates have records
+    """
+    reasons = _requirement_reasons(context)
+    if not reasons:
+        return []
+
+    sections: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        code = normalize_course_code(str(record.get("class_code") or ""))
+        if code in reasons:
+            sections.setdefault(code, []).append(record)
+
+    completed = graph.expand_completed(context.completed_courses)
+    remaining = [code for code in reasons if code not in completed]
+    # Prerequisites of the remaining courses, to reward courses that unblock others
+    unlock_counts: Dict[str, int] = {}
+    for code in remaining:
+        for prerequisite in graph.prerequisite_codes(code):
+            unlock_counts[prerequisite] = unlock_counts.get(prerequisite, 0) + 1
+
+    scored = []
+    for code in remaining:
+        if code not in sections:
+            continue
+        record = _best_section(sections[code])
+        if not graph.is_eligible(code, completed, requisites=record.get("prerequisites")):
+            continue
+
+        score = 0.0
+        for requirement in reasons[code]:
+            score += REQUIRED_COURSE_WEIGHT if requirement["required"] else ELECTIVE_GROUP_WEIGHT
+            if requirement["partial"]:
+                score += PARTIAL_GROUP_BONUS
+        score += UNLOCK_WEIGHT * unlock_counts.get(code, 0)
+
+        seats = _seats(record.get("available_seats"))
+        if seats is not None:
+            score += OPEN_SEATS_BONUS if seats > 0 else -FULL_SECTION_PENALTY
+
+        scored.append((-score, _course_level(code), code, record))
+
+    scored.sort(key=lambda item: item[:3])
+    recommendations = []
+    for _, _, code, record in scored[:limit]:
+        course = course_data_from_metadata(record)
+        # Required courses and half-finished groups are what keep a student on track
+        urgent = any(requirement["required"] or requirement["partial"] for requirement in reasons[code])
+        course["recommendation"] = {
+            "is_recommended": True,
+            "reason": _reason_text(reasons[code]),
+            "priority": "High" if urgent else "Medium",
+        }
+        recommendations.append(course)
+    return recommendations
+
+
+def build_next_term_message(context: UserAcademicContext, count: int) -> str:
+    """
+    Writes the message shown above the recommendations without an LLM call.
+
+    Args:
+        context: The student's academic context
+        count: Number of recommended courses
+
+    Returns:
+        Short friendly message
+    """
+    major_names = context.major_names
+    if len(major_names) == 1:
+        major_text = f" in {major_names[0]}"
+    elif major_names:
+        major_text = f" in {', '.join(major_names[:-1])} and {major_names[-1]}"
+    else:
+        major_text = ""
+    return (
+        f"Here are {count} courses I'd suggest for next term{major_text} 📚 "
+        f"Each one counts toward a requirement you still need, and you meet every "
+        f"prerequisite the catalog lists for it, so you can stay on track toward graduation."
+    )
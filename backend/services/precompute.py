@@ -0,0 +1,216 @@
+"""
+Recommendation Precomputation for Academic Advisor
+Recomputes a user's default next-term recommendations in the background after
+their profile changes, so the advisor page usually opens on a ready answer.
+
+Changes are debounced per user: a burst of edits (adding five courses in a row)
+triggers one recomputation after the burst settles. Results are stored with the
+state fingerprint they were computed for and served until the fingerprint changes.
+
+Classes:
+- PrecomputedRecommendations: Versioned per-user store of default recommendations
+- RecommendationPrecomputer: Debounced background recomputation
+"""
+
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.services.concurrency import SharedExecutor, shared_executor
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_DEBOUNCE_SECONDS = float(os.getenv("PRECOMPUTE_DEBOUNCE_SECONDS", "2.0"))
+PRECOMPUTE_CACHE_SIZE = int(os.getenv("PRECOMPUTE_CACHE_SIZE", "4096"))
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "version", "value", "computed_at")
+
+    def __init__(self, fingerprint: str, version: int, value: Any):
+        self.fingerprint = fingerprint
+        self.version = version
+        self.value = value
+        self.computed_at = time.time()
+
+
+class PrecomputedRecommendations:
+    """
+    Per-user store of default recommendations.
+
+    Every profile change bumps the user's version. A result is only stored if no
+    newer change arrived while it was being computed, and is only served while
+    the user's state fingerprint still matches the one it was computed for.
+    """
+
+    def __init__(self, max_size: int = PRECOMPUTE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, user_id: int) -> int:
+        """Records a profile change and returns the user's new version."""
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            return version
+
+    def current_version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def has_version(self, user_id: int, version: int) -> bool:
+        """True if a result computed at or after this version is already stored."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and entry.version >= version
+
+    def put(self, user_id: int, version: int, fingerprint: str, value: Any) -> bool:
+        """
+        Stores a result unless a newer profile change made it stale.
+
+        Args:
+            user_id: ID of the user
+            version: User version the computation started from
+            fingerprint: State fingerprint the result was computed for
+            value: The recommendation response
+
+        Returns:
+            True if the result was stored
+        """
+        with self._lock:
+            if version < self._versions.get(user_id, 0):
+                return False
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = _Entry(fingerprint, version, copy.deepcopy(value))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[Any]:
+        """Returns the stored result if it was computed for this exact state."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.fingerprint != fingerprint:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return copy.deepcopy(entry.value)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RecommendationPrecomputer:
+    """
+    Debounced background recomputation of default recommendations.
+
+    compute_fn receives a fresh database session and the user ID and returns
+    (fingerprint, response), or (None, None) when there is nothing to store.
+    """
+
+    def __init__(self, compute_fn: Callable[[Session, int], Tuple[Optional[str], Any]],
+                 store: PrecomputedRecommendations, session_factory: Callable[[], Session],
+                 debounce_seconds: float = PRECOMPUTE_DEBOUNCE_SECONDS,
+                 executor: SharedExecutor = shared_executor):
+        self.compute_fn = compute_fn
+        self.store = store
+        self.session_factory = session_factory
+        self.debounce_seconds = debounce_seconds
+        # Runs in the executor's "precompute" lane, limited by PRECOMPUTE_WORKERS
+        self._executor = executor
+        self._timers: Dict[int, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def schedule(self, user_id: int):
+        """
+        Schedules a recomputation for a user, restarting the debounce window.
+
+        Args:
+            user_id: ID of the user whose profile changed
+        """
+        version = self.store.bump(user_id)
+        timer = threading.Timer(self.debounce_seconds, self._submit, (user_id, version))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.pop(user_id, None)
+            if previous is not None:
+                previous.cancel()
+            self._timers[user_id] = timer
+        timer.start()
+
+    def _submit(self, user_id: int, version: int):
+        with self._lock:
+            # Timers run their callback on their own thread
+            if self._timers.get(user_id) is threading.current_thread():
+                del self._timers[user_id]
+        try:
+            self._executor.submit("precompute", self._run, user_id, version)
+        except RuntimeError:
+            # Executor already shut down during application exit
+            pass
+
+    def _run(self, user_id: int, version: int):
+        if self.store.current_version(user_id) != version or self.store.has_version(user_id, version):
+            # A newer change was scheduled, or a request already computed this state
+            with self._lock:
+                self.skipped += 1
+            return
+
+        db = self.session_factory()
+        try:
+            fingerprint, value = self.compute_fn(db, user_id)
+            stored = bool(fingerprint) and self.store.put(user_id, version, fingerprint, value)
+            with self._lock:
+                if stored:
+                    self.completed += 1
+                else:
+                    self.skipped += 1
+            if stored:
+                logger.info(f"Precomputed default recommendations for user {user_id}")
+        except Exception as e:
+            logger.error(f"Error precomputing recommendations for user {user_id}: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            db.close()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._timers)
+
+    def shutdown(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "pending": len(self._timers),
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "failed": self.failed,
+            }
+        return {**counters, "store": self.store.stats()}
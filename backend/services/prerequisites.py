@@ -0,0 +1,352 @@
+"""
+Prerequisite Graph for Academic Advisor
+Compiles the free-text prerequisite strings from the catalog and vector metadata
+("BA 101Z; WR 122Z or WR 123. Sophomore standing required") into AND/OR
+requirement trees, held in memory together with course equivalencies. Checking
+whether a student can take a course is then a few set lookups.
+
+Requirements that can't be checked from a transcript (instructor approval,
+placement scores, "or equivalent") count as satisfied, so the graph only ever
+rules out courses that are certainly blocked.
+
+Classes:
+- PrerequisiteGraph: Compiled requirements and equivalencies for a course corpus
+
+Functions:
+- parse_requisites: Compiles one prerequisite string into a requirement tree
+- build_prerequisite_graph: Builds a PrerequisiteGraph from course records
+- get_catalog_prerequisite_graph: Cached graph over the scraped business catalog
+- filter_eligible_courses: Splits candidate courses into takeable and blocked
+"""
+
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.services.course_catalog import get_catalog_courses, normalize_course_code
+
+logger = logging.getLogger(__name__)
+
+# Catalog codes are uppercase and some subjects are a single letter ("J 211")
+PREREQ_CODE_PATTERN = re.compile(r"\b([A-Z]{1,4})?\s?(\d{3}[A-Z]?)\b")
+
+STANDING_LEVELS = {"freshman": 1, "sophomore": 2, "junior": 3, "senior": 4, "graduate": 5}
+STANDING_PATTERN = re.compile(r"\b(freshman|sophomore|junior|senior|graduate)\s+standing(\s+required)?", re.IGNORECASE)
+
+# Text that never affects eligibility: repeat limits and grade thresholds
+REPEATABLE_PATTERN = re.compile(r"Repeatable\b.*$", re.IGNORECASE | re.DOTALL)
+# Grades are uppercase letters ("with a grade of B- or higher", "with a C- or better",
+# "(C- or better)"), so only the surrounding words ignore case
+GRADE_PATTERN = re.compile(
+    r"\(?\s*(?:(?i:with\s+(?:an?\s+)?(?:minimum\s+)?grades?\s+(?:of\s+)?(?:at\s+least\s+|better\s+than\s+)?)[A-DFP][+-]?"
+    r"|(?i:with\s+(?:an?\s+)?)?\b[A-DF][+-]?(?=\s+(?i:or\s+(?:higher|better|above))\b))"
+    r"(?:\s+(?i:or\s+(?:higher|better|above)))?\s*\)?"
+)
+
+# Clauses end at semicolons and at sentence periods ("WR 123. Sophomore standing")
+CLAUSE_SPLIT_PATTERN = re.compile(r";|\.(?=\s|$)")
+AND_PATTERN = re.compile(r"\band\b", re.IGNORECASE)
+OR_PATTERN = re.compile(r"\bor\b", re.IGNORECASE)
+
+
+class _Requirement:
+    __slots__ = ()
+
+    def satisfied(self, completed: Set[str], standing: Optional[int]) -> bool:
+        raise NotImplementedError
+
+    def codes(self) -> Set[str]:
+        """Every course code the requirement mentions."""
+        return set()
+
+
+class _Course(_Requirement):
+    __slots__ = ("code",)
+
+    def __init__(self, code: str):
+        self.code = code
+
+    def satisfied(self, completed, standing):
+        return self.code in completed
+
+    def codes(self):
+        return {self.code}
+
+    def __repr__(self):
+        return self.code
+
+
+class _Standing(_Requirement):
+    __slots__ = ("level",)
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def satisfied(self, completed, standing):
+        # Standing isn't recorded for students, so it only blocks when the caller knows it
+        return standing is None or standing >= self.level
+
+    def __repr__(self):
+        return f"standing>={self.level}"
+
+
+class _Unverifiable(_Requirement):
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def satisfied(self, completed, standing):
+        return True
+
+    def __repr__(self):
+        return f"?{self.text!r}"
+
+
+class _AllOf(_Requirement):
+    __slots__ = ("children",)
+
+    def __init__(self, children: List[_Requirement]):
+        self.children = children
+
+    def satisfied(self, completed, standing):
+        return all(child.satisfied(completed, standing) for child in self.children)
+
+    def codes(self):
+        return set().union(*(child.codes() for child in self.children))
+
+    def __repr__(self):
+        return "(" + " AND ".join(map(repr, self.children)) + ")"
+
+
+class _AnyOf(_Requirement):
+    __slots__ = ("children",)
+
+    def __init__(self, children: List[_Requirement]):
+        self.children = children
+
+    def satisfied(self, completed, standing):
+        return any(child.satisfied(completed, standing) for child in self.children)
+
+    def codes(self):
+        return set().union(*(child.codes() for child in self.children))
+
+    def __repr__(self):
+        return "(" + " OR ".join(map(repr, self.children)) + ")"
+
+
+NO_REQUIREMENT = _AllOf([])
+
+
+def _combine(cls, children: List[_Requirement]) -> _Requirement:
+    if len(children) == 1:
+        return children[0]
+    return cls(children)
+
+
+def _parse_alternatives(text: str, subject: List[Optional[str]]) -> List[_Requirement]:
+    """Parses the terms of one "A or B or 311H" group; subject carries across terms."""
+    alternatives = []
+    for term in OR_PATTERN.split(text):
+        term = term.strip(" ,.")
+        if not term:
+            continue
+        matches = list(PREREQ_CODE_PATTERN.finditer(term))
+        if not matches:
+            alternatives.append(_Unverifiable(term))
+            continue
+        for match in matches:
+            # "MKTG 311 or 311H" repeats the previous subject implicitly
+            if match.group(1):
+                subject[0] = match.group(1)
+            if subject[0]:
+                alternatives.append(_Course(normalize_course_code(f"{subject[0]} {match.group(2)}")))
+            else:
+                alternatives.append(_Unverifiable(term))
+    return alternatives
+
+
+def _parse_clause(clause: str) -> Optional[_Requirement]:
+    lowered = clause.lower()
+    if not clause or "recommended" in lowered or "coreq" in lowered:
+        # Recommendations and corequisites don't gate enrollment
+        return None
+
+    subject: List[Optional[str]] = [None]
+    if lowered.startswith("one from"):
+        options = clause[len("one from"):].replace(",", " or ")
+        return _combine(_AnyOf, _parse_alternatives(options, subject))
+
+    requirements = []
+    for part in clause.split(","):
+        for piece in AND_PATTERN.split(part):
+            alternatives = _parse_alternatives(piece, subject)
+            if alternatives:
+                requirements.append(_combine(_AnyOf, alternatives))
+    if not requirements:
+        return None
+    return _combine(_AllOf, requirements)
+
+
+@lru_cache(maxsize=4096)
+def parse_requisites(text: str) -> _Requirement:
+    """
+    Compiles a prerequisite string into a requirement tree.
+    Semicolons and sentences are ANDed, commas are ANDed within a clause, "or"
+    binds tighter than "and", and "one from A, B" is an OR. Standing phrases
+    become standing requirements; corequisites and recommendations are ignored.
+
+    Args:
+        text: Prerequisite text, e.g. "BA 101Z; WR 122Z or WR 123. Sophomore standing required"
+
+    Returns:
+        Requirement tree with a satisfied(completed, standing) method
+    """
+    text = REPEATABLE_PATTERN.sub("", text or "")
+    text = GRADE_PATTERN.sub("", text)
+
+    requirements: List[_Requirement] = []
+    for match in STANDING_PATTERN.finditer(text):
+        requirements.append(_Standing(STANDING_LEVELS[match.group(1).lower()]))
+    text = STANDING_PATTERN.sub("", text)
+
+    for clause in CLAUSE_SPLIT_PATTERN.split(text):
+        requirement = _parse_clause(clause.strip(" ,"))
+        if requirement is not None:
+            requirements.append(requirement)
+
+    if not requirements:
+        return NO_REQUIREMENT
+    return _combine(_AllOf, requirements)
+
+
+class PrerequisiteGraph:
+    """
+    Compiled prerequisites for a course corpus.
+
+    requirements maps each normalized course code to its requirement tree, and
+    equivalents maps a code to every code that counts as the same course
+    ("BA 101Z" and "BA 101").
+    """
+
+    def __init__(self, requirements: Dict[str, _Requirement], equivalents: Dict[str, Set[str]]):
+        self.requirements = requirements
+        self.equivalents = equivalents
+
+    def __len__(self) -> int:
+        return len(self.requirements)
+
+    def expand_completed(self, completed_courses: Iterable[str]) -> Set[str]:
+        """Normalizes completed codes and adds every equivalent course."""
+        completed = set()
+        for code in completed_courses:
+            code = normalize_course_code(code)
+            completed.add(code)
+            completed.update(self.equivalents.get(code, ()))
+        return completed
+
+    def is_eligible(self, code: str, completed: Set[str], standing: Optional[int] = None,
+                    requisites: Optional[str] = None) -> bool:
+        """
+        Checks whether a course's prerequisites are met.
+
+        Args:
+            code: Course code
+            completed: Output of expand_completed
+            standing: Student standing level (1 = freshman ... 4 = senior), None if unknown
+            requisites: Prerequisite text to compile when the course isn't in the graph
+
+        Returns:
+            False only when a requirement is certainly unmet
+        """
+        requirement = self.requirements.get(normalize_course_code(code))
+        if requirement is None:
+            requirement = parse_requisites(requisites or "")
+        return requirement.satisfied(completed, standing)
+
+    def prerequisite_codes(self, code: str) -> Set[str]:
+        """Course codes mentioned in a course's prerequisites."""
+        requirement = self.requirements.get(normalize_course_code(code))
+        return requirement.codes() if requirement is not None else set()
+
+    def eligible_courses(self, completed_courses: Iterable[str], standing: Optional[int] = None) -> List[str]:
+        """Every course in the graph the student hasn't taken and can take now."""
+        completed = self.expand_completed(completed_courses)
+        return [
+            code for code, requirement in self.requirements.items()
+            if code not in completed and requirement.satisfied(completed, standing)
+        ]
+
+
+def build_prerequisite_graph(records: Iterable[Dict[str, Any]], code_key: str = "class_code") -> PrerequisiteGraph:
+    """
+    Compiles the prerequisite text of every course record.
+
+    Args:
+        records: Course dicts with class_code, prerequisites and optionally equivalent_to
+        code_key: Field holding the course code
+
+    Returns:
+        PrerequisiteGraph over the records
+    """
+    requirements: Dict[str, _Requirement] = {}
+    groups: Dict[str, Set[str]] = {}
+
+    for record in records:
+        code = normalize_course_code(str(record.get(code_key) or ""))
+        if not code:
+            continue
+        text = str(record.get("prerequisites") or record.get("requisites") or "")
+        # Sections of one course share their prerequisites; keep the first non-empty text
+        if code not in requirements or (text and requirements[code] is NO_REQUIREMENT):
+            requirements[code] = parse_requisites(text)
+
+        equivalent_text = str(record.get("equivalent_to") or "")
+        equivalent_codes = [
+            normalize_course_code(f"{match.group(1)} {match.group(2)}")
+            for match in PREREQ_CODE_PATTERN.finditer(equivalent_text) if match.group(1)
+        ]
+        if equivalent_codes:
+            # Merge equivalence groups so the relation is symmetric and transitive
+            group = {code, *equivalent_codes}
+            for member in list(group):
+                group |= groups.get(member, set())
+            for member in group:
+                groups[member] = group
+
+    equivalents = {code: group - {code} for code, group in groups.items()}
+    logger.info(f"Compiled prerequisites for {len(requirements)} courses, {len(equivalents)} with equivalents")
+    return PrerequisiteGraph(requirements, equivalents)
+
+
+@lru_cache(maxsize=1)
+def get_catalog_prerequisite_graph() -> PrerequisiteGraph:
+    """Prerequisite graph over the scraped business catalog, built once per process."""
+    return build_prerequisite_graph(get_catalog_courses())
+
+
+def filter_eligible_courses(courses: List[Dict[str, Any]], completed_courses: Iterable[str],
+                            graph: PrerequisiteGraph,
+                            standing: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Drops candidates the student can't take, or has already taken.
+
+    Args:
+        courses: Candidate course dicts with course_code and prerequisites
+        completed_courses: The student's completed course codes
+        graph: Prerequisite graph to check against
+        standing: Student standing level, None if unknown
+
+    Returns:
+        Tuple of (eligible courses, blocked courses), each in the original order
+    """
+    completed = graph.expand_completed(completed_courses)
+    eligible, blocked = [], []
+    for course in courses:
+        code = normalize_course_code(str(course.get("course_code") or ""))
+        if code in completed or not graph.is_eligible(code, completed, standing, course.get("prerequisites")):
+            blocked.append(course)
+        else:
+            eligible.append(course)
+    return eligible, blocked
@@ -0,0 +1,49 @@
+"""
+Profile Change Events for Academic Advisor
+A minimal publish/subscribe hook fired after a user's courses, majors or programs
+change. Services that own derived per-user state (precomputed recommendations)
+subscribe here, so the mutation services don't need to import them.
+
+Functions:
+- subscribe_profile_changes: Registers a listener called with the user ID
+- notify_profile_changed: Fires every listener for a user
+"""
+
+import logging
+import threading
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+_listeners: List[Callable[[int], None]] = []
+_listeners_lock = threading.Lock()
+
+
+def subscribe_profile_changes(listener: Callable[[int], None]):
+    """
+    Registers a listener for profile changes. Listeners must return quickly;
+    slow work belongs in a background thread.
+
+    Args:
+        listener: Called with the ID of the user whose profile changed
+    """
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def notify_profile_changed(user_id: int):
+    """
+    Tells every listener that a user's courses, majors or programs changed.
+    Call this after the change is committed. Listener errors are logged, never raised.
+
+    Args:
+        user_id: ID of the user
+    """
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(user_id)
+        except Exception as e:
+            logger.error(f"Profile change listener failed for user {user_id}: {e}")
@@ -6,6 +6,9 @@ from pathlib import Path
 
 from backend.core.database import UserProgram, User
 from backend.models.schemas import UserProgramCreate, UserProgramResponse
+from backend.services.degree_audit import audit_programs
+from backend.services.prerequisites import get_catalog_prerequisite_graph
+from backend.services.profile_events import notify_profile_changed
 
 """
 This file handles the user's academic programs (majors and minors).
@@ -18,6 +21,7 @@ Functions:
 - update_user_program: Updates a user's program
 - delete_user_program: Deletes a user's program
 - get_remaining_courses: Compares completed courses with required courses
+- render_courses_for_rag: Renders completed and required courses as RAG text
 - load_program_requirements: Loads program requirements from JSON files
 - get_available_programs: Lists all available programs
 - assign_program_to_user: Assigns a program to a user from available templates
@@ -122,6 +126,7 @@ def create_user_program(db: Session, user_id: int, program: UserProgramCreate):
     db.add(db_program)
     db.commit()
     db.refresh(db_program)
+    notify_profile_changed(user_id)
     return db_program
 
 def get_user_programs(db: Session, user_id: int):
@@ -178,6 +183,7 @@ def update_user_program(db: Session, user_id: int, program_name: str, updated_pr
     
     db.commit()
     db.refresh(program)
+    notify_profile_changed(user_id)
     return program
 
 def delete_user_program(db: Session, user_id: int, program_name: str):
@@ -198,6 +204,7 @@ def delete_user_program(db: Session, user_id: int, program_name: str):
     
     db.delete(program)
     db.commit()
+    notify_profile_changed(user_id)
     return True
 
 def get_required_and_completed_courses(db: Session, user_id: int):
@@ -238,38 +245,50 @@ def get_required_and_completed_courses(db: Session, user_id: int):
         "programs": required_by_program
     }
 
-def format_courses_for_rag(db: Session, user_id: int) -> str:
+def get_remaining_courses(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
     """
-    Formats the user's courses and programs information for the RAG system.
+    Compares completed courses with required courses using the degree audit engine.
     
     Args:
         db: Database session
         user_id: ID of the user
     
     Returns:
-        Formatted string for RAG
+        Dict with satisfied, partially satisfied and remaining requirements per program,
+        plus the course codes that would still count, or None if the user doesn't exist
     """
     data = get_required_and_completed_courses(db, user_id)
     if not data:
-        return "No user data found."
+        return None
     
-    # Get user info
-    user = db.query(User).filter(User.id == user_id).first()
+    completed_codes = [course["course_code"] for course in data["completed_courses"]]
+    return audit_programs(completed_codes, data["programs"], get_catalog_prerequisite_graph().equivalents)
+
+def render_courses_for_rag(completed_courses: List[Dict[str, Any]], programs: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Renders completed courses and program requirements as text for the RAG system.
     
+    Args:
+        completed_courses: List of dicts with a course_code key
+        programs: Dict of program name to program_type and required_courses
+    
+    Returns:
+        Formatted string for RAG
+    """
     # Format the data for RAG
     result = []
     result.append(f"The user has the following academic programs:")
     
-    for program_name, program_data in data["programs"].items():
+    for program_name, program_data in programs.items():
         program_type = program_data["program_type"].capitalize()
         result.append(f"- {program_type}: {program_name}")
     
     result.append("\nThey have completed these courses:")
-    for course in data["completed_courses"]:
+    for course in completed_courses:
         # For completed courses, just use the course code
         result.append(f"- {course['course_code']}")
     
-    for program_name, program_data in data["programs"].items():
+    for program_name, program_data in programs.items():
         program_type = program_data["program_type"].capitalize()
         result.append(f"\nThe required courses for their {program_name} {program_data['program_type']} include:")
         
@@ -298,4 +317,21 @@ def format_courses_for_rag(db: Session, user_id: int) -> str:
     
     result.append("\nIt is currently Spring 2025. Recommend which classes they should take next term to stay on track.")
     
-    return "\n".join(result) 
\ No newline at end of file
+    return "\n".join(result)
+
+def format_courses_for_rag(db: Session, user_id: int) -> str:
+    """
+    Formats the user's courses and programs information for the RAG system.
+    
+    Args:
+        db: Database session
+        user_id: ID of the user
+    
+    Returns:
+        Formatted string for RAG
+    """
+    data = get_required_and_completed_courses(db, user_id)
+    if not data:
+        return "No user data found."
+    
+    return render_courses_for_rag(data["completed_courses"], data["programs"])
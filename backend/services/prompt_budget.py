@@ -0,0 +1,258 @@
+"""
+Prompt Token Budgets for Academic Advisor
+The reasoning prompts carry the student's record and the candidate courses, and
+both grow with the student: a senior with several programs sends every program's
+full requirement list and every completed course. This module counts tokens with
+tiktoken and fits those prompts into a per-stage budget.
+
+Compaction keeps what the model needs to choose: requirements are reduced to the
+unmet ones from the degree audit, completed courses to one line, and candidate
+descriptions to a few tokens each. If that is still over budget, descriptions are
+shortened further and then the lowest-ranked candidates are dropped.
+
+Classes:
+- FittedPrompt: A prompt fitted to its budget, with the tokens it saved
+
+Functions:
+- count_tokens: Number of tokens in a text
+- truncate_to_tokens: Cuts a text to at most a number of tokens
+- compact_user_data: Student data reduced to what the reasoning stages use
+- fit_user_prompt: Fits a prompt around the student data to a stage's budget
+- fit_recommendation_prompt: Fits the rerank prompt to its budget
+"""
+
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.services.degree_audit import render_audit_for_rag
+from backend.services.user_context import UserAcademicContext
+
+logger = logging.getLogger(__name__)
+
+# Encoding of the gpt-4o and o1 model families
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+
+# Prompt token budget per stage; a stage without one is not fitted
+PROMPT_TOKEN_BUDGETS = {
+    "reason": int(os.getenv("REASON_PROMPT_TOKEN_BUDGET", "1500")),
+    "rerank": int(os.getenv("RERANK_PROMPT_TOKEN_BUDGET", "3000")),
+}
+
+# Tokens of each candidate's description in the rerank prompt, before any further shortening
+DESCRIPTION_TOKENS = int(os.getenv("PROMPT_DESCRIPTION_TOKENS", "30"))
+
+# Candidates the rerank prompt keeps however tight the budget
+MIN_PROMPT_CANDIDATES = int(os.getenv("MIN_PROMPT_CANDIDATES", "5"))
+
+# Rough size of a token in characters, used when the encoding can't be loaded
+CHARS_PER_TOKEN = 4
+
+_encoding: Any = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+@dataclass
+class FittedPrompt:
+    """A prompt fitted to its stage's budget."""
+
+    text: str
+    tokens: int
+    uncompacted_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.uncompacted_tokens - self.tokens, 0)
+
+
+def get_encoding() -> Any:
+    """
+    The tiktoken encoding, loaded once. tiktoken downloads encodings on first
+    use; where that fails, token counts fall back to a character estimate.
+
+    Returns:
+        The encoding, or None if it couldn't be loaded
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    logger.warning(f"Could not load the {TOKEN_ENCODING} encoding, estimating tokens from length: {e}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text, exact with tiktoken and estimated without."""
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "...") -> str:
+    """
+    Cuts text to at most max_tokens tokens, marking the cut.
+
+    Args:
+        text: Text to cut
+        max_tokens: Token limit; 0 or less returns an empty string
+        marker: Appended when text was cut
+
+    Returns:
+        The text, unchanged if it already fits
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+        # Don't end on half a word
+        if " " in cut:
+            cut = cut[:cut.rindex(" ")]
+        return cut.rstrip() + marker
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]).rstrip() + marker
+
+
+def compact_user_data(context: Optional[UserAcademicContext]) -> Optional[str]:
+    """
+    Student data reduced to what the reasoning stages use: majors, programs,
+    completed courses on one line, and only the unmet requirements. Full
+    requirement lists are left out; the degree audit already compared them with
+    the completed courses.
+
+    Args:
+        context: The student's academic context
+
+    Returns:
+        Compact student data, or None if there is no audit to compact from
+    """
+    if context is None or not context.audit or not context.audit.get("programs"):
+        return None
+
+    parts = [context.major_info]
+    programs = [
+        f"{program['program_type'].capitalize()}: {program['program_name']}"
+        for program in context.audit["programs"]
+    ]
+    parts.append("Programs: " + "; ".join(programs))
+    if context.completed_courses:
+        parts.append("Completed courses: " + ", ".join(context.completed_courses))
+    else:
+        parts.append("Completed courses: none yet")
+    parts.append(render_audit_for_rag(context.audit))
+    return "\n".join(parts)
+
+
+def fit_user_prompt(stage_name: str, render: Callable[[str], str], user_data: str,
+                    compact: Optional[str] = None) -> FittedPrompt:
+    """
+    Fits a prompt whose only variable-size part is the student data.
+
+    Args:
+        stage_name: Stage whose budget applies
+        render: Builds the prompt from student data
+        user_data: Full student data
+        compact: Compact student data, if available
+
+    Returns:
+        The fitted prompt
+    """
+    full = render(user_data)
+    full_tokens = count_tokens(full)
+    budget = PROMPT_TOKEN_BUDGETS.get(stage_name)
+    if budget is None:
+        return FittedPrompt(full, full_tokens, full_tokens)
+
+    text = render(compact) if compact else full
+    tokens = count_tokens(text) if compact else full_tokens
+    if tokens > budget:
+        data = compact or user_data
+        fixed = tokens - count_tokens(data)
+        text = render(truncate_to_tokens(data, max(budget - fixed, 0)))
+        tokens = count_tokens(text)
+    return FittedPrompt(text, tokens, full_tokens)
+
+
+def _course_line(index: int, course: Dict[str, Any], description_tokens: Optional[int]) -> str:
+    description = str(course.get("description") or "")
+    if description_tokens is not None:
+        description = truncate_to_tokens(description, description_tokens)
+    prerequisites = str(course.get("prerequisites") or "").strip() or "None"
+    line = f"{index}. {course.get('course_code', 'Unknown')} - {course.get('course_name', '')}"
+    if description:
+        line += f"\n   {description}"
+    return line + f"\n   Prerequisites: {prerequisites}"
+
+
+def _courses_text(courses: List[Dict[str, Any]], description_tokens: Optional[int]) -> str:
+    return "\n".join(_course_line(i + 1, course, description_tokens) for i, course in enumerate(courses))
+
+
+def fit_recommendation_prompt(render: Callable[[str, str], str], user_data: str,
+                              courses: List[Dict[str, Any]],
+                              compact: Optional[str] = None) -> FittedPrompt:
+    """
+    Fits the rerank prompt to the "rerank" budget. Steps, stopping once it fits:
+    compact the student data and cut descriptions to DESCRIPTION_TOKENS; halve
+    the descriptions until they're gone; drop the lowest-ranked candidates down
+    to MIN_PROMPT_CANDIDATES; cut the student data.
+
+    Args:
+        render: Builds the prompt from (student data, candidate list text)
+        user_data: Full student data
+        courses: Candidates, best-ranked first
+        compact: Compact student data, if available
+
+    Returns:
+        The fitted prompt
+    """
+    uncompacted_tokens = count_tokens(render(user_data, _courses_text(courses, None)))
+    budget = PROMPT_TOKEN_BUDGETS.get("rerank")
+    data = compact or user_data
+    description_tokens = DESCRIPTION_TOKENS
+    kept = len(courses)
+
+    def build() -> FittedPrompt:
+        text = render(data, _courses_text(courses[:kept], description_tokens))
+        return FittedPrompt(text, count_tokens(text), uncompacted_tokens)
+
+    fitted = build()
+    if budget is None:
+        return fitted
+
+    while fitted.tokens > budget and description_tokens > 0:
+        description_tokens = description_tokens // 2 if description_tokens > 4 else 0
+        fitted = build()
+
+    minimum = min(MIN_PROMPT_CANDIDATES, len(courses))
+    while fitted.tokens > budget and kept > minimum:
+        # Drop the candidates that cost the overage, at least one per pass
+        line_tokens = max(count_tokens(_course_line(kept, courses[kept - 1], description_tokens)), 1)
+        kept = max(kept - max((fitted.tokens - budget) // line_tokens, 1), minimum)
+        fitted = build()
+
+    if fitted.tokens > budget:
+        fixed = fitted.tokens - count_tokens(data)
+        data = truncate_to_tokens(data, max(budget - fixed, 0))
+        fitted = build()
+
+    if kept < len(courses):
+        logger.info(f"Rerank prompt kept {kept} of {len(courses)} candidates to fit {budget} tokens")
+    return fitted
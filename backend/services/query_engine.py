@@ -7,22 +7,50 @@ import os
 import re
 import logging
 import json
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor
-from langchain_pinecone import Pinecone
+import asyncio
+import time
+import threading
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import Document
-from pinecone import Pinecone as PineconeClient
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+from backend.core.database import SessionLocal
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # Import our services
-from backend.services.programs import format_courses_for_rag, get_required_and_completed_courses
-# Add back the majors import that was missing in paste 2
-from backend.services.majors import get_user_majors
+from backend.services.user_context import UserAcademicContext, build_user_context
+from backend.services.intent import (
+    classify_intent_locally, classify_category_locally, record_llm_fallback,
+    QUERY_CATEGORIES, DEFAULT_CATEGORY
+)
+from backend.services.response_cache import response_cache, normalize_query
+from backend.services.embedding_cache import CachedEmbeddings, normalize_text
+from backend.services.single_flight import SingleFlight
+from backend.services.concurrency import shared_executor, openai_http_clients, EXECUTOR_LIMITS
+from backend.services.course_catalog import (
+    extract_course_codes, get_catalog_courses, course_data_from_metadata, normalize_course_code
+)
+from backend.services.structured_output import (
+    SearchQueryPlan, CourseSelection, StructuredOutputError, STRUCTURED_REPAIR_ATTEMPTS,
+    MAX_SEARCH_QUERIES, MAX_SELECTED_COURSES,
+    response_format, supports_json_schema, parse_structured, build_repair_prompt, record_outcome
+)
+from backend.services.precompute import PrecomputedRecommendations, RecommendationPrecomputer
+from backend.services.profile_events import subscribe_profile_changes
+from backend.services.next_term import recommend_next_term, build_next_term_message
+from backend.services.prerequisites import PrerequisiteGraph, build_prerequisite_graph, filter_eligible_courses
+from backend.services.course_lookup import CourseIndex, CourseLookup, detect_lookup, build_lookup_message, build_lookup_prompt
+from backend.services.hybrid_retriever import (
+    HybridRetriever, reciprocal_rank_fusion, maximal_marginal_relevance, tokenize
+)
+from backend.services.prompt_budget import (
+    FittedPrompt, compact_user_data, fit_user_prompt, fit_recommendation_prompt, get_encoding
+)
+from backend.services.metrics import (
+    stage, current_stage, start_stage, finish_stage, record_tokens_saved, Counter, Gauge, LatencyWindow, REGISTRY
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -36,46 +64,337 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Define Pinecone index name
 INDEX_NAME = "duckweb-spring24"
 
-# Initialize Pinecone client
-pc = PineconeClient(api_key=PINECONE_API_KEY)
+# Vector backend: "pinecone" (default) or "local" for the in-process index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
 
-# Ensure index exists
-if INDEX_NAME not in pc.list_indexes().names():
-    raise ValueError(f"Pinecone index '{INDEX_NAME}' does not exist. Run `ingest_majors.py` first to create it.")
+# Define embedding model name
+EMBEDDING_MODEL = "text-embedding-3-small"
 
-# Initialize OpenAI embeddings
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model="text-embedding-3-small")
-
-# Initialize Pinecone vector store with proper text key
-vectorstore = Pinecone.from_existing_index(
-    index_name=INDEX_NAME,
-    embedding=embeddings,
-    text_key="class_code",  # Specify the text key to match our document structure
+# Initialize OpenAI embeddings behind the shared memory + disk embedding cache
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(
+        openai_api_key=OPENAI_API_KEY,
+        model=EMBEDDING_MODEL,
+        http_client=openai_http_clients()[0],
+        http_async_client=openai_http_clients()[1],
+    ),
+    model_name=EMBEDDING_MODEL,
 )
 
-# Create a retriever with search parameters
-retriever = vectorstore.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 5}  # Keep only the top 5 results
-)
+# Number of documents retrieved per search query. Hybrid retrieval is precise
+# enough that 4 documents per query cover what 5 vector-only results did.
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
 
-# Initialize LLM models
-intent_classifier = ChatOpenAI(
-    model="gpt-4o-mini",  # Faster model for intent classification
-    openai_api_key=OPENAI_API_KEY,
-    temperature=0.2
-)
+# Fuse BM25 and exact course-code lookups with the vector results
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
 
-reasoning_model = ChatOpenAI(
-    model="o1-mini",  # More powerful model for reasoning
-    openai_api_key=OPENAI_API_KEY,
-)
+# Vector candidates fetched per query for fusion before cutting to RETRIEVER_K
+HYBRID_CANDIDATE_K = RETRIEVER_K * 2
+
+# Drop candidates whose prerequisites the student hasn't met before prompting
+PREREQUISITE_FILTER = os.getenv("PREREQUISITE_FILTER", "true").lower() == "true"
+
+# Serve the default "next term" request with the deterministic recommender. It
+# needs section metadata (schedules, seats, prerequisites), which only the local
+# index carries, so it is off by default with Pinecone.
+NEXT_TERM_FAST_PATH = os.getenv(
+    "NEXT_TERM_FAST_PATH", "true" if VECTOR_BACKEND == "local" else "false"
+).lower() == "true"
+
+# Fewest fast-path recommendations worth returning; with fewer the pipeline answers
+NEXT_TERM_MIN_COURSES = int(os.getenv("NEXT_TERM_MIN_COURSES", "3"))
+
+# Let the response model phrase the fast path's message, at the cost of one LLM call
+NEXT_TERM_LLM_MESSAGE = os.getenv("NEXT_TERM_LLM_MESSAGE", "false").lower() == "true"
+
+# Answer direct questions about one course ("who teaches CS 315?") from the catalog
+LOOKUP_FAST_PATH = os.getenv("LOOKUP_FAST_PATH", "true").lower() == "true"
+
+# Let the intent model (the cheapest) phrase lookup answers instead of a template
+LOOKUP_LLM_MESSAGE = os.getenv("LOOKUP_LLM_MESSAGE", "false").lower() == "true"
 
-response_model = ChatOpenAI(
-    model="gpt-4o",  # Efficient model for responses
-    openai_api_key=OPENAI_API_KEY,
-    temperature=0.7  # Higher temperature for more natural responses
+# Cap on the fused multi-query candidates sent to the reasoning model
+MAX_COURSE_CANDIDATES = int(os.getenv("MAX_COURSE_CANDIDATES", "12"))
+
+# Optional MMR re-ranking of the fused candidates; lambda weighs relevance against novelty
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Retrieve for the raw query and the student's remaining requirements while the
+# reasoning model is still writing search queries
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+# Seconds to wait for the reasoning model before answering from speculative results
+# alone, used until enough reasoning calls were observed to derive the budget from
+SPECULATIVE_REASONING_BUDGET = float(os.getenv("SPECULATIVE_REASONING_BUDGET", "8"))
+# The derived budget is this quantile of recent reasoning latencies times the headroom,
+# kept within the bounds. A call cut off at the budget counts as taking all of it, so a
+# slowing model raises the budget instead of being cut off more and more often
+SPECULATIVE_BUDGET_QUANTILE = float(os.getenv("SPECULATIVE_BUDGET_QUANTILE", "0.9"))
+SPECULATIVE_BUDGET_HEADROOM = float(os.getenv("SPECULATIVE_BUDGET_HEADROOM", "1.25"))
+SPECULATIVE_BUDGET_MIN = float(os.getenv("SPECULATIVE_BUDGET_MIN", "2"))
+SPECULATIVE_BUDGET_MAX = float(os.getenv("SPECULATIVE_BUDGET_MAX", "20"))
+# Recent reasoning calls the budget is derived from, and how many it needs first
+SPECULATIVE_LATENCY_WINDOW = int(os.getenv("SPECULATIVE_LATENCY_WINDOW", "200"))
+SPECULATIVE_LATENCY_MIN_SAMPLES = int(os.getenv("SPECULATIVE_LATENCY_MIN_SAMPLES", "20"))
+# Remaining requirement courses looked up speculatively
+SPECULATIVE_REQUIREMENT_COURSES = int(os.getenv("SPECULATIVE_REQUIREMENT_COURSES", "8"))
+
+def _copy_documents(docs: List[Document]) -> List[Document]:
+    # Later stages annotate documents in place, so each caller gets its own copies
+    return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs]
+
+# Identical concurrent work is run once and shared: whole course pipelines keyed
+# on (user state fingerprint, normalized query), and per-query vector searches
+pipeline_flight = SingleFlight("pipeline")
+retrieval_flight = SingleFlight("retrieval", copy_result=_copy_documents)
+
+# External clients are created on first use through the accessors below, or by
+# warm_up at startup, so importing this module never touches the network.
+# Benchmarks may assign these globals directly to swap in other clients.
+pc = None
+vectorstore = None
+retriever = None
+intent_classifier = None
+reasoning_model = None
+speculative_reasoning_model = None
+response_model = None
+
+# Seconds the startup warm-up may take before readiness reports a timeout
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+# Readiness of each dependency: not_started, ready or error
+DEPENDENCIES = (
+    "vectorstore", "intent_classifier", "reasoning_model", "speculative_reasoning_model", "response_model", "corpus"
 )
+_dependency_state: Dict[str, Dict[str, Any]] = {name: {"status": "not_started"} for name in DEPENDENCIES}
+_warmup_state: Dict[str, Any] = {"status": "not_started"}
+_client_locks = {name: threading.Lock() for name in DEPENDENCIES}
+
+def _lazy_client(name: str, factory):
+    """Return the module global `name`, building it with factory on first use."""
+    client = globals()[name]
+    if client is not None:
+        return client
+    # Double-checked so concurrent first calls build the client once
+    with _client_locks[name]:
+        client = globals()[name]
+        if client is None:
+            started = time.perf_counter()
+            try:
+                client = factory()
+            except Exception as e:
+                _dependency_state[name] = {"status": "error", "error": str(e)}
+                raise
+            globals()[name] = client
+            _dependency_state[name] = {"status": "ready", "seconds": round(time.perf_counter() - started, 3)}
+    return client
+
+def _create_vectorstore():
+    global pc
+    if VECTOR_BACKEND == "local":
+        # Memory-mapped local index built by scripts/build_local_index.py; no network needed
+        from backend.services.vector_store import LocalVectorStore, LOCAL_VECTOR_INDEX_DIR
+        return LocalVectorStore.load(LOCAL_VECTOR_INDEX_DIR, embedding=embeddings)
+    
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone as PineconeClient
+    
+    # Initialize Pinecone client
+    pc = PineconeClient(api_key=PINECONE_API_KEY)
+    
+    # Ensure index exists
+    if INDEX_NAME not in pc.list_indexes().names():
+        raise ValueError(f"Pinecone index '{INDEX_NAME}' does not exist. Run `ingest_majors.py` first to create it.")
+    
+    # One keep-alive connection per concurrent vector search the executor allows
+    index = pc.Index(
+        INDEX_NAME,
+        pool_threads=EXECUTOR_LIMITS["vector"],
+        connection_pool_maxsize=EXECUTOR_LIMITS["vector"],
+    )
+    
+    # Initialize Pinecone vector store with proper text key
+    return PineconeVectorStore(
+        index=index,
+        embedding=embeddings,
+        text_key="class_code",  # Specify the text key to match our document structure
+    )
+
+def get_vectorstore():
+    """Return the course vector store, connecting on first use."""
+    return _lazy_client("vectorstore", _create_vectorstore)
+
+def get_retriever():
+    """Return a similarity retriever over the vector store."""
+    global retriever
+    if retriever is None:
+        retriever = get_vectorstore().as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": RETRIEVER_K}  # Keep only the top RETRIEVER_K results
+        )
+    return retriever
+
+def get_intent_classifier() -> ChatOpenAI:
+    """Return the intent classification model, creating it on first use."""
+    return _lazy_client("intent_classifier", lambda: ChatOpenAI(
+        model="gpt-4o-mini",  # Faster model for intent classification
+        openai_api_key=OPENAI_API_KEY,
+        temperature=0.2,
+        http_client=openai_http_clients()[0],
+        http_async_client=openai_http_clients()[1],
+    ))
+
+def get_reasoning_model() -> ChatOpenAI:
+    """Return the reasoning model, creating it on first use."""
+    return _lazy_client("reasoning_model", lambda: ChatOpenAI(
+        model="o1-mini",  # More powerful model for reasoning
+        openai_api_key=OPENAI_API_KEY,
+        http_client=openai_http_clients()[0],
+        http_async_client=openai_http_clients()[1],
+    ))
+
+def get_speculative_reasoning_model() -> ChatOpenAI:
+    """
+    Return the reasoning model for calls with a deadline, creating it on first use.
+    It doesn't retry, so a call given the time left as its timeout ends by the deadline.
+    """
+    return _lazy_client("speculative_reasoning_model", lambda: ChatOpenAI(
+        model="o1-mini",
+        openai_api_key=OPENAI_API_KEY,
+        max_retries=0,
+        http_client=openai_http_clients()[0],
+        http_async_client=openai_http_clients()[1],
+    ))
+
+def get_response_model() -> ChatOpenAI:
+    """Return the model writing student-facing responses, creating it on first use."""
+    return _lazy_client("response_model", lambda: ChatOpenAI(
+        model="gpt-4o",  # Efficient model for responses
+        openai_api_key=OPENAI_API_KEY,
+        temperature=0.7,  # Higher temperature for more natural responses
+        stream_usage=True,  # Report token usage on streamed replies too
+        http_client=openai_http_clients()[0],
+        http_async_client=openai_http_clients()[1],
+    ))
+
+def _record_model_usage(model: ChatOpenAI, response):
+    # Attribute the call's tokens and cost to the running pipeline stage
+    record = current_stage()
+    if record is not None:
+        record.record_usage(response, getattr(model, "model_name", None))
+
+def _invoke_model(model: ChatOpenAI, prompt: str, **kwargs):
+    """Call a chat model and record its token usage on the current metrics stage."""
+    response = model.invoke(prompt, **kwargs)
+    _record_model_usage(model, response)
+    return response
+
+async def _ainvoke_model(model: ChatOpenAI, prompt: str, **kwargs):
+    """Async version of _invoke_model."""
+    response = await model.ainvoke(prompt, **kwargs)
+    _record_model_usage(model, response)
+    return response
+
+def _past(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.perf_counter() >= deadline
+
+def _deadline_kwargs(deadline: Optional[float]) -> Dict[str, Any]:
+    # Request timeout of a call that must end by the deadline (a time.perf_counter() value)
+    return {} if deadline is None else {"timeout": max(deadline - time.perf_counter(), 0.001)}
+
+def _structured_kwargs(model: ChatOpenAI, schema) -> Dict[str, Any]:
+    # Native JSON-schema output where the model supports it; otherwise the prompt asks for the JSON
+    return {"response_format": response_format(schema)} if supports_json_schema(model) else {}
+
+def _invoke_structured(model: ChatOpenAI, prompt: str, schema, stage_name: str, validate=None,
+                       deadline: Optional[float] = None):
+    """
+    Call a model for a JSON object matching schema. Output that doesn't validate
+    is sent, with the error, to the intent classifier model for repair, at most
+    STRUCTURED_REPAIR_ATTEMPTS times.
+    
+    Args:
+        model: Model answering the prompt
+        prompt: Prompt asking for the schema's JSON
+        schema: Pydantic model the answer must match
+        stage_name: Stage the outcome is counted against
+        validate: Further checks passed to parse_structured (optional)
+        deadline: time.perf_counter() value the calls must end by; each call
+            times out at it and no repair starts after it (optional)
+    
+    Returns:
+        The validated object, or None if repair failed too
+    """
+    output = _invoke_model(model, prompt, **_structured_kwargs(model, schema), **_deadline_kwargs(deadline)).content
+    try:
+        result = parse_structured(output, schema, validate)
+        record_outcome(stage_name, "valid")
+        return result
+    except StructuredOutputError as e:
+        first_error = error = str(e)
+    
+    repair_model = get_intent_classifier()
+    for _ in range(STRUCTURED_REPAIR_ATTEMPTS):
+        if _past(deadline):
+            break
+        with stage("repair"):
+            output = _invoke_model(
+                repair_model, build_repair_prompt(schema, output, error),
+                **_structured_kwargs(repair_model, schema), **_deadline_kwargs(deadline)
+            ).content
+        try:
+            result = parse_structured(output, schema, validate)
+            record_outcome(stage_name, "repaired", first_error)
+            return result
+        except StructuredOutputError as e:
+            error = str(e)
+    record_outcome(stage_name, "failed", first_error)
+    return None
+
+async def _ainvoke_structured(model: ChatOpenAI, prompt: str, schema, stage_name: str, validate=None):
+    """Async version of _invoke_structured."""
+    output = (await _ainvoke_model(model, prompt, **_structured_kwargs(model, schema))).content
+    try:
+        result = parse_structured(output, schema, validate)
+        record_outcome(stage_name, "valid")
+        return result
+    except StructuredOutputError as e:
+        first_error = error = str(e)
+    
+    repair_model = get_intent_classifier()
+    for _ in range(STRUCTURED_REPAIR_ATTEMPTS):
+        with stage("repair"):
+            output = (await _ainvoke_model(
+                repair_model, build_repair_prompt(schema, output, error), **_structured_kwargs(repair_model, schema)
+            )).content
+        try:
+            result = parse_structured(output, schema, validate)
+            record_outcome(stage_name, "repaired", first_error)
+            return result
+        except StructuredOutputError as e:
+            error = str(e)
+    record_outcome(stage_name, "failed", first_error)
+    return None
+
+async def _astream_model(model: ChatOpenAI, prompt: str, stage_name: str) -> AsyncIterator[str]:
+    """
+    Stream a chat model's reply as text deltas, recording its token usage on a
+    metrics stage timed across the whole stream.
+    """
+    # Explicit start/finish: a stage context would leak to the consumer at each yield
+    record = start_stage(stage_name, getattr(model, "model_name", None))
+    aggregate = None
+    status = "error"
+    try:
+        async for chunk in model.astream(prompt):
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            if chunk.content:
+                yield chunk.content
+        status = "ok"
+    finally:
+        if aggregate is not None:
+            record.record_usage(aggregate, getattr(model, "model_name", None))
+        finish_stage(record, status)
 
 # Enhanced Intent Classification Prompt
 INTENT_CLASSIFICATION_PROMPT = """
@@ -100,7 +419,40 @@ CRITICAL GUIDANCE:
 Respond with exactly one word: either COURSE or GENERAL.
 """
 
+# Combined intent + category prompt, so the acknowledgment needs no second call
+QUERY_CLASSIFICATION_PROMPT = """
+You are an academic advising system assistant analyzing student queries to determine what they need help with.
+
+Student query: {query}
+
+1. Classify the intent as ONE of:
+- COURSE: Any query related to course recommendations, prerequisites, scheduling, degree requirements, or specific course information.
+- GENERAL: Only purely conversational exchanges with NO academic content whatsoever. When in doubt, choose COURSE.
+
+2. If the intent is COURSE, choose the ONE category that best describes what the student is looking for:
+- COURSE_RECOMMENDATION: Seeking course suggestions
+- PREREQUISITE_CHECK: Asking about prerequisites
+- SCHEDULE_PLANNING: Concerned about scheduling
+- DEGREE_PROGRESS: Asking about graduation requirements
+- COURSE_DETAILS: Asking about specific course information
+- MAJOR_REQUIREMENTS: Asking about major-specific courses or requirements
+
+Respond with only a JSON object, for example: {{"intent": "COURSE", "category": "PREREQUISITE_CHECK"}}
+"""
+
+# Acknowledgments shown while a COURSE query is processed, by category
+ACKNOWLEDGMENTS = {
+    "PREREQUISITE_CHECK": "Checking prerequisites and course sequences for you... 📋",
+    "SCHEDULE_PLANNING": "Analyzing your schedule to find compatible courses... ⏰",
+    "DEGREE_PROGRESS": "Reviewing your degree requirements and progress... 🎓",
+    "COURSE_DETAILS": "Looking up those course details for you... 📚",
+    "MAJOR_REQUIREMENTS": "Checking your major requirements and progress... 📝",
+    "COURSE_RECOMMENDATION": "On it! Searching for course recommendations that match your academic plan... 🔍",
+}
+
 # Reasoning Prompt - Updated to include major requirements
+# Instructions come before the student data so every request shares the same
+# prompt prefix, which the provider can cache
 REASONING_PROMPT = """
 You are an academic advisor who will be retrieving information and formulating recommendations for the given student.
 
@@ -110,14 +462,30 @@ You need to determine the best courses for this student based on:
 - Course prerequisites and availability
 - How courses fit into their academic plan
 
+Analyze what this student needs and generate 3-5 specific search queries that would find the most relevant courses.
+Each query should target a different aspect of what the student needs, including major requirements if applicable.
+
+Respond with only a JSON object, for example: {{"search_queries": ["upper division data structures courses", "statistics electives"]}}
+
 {user_data}
 
 Student query: {query}
+"""
 
-Analyze what this student needs and generate 3-5 specific search queries that would find the most relevant courses.
-Each query should target a different aspect of what the student needs, including major requirements if applicable.
+# Recommendation Prompt - picks 3-5 of the candidates; instructions come first
+# here too, so every rerank request shares the same prompt prefix
+RECOMMENDATION_PROMPT = """
+You are an academic advisor helping a student choose courses. Based on the student's query, academic history, and major requirements, recommend 3-5 courses from the available courses listed below.
+
+Respond with only a JSON object listing the course codes of your recommended courses, best first, for example: {{"course_codes": ["CS 101", "MATH 210", "CS 215"]}}
+
+STUDENT ACADEMIC INFORMATION:
+{user_data}
+
+AVAILABLE COURSES:
+{courses_text}
 
-SEARCH QUERIES:
+STUDENT QUERY: {query}
 """
 
 # Final Response Prompt - Updated to reference major requirements
@@ -139,29 +507,25 @@ Create a brief, friendly response (1-3 sentences max) that:
 Do NOT list the courses in your response - they will be displayed separately. Focus on being encouraging and helpful.
 """
 
-# Add the major formatting function from paste 1
-def format_major_info(majors):
-    """
-    Format user majors for inclusion in the RAG context.
-    
-    Args:
-        majors: List of Major objects
-        
-    Returns:
-        Formatted string with major information
-    """
-    if not majors:
-        return "Majors: None declared"
+def parse_intent_response(text: str, query: str) -> str:
+    """Normalize the intent classifier's response, defaulting to COURSE if it is unclear."""
+    intent = text.strip().upper()
     
-    major_names = [major.name for major in majors]
-    if len(major_names) == 1:
-        return f"Major: {major_names[0]}"
+    if "COURSE" in intent:
+        logger.info(f"Classified as COURSE: {query[:50]}...")
+        return "COURSE"
+    elif "GENERAL" in intent:
+        logger.info(f"Classified as GENERAL: {query[:50]}...")
+        return "GENERAL"
     else:
-        return f"Majors: {', '.join(major_names[:-1])} and {major_names[-1]}"
+        logger.warning(f"Unclear classification result: '{intent}' - defaulting to COURSE")
+        return "COURSE"
 
 def classify_intent(query: str) -> str:
     """
-    Classify if the query is course-related or general conversation using only LLM classification.
+    Classify if the query is course-related or general conversation.
+    Confident cases are decided by the local classifier; only ambiguous
+    queries are sent to the LLM.
     
     Args:
         query: The student's query
@@ -169,77 +533,141 @@ def classify_intent(query: str) -> str:
     Returns:
         String indicating "COURSE" or "GENERAL"
     """
-    try:
-        prompt = INTENT_CLASSIFICATION_PROMPT.format(query=query)
-        response = intent_classifier.invoke(prompt)
+    with stage("classify"):
+        local_intent = classify_intent_locally(query)
+        if local_intent:
+            logger.info(f"Locally classified as {local_intent}: {query[:50]}...")
+            return local_intent
         
-        # Extract the response and normalize
-        intent = response.content.strip().upper()
-        
-        # Default to COURSE if response is unclear
-        if "COURSE" in intent:
-            logger.info(f"Classified as COURSE: {query[:50]}...")
+        record_llm_fallback()
+        try:
+            prompt = INTENT_CLASSIFICATION_PROMPT.format(query=query)
+            response = _invoke_model(get_intent_classifier(), prompt)
+            return parse_intent_response(response.content, query)
+        except Exception as e:
+            logger.error(f"Error in intent classification: {e}")
+            # Default to COURSE in case of errors
             return "COURSE"
-        elif "GENERAL" in intent:
-            logger.info(f"Classified as GENERAL: {query[:50]}...")
-            return "GENERAL"
-        else:
-            logger.warning(f"Unclear classification result: '{intent}' - defaulting to COURSE")
+
+async def aclassify_intent(query: str) -> str:
+    """Async version of classify_intent."""
+    with stage("classify"):
+        local_intent = classify_intent_locally(query)
+        if local_intent:
+            logger.info(f"Locally classified as {local_intent}: {query[:50]}...")
+            return local_intent
+        
+        record_llm_fallback()
+        try:
+            prompt = INTENT_CLASSIFICATION_PROMPT.format(query=query)
+            response = await _ainvoke_model(get_intent_classifier(), prompt)
+            return parse_intent_response(response.content, query)
+        except Exception as e:
+            logger.error(f"Error in intent classification: {e}")
             return "COURSE"
-            
-    except Exception as e:
-        logger.error(f"Error in intent classification: {e}")
-        # Default to COURSE in case of errors
-        return "COURSE"
 
-def generate_acknowledgment(query: str) -> str:
-    """Generate a contextual acknowledgment message based on the query"""
-    # Use the LLM to determine the exact type of request
-    prompt = f"""
-    The student asked: "{query}"
+def parse_query_classification(text: str) -> Tuple[str, str]:
+    """
+    Parse the combined classification response into (intent, category).
+    Falls back to keyword matching when the response is not valid JSON.
+    """
+    intent, category = None, None
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    try:
+        data = json.loads(match.group(0))
+        intent = str(data.get("intent", "")).strip().upper() or None
+        category = str(data.get("category", "")).strip().upper() or None
+    except (ValueError, AttributeError):
+        upper_text = text.upper()
+        intent = "GENERAL" if "GENERAL" in upper_text and "COURSE_" not in upper_text else "COURSE"
+        category = next((c for c in QUERY_CATEGORIES if c in upper_text), None)
     
-    What kind of information is the student looking for? Choose ONE of:
-    1. COURSE_RECOMMENDATION: Seeking course suggestions
-    2. PREREQUISITE_CHECK: Asking about prerequisites
-    3. SCHEDULE_PLANNING: Concerned about scheduling
-    4. DEGREE_PROGRESS: Asking about graduation requirements
-    5. COURSE_DETAILS: Asking about specific course information
-    6. MAJOR_REQUIREMENTS: Asking about major-specific courses or requirements
+    if intent not in ("COURSE", "GENERAL"):
+        intent = "COURSE"
+    if category not in QUERY_CATEGORIES:
+        category = DEFAULT_CATEGORY
+    return intent, category
+
+def classify_query_locally(query: str) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+    """
+    Run the local classifiers for classify_query.
     
-    Respond with only the category name.
+    Returns:
+        Tuple of (final (intent, category) if the LLM isn't needed, local category guess)
     """
+    local_intent = classify_intent_locally(query)
+    local_category = classify_category_locally(query)
     
-    try:
-        response = intent_classifier.invoke(prompt)
-        detailed_intent = response.content.strip().upper()
-    except:
-        detailed_intent = "COURSE_RECOMMENDATION"  # Default if classification fails
-    
-    # Generate acknowledgment based on intent
-    if "PREREQUISITE" in detailed_intent:
-        return "Checking prerequisites and course sequences for you... 📋"
-    elif "SCHEDULE" in detailed_intent:
-        return "Analyzing your schedule to find compatible courses... ⏰"
-    elif "DEGREE" in detailed_intent or "PROGRESS" in detailed_intent:
-        return "Reviewing your degree requirements and progress... 🎓"
-    elif "DETAILS" in detailed_intent:
-        return "Looking up those course details for you... 📚"
-    elif "MAJOR" in detailed_intent:
-        return "Checking your major requirements and progress... 📝"
-    else:
-        return "On it! Searching for course recommendations that match your academic plan... 🔍"
+    if local_intent == "GENERAL":
+        return ("GENERAL", DEFAULT_CATEGORY), local_category
+    if local_intent == "COURSE":
+        # The category only picks the acknowledgment text, so a default is good enough
+        return ("COURSE", local_category or DEFAULT_CATEGORY), local_category
+    return None, local_category
 
-def process_general_query(query: str) -> str:
+def classify_query(query: str) -> Tuple[str, str]:
     """
-    Process general conversation queries with a friendly response.
+    Determine both the top-level intent and the detailed category of a query.
+    Uses the local classifiers when they are confident and at most one LLM call otherwise.
     
     Args:
-        query: The student's general query
+        query: The student's query
         
     Returns:
-        A friendly response
+        Tuple of ("COURSE" or "GENERAL", category from QUERY_CATEGORIES)
+    """
+    with stage("classify"):
+        decided, local_category = classify_query_locally(query)
+        if decided:
+            return decided
+        
+        record_llm_fallback()
+        try:
+            prompt = QUERY_CLASSIFICATION_PROMPT.format(query=query)
+            response = _invoke_model(get_intent_classifier(), prompt)
+            intent, category = parse_query_classification(response.content)
+            if local_category:
+                category = local_category
+            logger.info(f"Classified as {intent}/{category}: {query[:50]}...")
+            return intent, category
+        except Exception as e:
+            logger.error(f"Error in query classification: {e}")
+            # Default to COURSE in case of errors
+            return "COURSE", local_category or DEFAULT_CATEGORY
+
+async def aclassify_query(query: str) -> Tuple[str, str]:
+    """Async version of classify_query."""
+    with stage("classify"):
+        decided, local_category = classify_query_locally(query)
+        if decided:
+            return decided
+        
+        record_llm_fallback()
+        try:
+            prompt = QUERY_CLASSIFICATION_PROMPT.format(query=query)
+            response = await _ainvoke_model(get_intent_classifier(), prompt)
+            intent, category = parse_query_classification(response.content)
+            if local_category:
+                category = local_category
+            logger.info(f"Classified as {intent}/{category}: {query[:50]}...")
+            return intent, category
+        except Exception as e:
+            logger.error(f"Error in query classification: {e}")
+            return "COURSE", local_category or DEFAULT_CATEGORY
+
+def generate_acknowledgment(query: str, category: Optional[str] = None) -> str:
+    """
+    Generate a contextual acknowledgment message based on the query category.
+    No LLM call is made: the category comes from classify_query or the local classifier.
     """
-    prompt = f"""
+    with stage("acknowledge"):
+        if not category:
+            category = classify_category_locally(query) or DEFAULT_CATEGORY
+        return ACKNOWLEDGMENTS.get(category, ACKNOWLEDGMENTS[DEFAULT_CATEGORY])
+
+def build_general_prompt(query: str) -> str:
+    """Build the prompt used to answer general conversation queries."""
+    return f"""
     You are a friendly academic advisor chatbot. The student has asked a general question (not specifically about courses).
     Respond in a friendly, helpful way. Keep your response concise and natural.
     
@@ -247,8 +675,25 @@ def process_general_query(query: str) -> str:
     
     Student query: {query}
     """
+
+def process_general_query(query: str) -> str:
+    """
+    Process general conversation queries with a friendly response.
     
-    response = response_model.invoke(prompt)
+    Args:
+        query: The student's general query
+        
+    Returns:
+        A friendly response
+    """
+    with stage("respond"):
+        response = _invoke_model(get_response_model(), build_general_prompt(query))
+    return response.content.strip()
+
+async def aprocess_general_query(query: str) -> str:
+    """Async version of process_general_query."""
+    with stage("respond"):
+        response = await _ainvoke_model(get_response_model(), build_general_prompt(query))
     return response.content.strip()
 
 def debug_print_document(doc, prefix="DEBUG DOCUMENT"):
@@ -260,351 +705,765 @@ def debug_print_document(doc, prefix="DEBUG DOCUMENT"):
     except Exception as e:
         logger.info(f"{prefix} - ERROR printing document: {str(e)}")
 
-def extract_search_queries(reasoning_output: str) -> List[str]:
+def format_retrieved_documents(docs: List[Document]) -> List[Document]:
+    """
+    Rewrite retrieved documents so page_content includes all course fields
+    and every document carries a usable class_code.
     """
-    Extract search queries from the reasoning model's output.
+    # Log metadata structure for debugging
+    if docs:
+        logger.info(f"First document metadata keys: {list(docs[0].metadata.keys())}")
     
-    Args:
-        reasoning_output: The output from the reasoning model
+    # Format each document to include all available fields
+    for doc in docs:
+        # All fields are available directly in doc.metadata
+        formatted_content = f"""
+        Course: {doc.metadata.get('class_code', 'Unknown')}
+        Credits: {doc.metadata.get('credits', '')}
+        Description: {doc.metadata.get('description', '')}
+        Prerequisites: {doc.metadata.get('prerequisites', '')}
+        Instructor: {doc.metadata.get('instructor', '')}
+        Schedule: {doc.metadata.get('days', '')} at {doc.metadata.get('time', '')}
+        Location: {doc.metadata.get('classroom', '')}
+        Seats Available: {doc.metadata.get('available_seats', '')}
+        Total Seats: {doc.metadata.get('total_seats', '')}
+        """
+        doc.page_content = formatted_content.strip()
         
-    Returns:
-        List of search queries
-    """
-    queries = []
-    
-    # Look for the SEARCH QUERIES section
-    if "SEARCH QUERIES:" in reasoning_output:
-        # Extract the section after SEARCH QUERIES:
-        search_section = reasoning_output.split("SEARCH QUERIES:")[1].split("REASONING:")[0].strip()
-        
-        # Parse each line that might be a query
-        lines = search_section.split("\n")
-        for line in lines:
-            line = line.strip()
-            # Match both numbered (1. query) and bullet point (* query) formats
-            if line and (
-                (line[0].isdigit() and line[1:3] in [". ", ") "]) or
-                line.startswith("* ") or line.startswith("- ")
-            ):
-                # Extract the query part
-                if line[0].isdigit():
-                    query = line[line.index(" ")+1:].strip()
-                else:
-                    query = line[2:].strip()
+        # Ensure document has a valid class_code in its metadata
+        if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
+            # Try to extract from page_content if missing
+            course_line = doc.page_content.strip().split('\n')[0]
+            if 'Course:' in course_line:
+                extracted_code = course_line.split('Course:')[1].strip()
+                if extracted_code != 'Unknown':
+                    doc.metadata['class_code'] = extracted_code
+            
+            # If still no class_code, create an artificial one
+            if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
+                # Try to use some other field as the identifier
+                for key in ['id', 'course_code', 'title']:
+                    if key in doc.metadata and doc.metadata[key]:
+                        doc.metadata['class_code'] = str(doc.metadata[key])
+                        break
                 
-                if query and not query.startswith("[") and len(query) > 5:
-                    queries.append(query)
+                # Last resort - create a synthetic ID
+                if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
+                    doc.metadata['class_code'] = f"SYN-{hash(doc.page_content) % 10000}"
     
-    # If no queries found with the structured format, try to extract any lines that look like queries
-    if not queries:
-        lines = reasoning_output.split("\n")
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Query:") or line.startswith("Search for:"):
-                query = line.split(":", 1)[1].strip()
-                if len(query) > 5:  # Ensure it's not too short
-                    queries.append(query)
-    
-    # Fallback: if still no queries, use parts of the reasoning text
-    if not queries and len(reasoning_output) > 30:
-        # Just use the first paragraph as a query
-        first_para = reasoning_output[:200].replace("\n", " ")
-        queries.append(first_para)
-    
-    return queries[:5]  # Limit to 5 queries
+    return docs
 
 def execute_rag_query(search_query: str) -> List[Document]:
     """
     Execute a RAG query to retrieve relevant documents.
     """
     try:
-        docs = retriever.get_relevant_documents(search_query)
+        docs = get_retriever().get_relevant_documents(search_query)
         logger.info(f"Retrieved {len(docs)} documents for query: {search_query[:50]}...")
-        
-        # Log metadata structure for debugging
-        if docs:
-            logger.info(f"First document metadata keys: {list(docs[0].metadata.keys())}")
-        
-        # Format each document to include all available fields
-        for doc in docs:
-            # All fields are available directly in doc.metadata
-            formatted_content = f"""
-            Course: {doc.metadata.get('class_code', 'Unknown')}
-            Credits: {doc.metadata.get('credits', '')}
-            Description: {doc.metadata.get('description', '')}
-            Prerequisites: {doc.metadata.get('prerequisites', '')}
-            Instructor: {doc.metadata.get('instructor', '')}
-            Schedule: {doc.metadata.get('days', '')} at {doc.metadata.get('time', '')}
-            Location: {doc.metadata.get('classroom', '')}
-            Seats Available: {doc.metadata.get('available_seats', '')}
-            Total Seats: {doc.metadata.get('total_seats', '')}
-            """
-            doc.page_content = formatted_content.strip()
-            
-            # Ensure document has a valid class_code in its metadata
-            if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
-                # Try to extract from page_content if missing
-                course_line = doc.page_content.strip().split('\n')[0]
-                if 'Course:' in course_line:
-                    extracted_code = course_line.split('Course:')[1].strip()
-                    if extracted_code != 'Unknown':
-                        doc.metadata['class_code'] = extracted_code
-                
-                # If still no class_code, create an artificial one
-                if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
-                    # Try to use some other field as the identifier
-                    for key in ['id', 'course_code', 'title']:
-                        if key in doc.metadata and doc.metadata[key]:
-                            doc.metadata['class_code'] = str(doc.metadata[key])
-                            break
-                    
-                    # Last resort - create a synthetic ID
-                    if 'class_code' not in doc.metadata or not doc.metadata['class_code']:
-                        doc.metadata['class_code'] = f"SYN-{hash(doc.page_content) % 10000}"
-        
-        return docs
+        return format_retrieved_documents(docs)
     except Exception as e:
         logger.error(f"Error in RAG query execution: {e}")
         return []
 
-def optimized_course_search(db: Session, user_id: int, query: str) -> List[Document]:
+_hybrid_retriever: Optional[HybridRetriever] = None
+_prerequisite_graph: Optional[PrerequisiteGraph] = None
+_course_index: Optional[CourseIndex] = None
+_corpus_lock = threading.Lock()
+
+def _section_records() -> Optional[List[dict]]:
+    # Section metadata (schedules, seats, instructors) comes only with the local index
+    return getattr(get_vectorstore(), "metadatas", None) or None
+
+def _course_records() -> List[dict]:
+    # The local vector index carries its own corpus; with Pinecone the scraped catalog stands in
+    return _section_records() or get_catalog_courses()
+
+def get_hybrid_retriever() -> Optional[HybridRetriever]:
+    """Return the lexical side of hybrid retrieval, building it on first use."""
+    global _hybrid_retriever
+    if not HYBRID_RETRIEVAL:
+        return None
+    if _hybrid_retriever is None:
+        with _corpus_lock:
+            if _hybrid_retriever is None:
+                sections = _section_records()
+                _hybrid_retriever = HybridRetriever(sections or get_catalog_courses(),
+                                                    covers_vector_corpus=sections is not None)
+    return _hybrid_retriever
+
+def get_prerequisite_graph() -> PrerequisiteGraph:
+    """Return the compiled prerequisite graph of the course corpus, building it on first use."""
+    global _prerequisite_graph
+    if _prerequisite_graph is None:
+        with _corpus_lock:
+            if _prerequisite_graph is None:
+                _prerequisite_graph = build_prerequisite_graph(_course_records())
+    return _prerequisite_graph
+
+def get_course_index() -> CourseIndex:
+    """Return the catalog sections by course code, building the index on first use."""
+    global _course_index
+    if _course_index is None:
+        with _corpus_lock:
+            if _course_index is None:
+                _course_index = CourseIndex(_course_records())
+    return _course_index
+
+def warm_up() -> Dict[str, Any]:
     """
-    Perform optimized course search to find relevant courses.
-    Includes major information in the search context.
+    Create every external client and build the corpus indexes now, so the first
+    request doesn't pay for them. Failures are logged and left for the
+    accessors to retry on first use.
+    
+    Returns:
+        The readiness report from dependency_status
     """
-    # Get user course data for RAG
-    course_data = format_courses_for_rag(db, user_id)
+    started = time.perf_counter()
+    _warmup_state["status"] = "running"
+    for accessor in (get_vectorstore, get_intent_classifier, get_reasoning_model,
+                     get_speculative_reasoning_model, get_response_model):
+        try:
+            accessor()
+        except Exception as e:
+            logger.error(f"Warm-up failed in {accessor.__name__}: {e}")
+    
+    if vectorstore is not None:
+        corpus_started = time.perf_counter()
+        try:
+            get_hybrid_retriever()
+            get_prerequisite_graph()
+            get_course_index()
+            get_encoding()
+            _dependency_state["corpus"] = {"status": "ready", "seconds": round(time.perf_counter() - corpus_started, 3)}
+        except Exception as e:
+            logger.error(f"Warm-up failed building corpus indexes: {e}")
+            _dependency_state["corpus"] = {"status": "error", "error": str(e)}
     
-    # Get and format user major information
-    majors = get_user_majors(db, user_id)
-    major_info = format_major_info(majors)
+    _warmup_state.update(status="done", seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"Query engine warm-up finished in {_warmup_state['seconds']}s")
+    return dependency_status()
+
+async def awarm_up(timeout: float = WARMUP_TIMEOUT) -> bool:
+    """
+    Run warm_up in a worker thread, waiting at most timeout seconds. After a
+    timeout the thread keeps going and readiness reports when it is done.
     
-    # Combine course and major information for the user context
-    user_data = f"{major_info}\n\n{course_data}"
-    logger.info(f"User context includes: {major_info}")
+    Returns:
+        True if warm-up finished within the timeout
+    """
+    try:
+        await asyncio.wait_for(asyncio.to_thread(warm_up), timeout)
+        return True
+    except asyncio.TimeoutError:
+        _warmup_state["status"] = "timeout"
+        logger.warning(f"Query engine warm-up still running after {timeout}s")
+        return False
+
+def dependency_status() -> Dict[str, Any]:
+    """
+    Report whether the query engine's dependencies are up, for the readiness endpoint.
     
-    # Generate search queries
-    reasoning_prompt = REASONING_PROMPT.format(
-        query=query,
-        user_data=user_data
-    )
+    Returns:
+        {"ready": bool, "warmup": {...}, "dependencies": {name: {"status": ...}}}
+    """
+    dependencies = {}
+    for name in DEPENDENCIES:
+        state = dict(_dependency_state[name])
+        # Clients assigned directly, or corpus indexes built lazily, count as ready too
+        if name == "corpus":
+            built = (_prerequisite_graph is not None and _course_index is not None
+                     and (_hybrid_retriever is not None or not HYBRID_RETRIEVAL))
+        else:
+            built = globals()[name] is not None
+        if built:
+            state["status"] = "ready"
+        dependencies[name] = state
+    return {
+        "ready": all(state["status"] == "ready" for state in dependencies.values()),
+        "warmup": dict(_warmup_state),
+        "dependencies": dependencies,
+    }
+
+def _vector_k(hybrid: Optional[HybridRetriever]) -> int:
+    return HYBRID_CANDIDATE_K if hybrid else RETRIEVER_K
+
+def _with_similarity(hits: List[Tuple[Document, float]]) -> List[Document]:
+    # Keep the similarity score on the document so later ranking stages can see it
+    docs = []
+    for doc, score in hits:
+        doc.metadata["similarity"] = float(score)
+        docs.append(doc)
+    return docs
+
+def _search_by_vector(vector: List[float], k: int = RETRIEVER_K) -> List[Document]:
+    try:
+        return _with_similarity(get_vectorstore().similarity_search_by_vector_with_score(vector, k=k))
+    except Exception as e:
+        logger.error(f"Error in vector search: {e}")
+        return []
+
+def _vector_search(search_queries: List[str], k: int) -> List[List[Document]]:
+    if not search_queries:
+        return []
     
-    reasoning_response = reasoning_model.invoke(reasoning_prompt)
-    reasoning_output = reasoning_response.content
+    try:
+        with stage("embed", EMBEDDING_MODEL):
+            vectors = embeddings.embed_documents(search_queries)
+    except Exception as e:
+        logger.error(f"Error embedding search queries: {e}")
+        return [[] for _ in search_queries]
     
-    # Extract search queries
-    search_queries = extract_search_queries(reasoning_output)
-    logger.info(f"Generated {len(search_queries)} search queries for '{query[:50]}...'")
+    with stage("vector_search"):
+        batch_search = getattr(get_vectorstore(), "similarity_search_by_vectors_with_score", None)
+        if callable(batch_search):
+            try:
+                return [_with_similarity(hits) for hits in batch_search(vectors, k=k)]
+            except Exception as e:
+                logger.error(f"Error in batch vector search: {e}")
+                return [[] for _ in search_queries]
+        return shared_executor.map(
+            "vector",
+            lambda query, vector: retrieval_flight.do((normalize_text(query), k), _search_by_vector, vector, k),
+            search_queries, vectors
+        )
+
+def _queries_needing_vectors(hybrid: Optional[HybridRetriever], search_queries: List[str]) -> List[str]:
+    # Queries naming a known course of the vector corpus are answered by the exact index without an embedding
+    needed = [query for query in search_queries if not hybrid or hybrid.needs_vector_search(query)]
+    return list(dict.fromkeys(needed))
+
+def _combine_results(hybrid: Optional[HybridRetriever], search_queries: List[str],
+                     vector_results: Dict[str, List[Document]]) -> List[List[Document]]:
+    results = []
+    for search_query in search_queries:
+        docs = vector_results.get(search_query, [])
+        if hybrid:
+            docs = hybrid.search(search_query, RETRIEVER_K, docs)
+        logger.info(f"Retrieved {len(docs)} documents for query: {search_query[:50]}...")
+        results.append(format_retrieved_documents(docs))
+    return results
+
+def execute_rag_queries(search_queries: List[str]) -> List[List[Document]]:
+    """
+    Execute several RAG queries with a single embedding round trip.
+    All queries that need vector search are embedded in one embed_documents batch,
+    then the vector searches are issued together: in one call when the store
+    supports batch queries, otherwise concurrently in the shared executor's vector lane.
+    With hybrid retrieval the vector results are fused with BM25 and exact
+    course-code hits, and queries naming a known course of the vector corpus
+    skip vector search.
+    
+    Args:
+        search_queries: Search queries to run
+        
+    Returns:
+        One list of formatted documents per query, in the same order as the queries
+    """
+    if not search_queries:
+        return []
     
+    hybrid = get_hybrid_retriever()
+    vector_queries = _queries_needing_vectors(hybrid, search_queries)
+    vector_results = dict(zip(vector_queries, _vector_search(vector_queries, _vector_k(hybrid))))
+    return _combine_results(hybrid, search_queries, vector_results)
+
+def execute_hybrid_query(search_query: str) -> List[Document]:
+    """
+    Execute one query through hybrid retrieval.
+    A query that names a known course, such as "what comes after CS 212?", is
+    answered from the exact and BM25 indexes without embedding the query when
+    those index the vector corpus itself.
+    """
+    return execute_rag_queries([search_query])[0]
+
+async def _asearch_by_vector(vector: List[float], k: int = RETRIEVER_K) -> List[Document]:
+    # Stores have no async scored search by vector, so run the sync one off the event loop
+    return await shared_executor.arun("vector", _search_by_vector, vector, k)
+
+async def _avector_search(search_queries: List[str], k: int) -> List[List[Document]]:
     if not search_queries:
-        # Fallback: use the original query
-        search_queries = [query]
+        return []
+    
+    try:
+        with stage("embed", EMBEDDING_MODEL):
+            vectors = await embeddings.aembed_documents(search_queries)
+    except Exception as e:
+        logger.error(f"Error embedding search queries: {e}")
+        return [[] for _ in search_queries]
     
-    # Execute all search queries in parallel
-    all_results = []
-    with ThreadPoolExecutor(max_workers=min(len(search_queries), 5)) as executor:
-        future_to_query = {executor.submit(execute_rag_query, q): q for q in search_queries}
-        for future in concurrent.futures.as_completed(future_to_query):
-            query_text = future_to_query[future]
+    with stage("vector_search"):
+        # The first call connects to Pinecone or loads the local index, so keep it off the event loop
+        vectorstore = await asyncio.to_thread(get_vectorstore)
+        batch_search = getattr(vectorstore, "asimilarity_search_by_vectors_with_score", None)
+        if callable(batch_search):
             try:
-                docs = future.result()
-                logger.info(f"Query '{query_text[:30]}...' returned {len(docs)} documents")
-                all_results.extend(docs)
+                return [_with_similarity(hits) for hits in await batch_search(vectors, k=k)]
             except Exception as e:
-                logger.error(f"Error executing search query: {e}")
+                logger.error(f"Error in batch vector search: {e}")
+                return [[] for _ in search_queries]
+        return list(await asyncio.gather(*(
+            retrieval_flight.ado((normalize_text(query), k), _asearch_by_vector, vector, k)
+            for query, vector in zip(search_queries, vectors)
+        )))
+
+async def aexecute_rag_queries(search_queries: List[str]) -> List[List[Document]]:
+    """Async version of execute_rag_queries, fanning the vector searches out with asyncio.gather."""
+    if not search_queries:
+        return []
+    
+    hybrid = await asyncio.to_thread(get_hybrid_retriever)
+    vector_queries = _queries_needing_vectors(hybrid, search_queries)
+    vector_results = dict(zip(vector_queries, await _avector_search(vector_queries, _vector_k(hybrid))))
+    return _combine_results(hybrid, search_queries, vector_results)
+
+# User context used when the user can't be found
+NO_USER_DATA = "Majors: None declared\n\nNo user data found."
+
+def resolve_user_context(db: Session, user_id: int,
+                         context: Optional[UserAcademicContext] = None) -> Optional[UserAcademicContext]:
+    """Return the request's academic context, loading it only if the caller didn't pass one."""
+    if context is not None:
+        return context
+    try:
+        return build_user_context(db, user_id)
+    except Exception as e:
+        logger.error(f"Error loading user academic context: {e}")
+        return None
+
+async def aresolve_user_context(db: Session, user_id: int,
+                                context: Optional[UserAcademicContext] = None) -> Optional[UserAcademicContext]:
+    """Async version of resolve_user_context; the database work runs in a worker thread."""
+    if context is not None:
+        return context
+    return await asyncio.to_thread(resolve_user_context, db, user_id)
+
+def _user_data(context: Optional[UserAcademicContext]) -> str:
+    return context.user_data if context else NO_USER_DATA
+
+def _majors(context: Optional[UserAcademicContext]) -> list:
+    return context.majors if context else []
+
+def document_identifier(doc: Document) -> str:
+    """Identifier used to recognize the same course across search results."""
+    # Try every possible identifier field
+    # First priority: class_code, then other identifiers
+    for field in ['class_code', 'course_code', 'id', 'title', 'name']:
+        if field in doc.metadata and doc.metadata[field]:
+            return str(doc.metadata[field])
+    
+    # If no identifier found yet, use first line of page_content
+    content_lines = doc.page_content.strip().split('\n')
+    if content_lines and content_lines[0]:
+        return content_lines[0][:50]  # Use first 50 chars of first line
     
-    # Much more lenient deduplication logic
+    # As a last resort, use a hash of the content
+    return f"doc_{hash(doc.page_content[:100])}"
+
+def deduplicate_documents(all_results: List[Document]) -> List[Document]:
+    """Drop documents whose identifier was already seen, keeping the first occurrence."""
     unique_results = []
     seen_identifiers = set()
     
-    # Debug info
-    logger.info(f"Starting deduplication for {len(all_results)} documents")
-    if all_results:
-        sample_doc = all_results[0]
-        logger.info(f"Sample document metadata keys: {list(sample_doc.metadata.keys())}")
-    
     for doc in all_results:
-        # Try multiple different fields as potential identifiers
-        # First priority: class_code, then other identifiers
-        identifier = None
-        
-        # Try every possible identifier field
-        for field in ['class_code', 'course_code', 'id', 'title', 'name']:
-            if field in doc.metadata and doc.metadata[field]:
-                identifier = str(doc.metadata[field])
-                break
-        
-        # If no identifier found yet, use first line of page_content
-        if not identifier:
-            content_lines = doc.page_content.strip().split('\n')
-            if content_lines:
-                identifier = content_lines[0][:50]  # Use first 50 chars of first line
-        
-        # As a last resort, use a hash of the content
-        if not identifier:
-            identifier = f"doc_{hash(doc.page_content[:100])}"
-        
+        identifier = document_identifier(doc)
         # Only deduplicate if we've seen this exact identifier before
         if identifier not in seen_identifiers:
             seen_identifiers.add(identifier)
             unique_results.append(doc)
-            logger.info(f"Added unique document with identifier: {identifier[:30]}...")
     
     logger.info(f"Found {len(unique_results)} unique courses after deduplication")
     return unique_results
 
-def reasoning_based_recommendations(db: Session, user_id: int, query: str, courses: List[dict]) -> List[dict]:
-    """
-    Use the reasoning model to recommend 3-5 courses based on user data including major information.
+def _mmr_terms(doc: Document) -> set:
+    return set(tokenize(" ".join(
+        str(doc.metadata.get(field) or "") for field in ("class_code", "course_name", "description")
+    )))
+
+def fuse_search_results(search_queries: List[str], results: List[List[Document]],
+                        limit: int = MAX_COURSE_CANDIDATES, use_mmr: bool = MMR_ENABLED) -> List[Document]:
     """
-    try:
-        # Log the number of courses we're starting with
-        logger.info(f"Starting with {len(courses)} courses to evaluate")
-        
-        # Get user course data
-        course_data = ""
-        try:
-            course_data = format_courses_for_rag(db, user_id)
-            logger.info("Successfully retrieved user course data")
-        except Exception as e:
-            logger.error(f"Error getting user course data: {e}")
-            # Continue anyway - we'll just have less context
+    Merge the per-query rankings into one candidate list with reciprocal-rank fusion.
+    A course found by several queries, or ranked high by one, rises to the top.
+    The order depends only on the rankings, never on which search finished first.
+    
+    Args:
+        search_queries: Search queries, in the order results were produced
+        results: Ranked documents per query
+        limit: Maximum number of candidates to return
+        use_mmr: Reorder the fused list with MMR to avoid near-duplicate courses
         
-        # Get user major data
-        major_info = ""
-        try:
-            majors = get_user_majors(db, user_id)
-            major_info = format_major_info(majors)
-            logger.info(f"Successfully retrieved user major data: {major_info}")
-        except Exception as e:
-            logger.error(f"Error getting user major data: {e}")
-            major_info = "Majors: Unknown"
-        
-        # Combine course and major information for the user context
-        user_data = f"{major_info}\n\n{course_data}"
-        
-        # Format course data for the reasoning model - simplified version
-        formatted_courses = []
-        for i, course in enumerate(courses):
-            course_info = f"""
-Course {i+1}: {course.get('course_code', 'Unknown')}
-Name: {course.get('course_name', '')}
-Description: {course.get('description', '')[:100]}...
-Prerequisites: {course.get('prerequisites', '')}
-            """
-            formatted_courses.append(course_info)
-        
-        courses_text = "\n\n".join(formatted_courses)
-        
-        # Create simpler prompt for the reasoning model
-        reasoning_prompt = f"""
-You are an academic advisor helping a student choose courses. Based on the student's query, academic history, and major requirements, recommend 3-5 courses from the list below.
+    Returns:
+        Up to limit unique documents, each carrying its fused score in metadata["rrf_score"]
+    """
+    docs_by_id: Dict[str, Document] = {}
+    rankings = []
+    for query_text, docs in zip(search_queries, results):
+        logger.info(f"Query '{query_text[:30]}...' returned {len(docs)} documents")
+        ranking = []
+        for doc in docs:
+            identifier = document_identifier(doc)
+            docs_by_id.setdefault(identifier, doc)
+            if identifier not in ranking:
+                ranking.append(identifier)
+        rankings.append(ranking)
+    
+    fused = reciprocal_rank_fusion(rankings)
+    for identifier, score in fused:
+        docs_by_id[identifier].metadata["rrf_score"] = score
+    
+    if use_mmr and fused:
+        candidates = [docs_by_id[identifier] for identifier, _ in fused]
+        order = maximal_marginal_relevance(
+            [score for _, score in fused], [_mmr_terms(doc) for doc in candidates], limit, MMR_LAMBDA
+        )
+        merged = [candidates[index] for index in order]
+    else:
+        merged = [docs_by_id[identifier] for identifier, _ in fused[:limit]]
+    
+    logger.info(f"Fused {len(docs_by_id)} unique courses into {len(merged)} candidates")
+    return merged
 
-STUDENT QUERY: {query}
+def _clean_search_queries(plan: SearchQueryPlan) -> SearchQueryPlan:
+    """Strip, deduplicate and cap the generated queries, rejecting a plan with none left."""
+    queries = list(dict.fromkeys(q.strip() for q in plan.search_queries if q.strip()))
+    if not queries:
+        raise ValueError("search_queries: every query is empty")
+    return SearchQueryPlan(search_queries=queries[:MAX_SEARCH_QUERIES])
 
-STUDENT ACADEMIC INFORMATION:
-{user_data}
+def _search_queries_from_plan(plan: Optional[SearchQueryPlan], query: str) -> List[str]:
+    search_queries = list(plan.search_queries) if plan else []
+    logger.info(f"Generated {len(search_queries)} search queries for '{query[:50]}...'")
+    
+    if not search_queries:
+        # Fallback: use the original query
+        search_queries = [query]
+    elif HYBRID_RETRIEVAL and extract_course_codes(query) and query not in search_queries:
+        # The student's own query names a course; the exact index answers it for free
+        search_queries.insert(0, query)
+    return search_queries
 
-AVAILABLE COURSES:
-{courses_text}
+def build_reasoning_prompt(query: str, context: Optional[UserAcademicContext]) -> FittedPrompt:
+    """Build the prompt asking for search queries, fitted to the "reason" token budget."""
+    return fit_user_prompt(
+        "reason",
+        lambda user_data: REASONING_PROMPT.format(query=query, user_data=user_data),
+        _user_data(context),
+        compact_user_data(context),
+    )
 
-Please respond with ONLY the course codes of your recommended courses in this exact format:
-RECOMMENDED COURSES:
-- [course_code_1]
-- [course_code_2]
-- [course_code_3]
-- [course_code_4] (optional)
-- [course_code_5] (optional)
+def _reasoning_search_queries(query: str, context: Optional[UserAcademicContext],
+                              deadline: Optional[float] = None) -> List[str]:
+    # Ask the reasoning model for targeted search queries; with a deadline the
+    # calls end by it, so a caller that stopped waiting doesn't hold the openai lane
+    if _past(deadline):
+        raise TimeoutError("Reasoning started after its deadline")
+    model = get_reasoning_model() if deadline is None else get_speculative_reasoning_model()
+    with stage("reason"):
+        reasoning_prompt = build_reasoning_prompt(query, context)
+        record_tokens_saved(reasoning_prompt.tokens_saved)
+        plan = _invoke_structured(
+            model, reasoning_prompt.text, SearchQueryPlan, "reason", _clean_search_queries, deadline
+        )
+    return _search_queries_from_plan(plan, query)
 
-Just list the course codes, nothing else. For example: "CS 101", "MATH 210", etc.
-"""
+async def _areasoning_search_queries(query: str, context: Optional[UserAcademicContext]) -> List[str]:
+    with stage("reason"):
+        reasoning_prompt = build_reasoning_prompt(query, context)
+        record_tokens_saved(reasoning_prompt.tokens_saved)
+        plan = await _ainvoke_structured(
+            get_reasoning_model(), reasoning_prompt.text, SearchQueryPlan, "reason", _clean_search_queries
+        )
+    return _search_queries_from_plan(plan, query)
+
+def speculative_search_queries(query: str, context: Optional[UserAcademicContext]) -> List[str]:
+    """
+    Search queries that need no reasoning model: the student's own query, and the
+    courses still open on their requirements, a few codes per query. With hybrid
+    retrieval the exact index answers the code queries without a vector search.
+    """
+    queries = [query]
+    remaining = context.audit.get("remaining_courses", []) if context and context.audit else []
+    remaining = remaining[:SPECULATIVE_REQUIREMENT_COURSES]
+    for start in range(0, len(remaining), RETRIEVER_K):
+        queries.append(" ".join(remaining[start:start + RETRIEVER_K]))
+    return queries
+
+def _merge_search_results(results_by_query: Dict[str, List[Document]]) -> List[Document]:
+    with stage("dedup"):
+        return fuse_search_results(list(results_by_query), list(results_by_query.values()))
+
+REASONING_LATENCY = LatencyWindow(SPECULATIVE_LATENCY_WINDOW, SPECULATIVE_LATENCY_MIN_SAMPLES)
+
+def speculative_reasoning_budget() -> float:
+    """
+    Seconds a speculative search waits for the reasoning model: a high quantile of
+    recently observed reasoning latency with some headroom, or
+    SPECULATIVE_REASONING_BUDGET until enough calls were observed.
+    """
+    observed = REASONING_LATENCY.quantile(SPECULATIVE_BUDGET_QUANTILE)
+    if observed is None:
+        return SPECULATIVE_REASONING_BUDGET
+    return min(max(observed * SPECULATIVE_BUDGET_HEADROOM, SPECULATIVE_BUDGET_MIN), SPECULATIVE_BUDGET_MAX)
+
+SPECULATIVE_REASONING_DISCARDED = Counter(
+    "advisor_speculative_reasoning_discarded_total",
+    "Speculative reasoning calls whose search queries went unused, by mode and reason",
+)
+REGISTRY.extend([
+    SPECULATIVE_REASONING_DISCARDED,
+    Gauge("advisor_speculative_reasoning_budget_seconds", "Current wait for the reasoning model in speculative search",
+          lambda: [({}, speculative_reasoning_budget())]),
+])
+
+def _observe_reasoning(started: float):
+    # Done callback recording how long a reasoning call took, for the budget
+    def observe(future):
+        if not future.cancelled() and future.exception() is None:
+            REASONING_LATENCY.observe(time.perf_counter() - started)
+    return observe
+
+def _discard_reasoning(mode: str, reason: str, budget: float):
+    SPECULATIVE_REASONING_DISCARDED.inc(mode=mode, reason=reason)
+    if reason == "timeout":
+        # The call took at least the budget; counting it keeps a slowing model from lowering the budget
+        REASONING_LATENCY.observe(budget)
+        logger.warning(f"Reasoning model exceeded {budget:.1f}s; using speculative results")
+
+def optimized_course_search(db: Session, user_id: int, query: str,
+                            context: Optional[UserAcademicContext] = None) -> List[Document]:
+    """
+    Perform optimized course search to find relevant courses.
+    Includes major information in the search context.
+    
+    In speculative mode the reasoning call runs in the background while the raw
+    query and remaining requirements are retrieved. Results for the reasoning
+    model's queries are fused with them when it answers, or the speculative
+    results are returned alone if it fails or runs past the budget from
+    speculative_reasoning_budget. The call has that budget as its deadline: it's
+    cancelled if still queued then, and its requests time out by it otherwise.
+    """
+    context = resolve_user_context(db, user_id, context)
+    logger.info(f"User context includes: {context.major_info if context else 'no user data'}")
+    
+    if not SPECULATIVE_RETRIEVAL:
+        search_queries = _reasoning_search_queries(query, context)
+        # Execute all search queries with one batched embedding call
+        return _merge_search_results(dict(zip(search_queries, execute_rag_queries(search_queries))))
+    
+    budget = speculative_reasoning_budget()
+    started = time.perf_counter()
+    deadline = started + budget
+    # The executor copies the context, so the reasoning stage lands in this request's metrics trace
+    reasoning = shared_executor.submit("openai", _reasoning_search_queries, query, context, deadline)
+    reasoning.add_done_callback(_observe_reasoning(started))
+    speculative_queries = speculative_search_queries(query, context)
+    results_by_query = dict(zip(speculative_queries, execute_rag_queries(speculative_queries)))
+    
+    try:
+        search_queries = reasoning.result(timeout=max(deadline - time.perf_counter(), 0.0))
+    except FutureTimeoutError:
+        # Still queued for the openai lane, it never runs; running, it stops at the deadline
+        reasoning.cancel()
+        _discard_reasoning("sync", "timeout", budget)
+        return _merge_search_results(results_by_query)
+    except Exception as e:
+        logger.error(f"Reasoning model failed, using speculative results: {e}")
+        _discard_reasoning("sync", "error", budget)
+        return _merge_search_results(results_by_query)
+    
+    new_queries = [search_query for search_query in search_queries if search_query not in results_by_query]
+    results_by_query = {
+        **dict(zip(new_queries, execute_rag_queries(new_queries))),
+        **results_by_query,
+    }
+    return _merge_search_results(results_by_query)
+
+async def aoptimized_course_search(db: Session, user_id: int, query: str,
+                                   context: Optional[UserAcademicContext] = None) -> List[Document]:
+    """Async version of optimized_course_search."""
+    context = await aresolve_user_context(db, user_id, context)
+    
+    if not SPECULATIVE_RETRIEVAL:
+        search_queries = await _areasoning_search_queries(query, context)
+        return _merge_search_results(dict(zip(search_queries, await aexecute_rag_queries(search_queries))))
+    
+    budget = speculative_reasoning_budget()
+    started = time.perf_counter()
+    reasoning = asyncio.create_task(_areasoning_search_queries(query, context))
+    reasoning.add_done_callback(_observe_reasoning(started))
+    speculative_queries = speculative_search_queries(query, context)
+    try:
+        results_by_query = dict(zip(speculative_queries, await aexecute_rag_queries(speculative_queries)))
+    except BaseException:
+        reasoning.cancel()
+        raise
+    
+    try:
+        # wait_for cancels the call on timeout, so nothing keeps running past the budget
+        search_queries = await asyncio.wait_for(
+            reasoning, timeout=max(budget - (time.perf_counter() - started), 0.0)
+        )
+    except asyncio.TimeoutError:
+        _discard_reasoning("async", "timeout", budget)
+        return _merge_search_results(results_by_query)
+    except Exception as e:
+        logger.error(f"Reasoning model failed, using speculative results: {e}")
+        _discard_reasoning("async", "error", budget)
+        return _merge_search_results(results_by_query)
+    
+    new_queries = [search_query for search_query in search_queries if search_query not in results_by_query]
+    results_by_query = {
+        **dict(zip(new_queries, await aexecute_rag_queries(new_queries))),
+        **results_by_query,
+    }
+    return _merge_search_results(results_by_query)
+
+def build_recommendation_prompt(query: str, context: Optional[UserAcademicContext],
+                                courses: List[dict]) -> FittedPrompt:
+    """Build the reasoning prompt that picks 3-5 courses from the candidates, fitted to the "rerank" token budget."""
+    return fit_recommendation_prompt(
+        lambda user_data, courses_text: RECOMMENDATION_PROMPT.format(
+            query=query, user_data=user_data, courses_text=courses_text
+        ),
+        _user_data(context),
+        courses,
+        compact_user_data(context),
+    )
+
+def candidate_validator(courses: List[dict]):
+    """
+    Check for a CourseSelection: keeps the first MAX_SELECTED_COURSES codes that
+    name an offered candidate, in the candidate's own spelling, and rejects a
+    selection with none.
+    """
+    offered = {normalize_course_code(course.get('course_code', '')): course.get('course_code', '') for course in courses}
+    
+    def validate(selection: CourseSelection) -> CourseSelection:
+        codes = list(dict.fromkeys(normalize_course_code(code) for code in selection.course_codes))
+        known = [offered[code] for code in codes if code in offered]
+        if not known:
+            raise ValueError(f"course_codes: none of {codes} is among the available courses")
+        if len(known) < len(codes):
+            logger.info(f"Ignoring recommended codes that weren't offered: {[c for c in codes if c not in offered]}")
+        return CourseSelection(course_codes=known[:MAX_SELECTED_COURSES])
+    
+    return validate
+
+def apply_recommendations(recommended_codes: List[str], courses: List[dict], majors: list) -> List[dict]:
+    """Map recommended codes back to full course objects with recommendation notes."""
+    # If we got no recommendations, just take the first 3 courses
+    if not recommended_codes and courses:
+        logger.info("No recommendations found, using first 3 courses")
+        recommended_codes = [course.get('course_code', f"Course-{i}") for i, course in enumerate(courses[:3])]
+    
+    # Map recommended codes back to full course objects
+    result_courses = []
+    for code in recommended_codes:
+        # Find matching course
+        for course in courses:
+            course_code = course.get('course_code', '')
+            # Case-insensitive partial matching for robustness
+            if code.lower() in course_code.lower() or course_code.lower() in code.lower():
+                # Create a copy with recommendation data
+                course_copy = course.copy()
+                
+                # Add recommendation reason based on user's major if available
+                major_names = [major.name for major in majors] if majors else []
+                if major_names:
+                    major_text = major_names[0] if len(major_names) == 1 else "your majors"
+                    course_copy['recommendation'] = {
+                        'is_recommended': True,
+                        'reason': f"Recommended for your progress in {major_text}.",
+                        'priority': "High"
+                    }
+                else:
+                    course_copy['recommendation'] = {
+                        'is_recommended': True,
+                        'reason': "Recommended based on your academic history and goals.",
+                        'priority': "High"
+                    }
+                
+                result_courses.append(course_copy)
+                break
+    
+    # Ensure we have at least some recommendations
+    if not result_courses and courses:
+        logger.info("Couldn't match recommendations to courses, using first 3")
+        for i, course in enumerate(courses[:3]):
+            course_copy = course.copy()
+            course_copy['recommendation'] = {
+                'is_recommended': True,
+                'reason': "Suggested option for your next semester.",
+                'priority': "Medium"
+            }
+            result_courses.append(course_copy)
+    
+    logger.info(f"Returning {len(result_courses)} recommended courses")
+    return result_courses
+
+def filter_candidate_courses(courses: List[dict], context: Optional[UserAcademicContext]) -> List[dict]:
+    """
+    Drop candidates the student has already taken or whose prerequisites aren't met,
+    so the reasoning model only chooses among courses the student can enroll in.
+    If every candidate is blocked the list is returned unchanged.
+    """
+    if not PREREQUISITE_FILTER or context is None or not courses:
+        return courses
+    
+    try:
+        eligible, blocked = filter_eligible_courses(courses, context.completed_courses, get_prerequisite_graph())
+    except Exception as e:
+        logger.error(f"Error checking prerequisites: {e}")
+        return courses
+    
+    if blocked:
+        logger.info(f"Prerequisite filter dropped {len(blocked)} of {len(courses)} candidates: "
+                    f"{[course.get('course_code') for course in blocked]}")
+    if not eligible:
+        logger.info("Every candidate is blocked by prerequisites, keeping the unfiltered list")
+        return courses
+    return eligible
+
+def fallback_recommendations(courses: List[dict]) -> List[dict]:
+    """Simple recommendations used when the reasoning stage fails."""
+    if courses:
+        logger.info("Using fallback recommendation logic")
+        return [
+            {**courses[i], 'recommendation': {
+                'is_recommended': True,
+                'reason': "Suggested course option.",
+                'priority': "Medium"
+            }} 
+            for i in range(min(3, len(courses)))
+        ]
+    return []
+
+def reasoning_based_recommendations(db: Session, user_id: int, query: str, courses: List[dict],
+                                    context: Optional[UserAcademicContext] = None) -> List[dict]:
+    """
+    Use the reasoning model to recommend 3-5 courses based on user data including major information.
+    """
+    try:
+        # Log the number of courses we're starting with
+        logger.info(f"Starting with {len(courses)} courses to evaluate")
+        
+        context = resolve_user_context(db, user_id, context)
+        majors = _majors(context)
+        courses = filter_candidate_courses(courses, context)
         
         # Get reasoning model's evaluation
         logger.info("Sending query to reasoning model")
-        reasoning_response = reasoning_model.invoke(reasoning_prompt)
-        reasoning_text = reasoning_response.content
-        logger.info(f"Received reasoning model response of length: {len(reasoning_text)}")
+        with stage("rerank"):
+            reasoning_prompt = build_recommendation_prompt(query, context, courses)
+            record_tokens_saved(reasoning_prompt.tokens_saved)
+            selection = _invoke_structured(
+                get_reasoning_model(), reasoning_prompt.text, CourseSelection, "rerank", candidate_validator(courses)
+            )
+        if selection is None:
+            return fallback_recommendations(courses)
+        logger.info(f"Reasoning model recommended: {selection.course_codes}")
         
-        # Extract recommended course codes using a more forgiving approach
-        recommended_codes = []
-        
-        # Try to find a "RECOMMENDED COURSES:" section
-        if "RECOMMENDED COURSES:" in reasoning_text:
-            recommendation_section = reasoning_text.split("RECOMMENDED COURSES:")[1].strip()
-            
-            # Extract course codes from bullet points or numbered lists
-            for line in recommendation_section.split('\n'):
-                line = line.strip()
-                if line.startswith('-') or line.startswith('*') or (line and line[0].isdigit() and '. ' in line):
-                    # Extract the code from the line
-                    if line.startswith('-') or line.startswith('*'):
-                        code = line[1:].strip()
-                    else:
-                        code = line.split('. ', 1)[1].strip()
-                    
-                    # Clean up the code
-                    if '[' in code and ']' in code:
-                        code = code.split('[')[1].split(']')[0]
-                    
-                    recommended_codes.append(code)
-        else:
-            # Fallback: just look for anything that looks like a course code
-            # This regex looks for patterns like "CS 101", "MATH 210", etc.
-            import re
-            course_code_pattern = r'[A-Z]{2,4}\s*\d{3,4}'
-            recommended_codes = re.findall(course_code_pattern, reasoning_text)[:5]  # Take up to 5
-        
-        logger.info(f"Extracted {len(recommended_codes)} recommended course codes: {recommended_codes}")
-        
-        # If we got no recommendations, just take the first 3 courses
-        if not recommended_codes and courses:
-            logger.info("No recommendations found, using first 3 courses")
-            recommended_codes = [course.get('course_code', f"Course-{i}") for i, course in enumerate(courses[:3])]
-        
-        # Map recommended codes back to full course objects
-        result_courses = []
-        for code in recommended_codes:
-            # Find matching course
-            for course in courses:
-                course_code = course.get('course_code', '')
-                # Case-insensitive partial matching for robustness
-                if code.lower() in course_code.lower() or course_code.lower() in code.lower():
-                    # Create a copy with recommendation data
-                    course_copy = course.copy()
-                    
-                    # Add recommendation reason based on user's major if available
-                    major_names = [major.name for major in majors] if majors else []
-                    if major_names:
-                        major_text = major_names[0] if len(major_names) == 1 else "your majors"
-                        course_copy['recommendation'] = {
-                            'is_recommended': True,
-                            'reason': f"Recommended for your progress in {major_text}.",
-                            'priority': "High"
-                        }
-                    else:
-                        course_copy['recommendation'] = {
-                            'is_recommended': True,
-                            'reason': "Recommended based on your academic history and goals.",
-                            'priority': "High"
-                        }
-                    
-                    result_courses.append(course_copy)
-                    break
-        
-        # Ensure we have at least some recommendations
-        if not result_courses and courses:
-            logger.info("Couldn't match recommendations to courses, using first 3")
-            for i, course in enumerate(courses[:3]):
-                course_copy = course.copy()
-                course_copy['recommendation'] = {
-                    'is_recommended': True,
-                    'reason': "Suggested option for your next semester.",
-                    'priority': "Medium"
-                }
-                result_courses.append(course_copy)
-        
-        logger.info(f"Returning {len(result_courses)} recommended courses")
-        return result_courses
+        return apply_recommendations(selection.course_codes, courses, majors)
         
     except Exception as e:
         logger.error(f"Error in reasoning-based recommendations: {e}")
@@ -612,17 +1471,36 @@ Just list the course codes, nothing else. For example: "CS 101", "MATH 210", etc
         logger.error(f"Traceback: {traceback.format_exc()}")
         
         # As a last resort, return simple recommendations
-        if courses:
-            logger.info("Using fallback recommendation logic")
-            return [
-                {**courses[i], 'recommendation': {
-                    'is_recommended': True,
-                    'reason': "Suggested course option.",
-                    'priority': "Medium"
-                }} 
-                for i in range(min(3, len(courses)))
-            ]
-        return []
+        return fallback_recommendations(courses)
+
+async def areasoning_based_recommendations(db: Session, user_id: int, query: str, courses: List[dict],
+                                           context: Optional[UserAcademicContext] = None) -> List[dict]:
+    """Async version of reasoning_based_recommendations."""
+    try:
+        logger.info(f"Starting with {len(courses)} courses to evaluate")
+        
+        context = await aresolve_user_context(db, user_id, context)
+        majors = _majors(context)
+        courses = filter_candidate_courses(courses, context)
+        
+        logger.info("Sending query to reasoning model")
+        with stage("rerank"):
+            reasoning_prompt = build_recommendation_prompt(query, context, courses)
+            record_tokens_saved(reasoning_prompt.tokens_saved)
+            selection = await _ainvoke_structured(
+                get_reasoning_model(), reasoning_prompt.text, CourseSelection, "rerank", candidate_validator(courses)
+            )
+        if selection is None:
+            return fallback_recommendations(courses)
+        logger.info(f"Reasoning model recommended: {selection.course_codes}")
+        
+        return apply_recommendations(selection.course_codes, courses, majors)
+        
+    except Exception as e:
+        logger.error(f"Error in reasoning-based recommendations: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return fallback_recommendations(courses)
 
 def format_course_data(courses: List[Document]) -> List[dict]:
     """
@@ -631,33 +1509,56 @@ def format_course_data(courses: List[Document]) -> List[dict]:
     course_data = []
     
     for doc in courses:
-        metadata = doc.metadata
-        
         # Extract course details from metadata using class_code
-        course_info = {
-            "course_code": metadata.get('class_code', 'Unknown'),
-            "course_name": metadata.get('course_name', 'Unknown'),  # Could be improved with a course name field
-            "credits": metadata.get('credits', ''),
-            "description": metadata.get('description', ''),
-            "prerequisites": metadata.get('prerequisites', ''),
-            "instructor": metadata.get('instructor', ''),
-            "schedule": {
-                "days": metadata.get('days', ''),
-                "time": metadata.get('time', '')
-            },
-            "location": metadata.get('classroom', ''),
-            "availability": {
-                "available_seats": metadata.get('available_seats', ''),
-                "total_seats": metadata.get('total_seats', '')
-            },
-            "crn": ""  # Keep empty as we're not using CRN
-        }
+        course_info = course_data_from_metadata(doc.metadata)
         
         course_data.append(course_info)
     
     return course_data
 
-def process_course_query_with_reasoning(db: Session, user_id: int, query: str) -> dict:
+# Returned when the search finds nothing
+NO_RESULTS_RESPONSE = {
+    "type": "course_recommendations",
+    "message": "I couldn't find any courses matching your criteria. Can you try rephrasing your request or providing more details? 📚",
+    "course_data": []
+}
+
+# Returned when the pipeline fails
+PIPELINE_ERROR_RESPONSE = {
+    "type": "course_recommendations",
+    "message": "I encountered an issue while finding courses for you. Please try again or rephrase your request. 🙇",
+    "course_data": []
+}
+
+def build_final_response_prompt(query: str, majors: list, recommended_count: int) -> str:
+    """Build the prompt for the friendly message shown above the recommended courses."""
+    major_names = [major.name for major in majors] if majors else []
+    return f"""
+The student asked: "{query}"
+
+Student major(s): {', '.join(major_names) if major_names else 'None declared'}
+
+Based on their academic history and requirements, I've evaluated potential courses. 
+I found {recommended_count} recommended courses that would be beneficial for them.
+
+Write a friendly, brief response (2-3 sentences) that:
+1. Addresses their query directly
+2. Mentions how you evaluated courses based on their academic history and requirements
+3. References their major(s) if they have any declared
+4. Includes an encouraging tone and 1-2 appropriate emojis
+5. Is personalized to their situation
+
+DO NOT list the courses - they'll be shown separately.
+"""
+
+def _count_recommended(evaluated_courses: List[dict]) -> int:
+    # Filter recommended courses
+    recommended_courses = [course for course in evaluated_courses 
+                          if course.get('recommendation', {}).get('is_recommended', False)]
+    return len(recommended_courses)
+
+def process_course_query_with_reasoning(db: Session, user_id: int, query: str,
+                                        context: Optional[UserAcademicContext] = None) -> dict:
     """
     Process course-related queries using reasoning model for filtering and ranking.
     Includes major information in the reasoning context.
@@ -666,63 +1567,37 @@ def process_course_query_with_reasoning(db: Session, user_id: int, query: str) -
         db: Database session
         user_id: User ID
         query: The student's query
+        context: The user's academic context, loaded once and shared by every stage (optional)
         
     Returns:
         A dictionary with structured course data and a conversational message
     """
     try:
         logger.info(f"Starting course query processing with reasoning for query: {query[:100]}")
+        context = resolve_user_context(db, user_id, context)
         
         # Step 1: Perform optimized search
-        search_results = optimized_course_search(db, user_id, query)
+        search_results = optimized_course_search(db, user_id, query, context)
         
         logger.info(f"Search returned {len(search_results)} results")
         
         if not search_results:
             # No results found
             logger.info("No search results found")
-            return {
-                "type": "course_recommendations",
-                "message": "I couldn't find any courses matching your criteria. Can you try rephrasing your request or providing more details? 📚",
-                "course_data": []
-            }
+            return dict(NO_RESULTS_RESPONSE)
         
         # Step 2: Format course data
         course_data = format_course_data(search_results)
         logger.info(f"Formatted {len(course_data)} courses")
         
         # Step 3: Use reasoning model to evaluate and filter courses
-        evaluated_courses = reasoning_based_recommendations(db, user_id, query, course_data)
+        evaluated_courses = reasoning_based_recommendations(db, user_id, query, course_data, context)
         logger.info(f"Evaluated {len(evaluated_courses)} courses with reasoning model")
         
-        # Filter recommended courses
-        recommended_courses = [course for course in evaluated_courses 
-                              if course.get('recommendation', {}).get('is_recommended', False)]
-        
-        # Get user's majors for personalized response
-        majors = get_user_majors(db, user_id)
-        major_names = [major.name for major in majors] if majors else []
-        
         # Step 4: Generate friendly response based on reasoning results
-        response_prompt = f"""
-The student asked: "{query}"
-
-Student major(s): {', '.join(major_names) if major_names else 'None declared'}
-
-Based on their academic history and requirements, I've evaluated potential courses. 
-I found {len(recommended_courses)} recommended courses that would be beneficial for them.
-
-Write a friendly, brief response (2-3 sentences) that:
-1. Addresses their query directly
-2. Mentions how you evaluated courses based on their academic history and requirements
-3. References their major(s) if they have any declared
-4. Includes an encouraging tone and 1-2 appropriate emojis
-5. Is personalized to their situation
-
-DO NOT list the courses - they'll be shown separately.
-"""
-        
-        message_response = response_model.invoke(response_prompt)
+        response_prompt = build_final_response_prompt(query, _majors(context), _count_recommended(evaluated_courses))
+        with stage("respond"):
+            message_response = _invoke_model(get_response_model(), response_prompt)
         message = message_response.content.strip()
         
         # Return structured response with all evaluated courses
@@ -736,13 +1611,342 @@ DO NOT list the courses - they'll be shown separately.
         logger.error(f"Error in process_course_query_with_reasoning: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
+        return dict(PIPELINE_ERROR_RESPONSE)
+
+async def aprocess_course_query_with_reasoning(db: Session, user_id: int, query: str,
+                                               context: Optional[UserAcademicContext] = None) -> dict:
+    """Async version of process_course_query_with_reasoning."""
+    try:
+        logger.info(f"Starting async course query processing with reasoning for query: {query[:100]}")
+        context = await aresolve_user_context(db, user_id, context)
+        
+        search_results = await aoptimized_course_search(db, user_id, query, context)
+        logger.info(f"Search returned {len(search_results)} results")
+        
+        if not search_results:
+            logger.info("No search results found")
+            return dict(NO_RESULTS_RESPONSE)
+        
+        course_data = format_course_data(search_results)
+        evaluated_courses = await areasoning_based_recommendations(db, user_id, query, course_data, context)
+        logger.info(f"Evaluated {len(evaluated_courses)} courses with reasoning model")
+        
+        response_prompt = build_final_response_prompt(query, _majors(context), _count_recommended(evaluated_courses))
+        with stage("respond"):
+            message_response = await _ainvoke_model(get_response_model(), response_prompt)
+        
         return {
             "type": "course_recommendations",
-            "message": "I encountered an issue while finding courses for you. Please try again or rephrase your request. 🙇",
-            "course_data": []
+            "message": message_response.content.strip(),
+            "course_data": evaluated_courses
         }
+        
+    except Exception as e:
+        logger.error(f"Error in aprocess_course_query_with_reasoning: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return dict(PIPELINE_ERROR_RESPONSE)
 
-def get_advice(db, user_id: int, query=None):
+def get_cached_course_response(db: Session, user_id: int, query: str,
+                               context: Optional[UserAcademicContext] = None) -> dict:
+    """
+    Serve a course query from the response cache, running the reasoning pipeline on a miss.
+    Cache entries are keyed on the normalized query and the user's state fingerprint,
+    so any change to their courses, majors or programs results in a miss.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        query: The student's query
+        context: The user's academic context, if the caller already loaded it (optional)
+        
+    Returns:
+        A dictionary with structured course data and a conversational message
+    """
+    # Load the user's academic context once for the cache key and every pipeline stage
+    context = resolve_user_context(db, user_id, context)
+    if context is None:
+        return process_course_query_with_reasoning(db, user_id, query)
+    
+    # Concurrent identical queries from users in the same state share one pipeline run
+    return pipeline_flight.do((context.fingerprint, normalize_query(query)),
+                              _cached_course_response, db, user_id, query, context)
+
+def _cached_course_response(db: Session, user_id: int, query: str, context: UserAcademicContext) -> dict:
+    with stage("embed", EMBEDDING_MODEL) as timing:
+        cached, query_embedding = response_cache.get(context.fingerprint, query, embed_fn=embeddings.embed_query)
+        if cached is not None:
+            timing.cache_hit("response")
+    if cached is not None:
+        logger.info(f"Response cache hit for user {user_id}: {query[:50]}...")
+        return cached
+    
+    result = process_course_query_with_reasoning(db, user_id, query, context)
+    
+    # Only successful recommendations are worth caching
+    if result.get("course_data"):
+        response_cache.put(user_id, context.fingerprint, query, result,
+                           embedding=query_embedding, embed_fn=embeddings.embed_query)
+    return result
+
+async def aget_cached_course_response(db: Session, user_id: int, query: str,
+                                      context: Optional[UserAcademicContext] = None) -> dict:
+    """Async version of get_cached_course_response."""
+    context = await aresolve_user_context(db, user_id, context)
+    if context is None:
+        return await aprocess_course_query_with_reasoning(db, user_id, query)
+    
+    return await pipeline_flight.ado((context.fingerprint, normalize_query(query)),
+                                     _acached_course_response, db, user_id, query, context)
+
+async def _acached_course_response(db: Session, user_id: int, query: str, context: UserAcademicContext) -> dict:
+    # Cache lookups may embed the query, so keep them off the event loop
+    with stage("embed", EMBEDDING_MODEL) as timing:
+        cached, query_embedding = await asyncio.to_thread(
+            response_cache.get, context.fingerprint, query, embeddings.embed_query
+        )
+        if cached is not None:
+            timing.cache_hit("response")
+    if cached is not None:
+        logger.info(f"Response cache hit for user {user_id}: {query[:50]}...")
+        return cached
+    
+    result = await aprocess_course_query_with_reasoning(db, user_id, query, context)
+    
+    if result.get("course_data"):
+        await asyncio.to_thread(
+            response_cache.put, user_id, context.fingerprint, query, result,
+            query_embedding, embeddings.embed_query
+        )
+    return result
+
+# Used when no query is provided
+DEFAULT_QUERY = "What courses should I take next term?"
+
+# Returned when get_advice fails
+ADVICE_ERROR_MESSAGE = "I'm sorry, I encountered an error while generating recommendations. Please try again later or try rephrasing your question."
+
+def next_term_recommendations(db: Session, user_id: int,
+                              context: Optional[UserAcademicContext] = None) -> Optional[dict]:
+    """
+    Answer the default next-term request without the reasoning pipeline.
+    Recommendations come from the degree audit, prerequisite graph and course
+    availability; the message is a template unless NEXT_TERM_LLM_MESSAGE is set.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        context: The user's academic context (optional)
+        
+    Returns:
+        The course recommendation response, or None when the reasoning pipeline
+        should answer instead: the corpus has no section metadata, or fewer than
+        NEXT_TERM_MIN_COURSES courses could be recommended
+    """
+    records = _section_records()
+    if records is None:
+        # The scraped catalog has no sections or reliable prerequisites to plan from
+        return None
+    context = resolve_user_context(db, user_id, context)
+    if context is None:
+        return None
+    
+    with stage("rerank"):
+        courses = recommend_next_term(context, records, get_prerequisite_graph())
+    if len(courses) < NEXT_TERM_MIN_COURSES:
+        logger.info(f"Next-term fast path found {len(courses)} courses, leaving it to the pipeline")
+        return None
+    logger.info(f"Next-term fast path recommended {len(courses)} courses")
+    
+    with stage("respond"):
+        if NEXT_TERM_LLM_MESSAGE:
+            response_prompt = build_final_response_prompt(DEFAULT_QUERY, context.majors, len(courses))
+            message = _invoke_model(get_response_model(), response_prompt).content.strip()
+        else:
+            message = build_next_term_message(context, len(courses))
+    
+    return {
+        "type": "course_recommendations",
+        "message": message,
+        "course_data": courses
+    }
+
+async def anext_term_recommendations(db: Session, user_id: int,
+                                     context: Optional[UserAcademicContext] = None) -> Optional[dict]:
+    """Async version of next_term_recommendations."""
+    records = await asyncio.to_thread(_section_records)
+    if records is None:
+        return None
+    context = await aresolve_user_context(db, user_id, context)
+    if context is None:
+        return None
+    
+    # The first call compiles the prerequisite graph, so it is fetched in the thread too
+    with stage("rerank"):
+        courses = await asyncio.to_thread(
+            lambda: recommend_next_term(context, records, get_prerequisite_graph())
+        )
+    if len(courses) < NEXT_TERM_MIN_COURSES:
+        logger.info(f"Next-term fast path found {len(courses)} courses, leaving it to the pipeline")
+        return None
+    logger.info(f"Next-term fast path recommended {len(courses)} courses")
+    
+    with stage("respond"):
+        if NEXT_TERM_LLM_MESSAGE:
+            response_prompt = build_final_response_prompt(DEFAULT_QUERY, context.majors, len(courses))
+            message = (await _ainvoke_model(get_response_model(), response_prompt)).content.strip()
+        else:
+            message = build_next_term_message(context, len(courses))
+    
+    return {
+        "type": "course_recommendations",
+        "message": message,
+        "course_data": courses
+    }
+
+def detect_course_lookup(query: str) -> Optional[CourseLookup]:
+    """Recognize a direct question about one course, or None if the query needs the pipeline."""
+    if not LOOKUP_FAST_PATH or not query:
+        return None
+    return detect_lookup(query, get_course_index())
+
+def _lookup_response(lookup: CourseLookup, message: str) -> dict:
+    return {
+        "type": "course_recommendations",
+        "message": message,
+        "course_data": [course_data_from_metadata(record) for record in get_course_index().get(lookup.code)]
+    }
+
+def course_lookup_response(query: str) -> Optional[dict]:
+    """
+    Answer a direct lookup such as "who teaches CS 315?" from the catalog index,
+    skipping classification, retrieval and reasoning. The message is a template
+    unless LOOKUP_LLM_MESSAGE is set.
+    
+    Args:
+        query: The student's query
+        
+    Returns:
+        The response with the course's sections as cards, or None if the query
+        isn't a direct lookup
+    """
+    with stage("lookup"):
+        lookup = detect_course_lookup(query)
+        if lookup is None:
+            return None
+        message = build_lookup_message(lookup, get_course_index().get(lookup.code))
+    logger.info(f"Lookup fast path answered {lookup.attributes} for {lookup.code}")
+    
+    if LOOKUP_LLM_MESSAGE:
+        with stage("respond"):
+            message = _invoke_model(get_intent_classifier(), build_lookup_prompt(query, message)).content.strip()
+    return _lookup_response(lookup, message)
+
+async def acourse_lookup_response(query: str) -> Optional[dict]:
+    """Async version of course_lookup_response."""
+    with stage("lookup"):
+        # Only the first call does real work, building the index from the corpus
+        lookup = await asyncio.to_thread(detect_course_lookup, query)
+        if lookup is None:
+            return None
+        message = build_lookup_message(lookup, get_course_index().get(lookup.code))
+    logger.info(f"Lookup fast path answered {lookup.attributes} for {lookup.code}")
+    
+    if LOOKUP_LLM_MESSAGE:
+        with stage("respond"):
+            message = (await _ainvoke_model(get_intent_classifier(), build_lookup_prompt(query, message))).content.strip()
+    return _lookup_response(lookup, message)
+
+def _compute_default_recommendations(db: Session, user_id: int,
+                                     context: Optional[UserAcademicContext]) -> dict:
+    response = None
+    if NEXT_TERM_FAST_PATH:
+        response = next_term_recommendations(db, user_id, context)
+    if not response:
+        response = get_cached_course_response(db, user_id, DEFAULT_QUERY, context)
+    return response
+
+def _store_default_recommendations(user_id: int, version: int, context: Optional[UserAcademicContext],
+                                   response: dict):
+    # Only successful recommendations are worth keeping; version is the user's version
+    # read before the context was loaded, so a change made meanwhile makes the result stale
+    if context is not None and isinstance(response, dict) and response.get("course_data"):
+        recommendation_store.put(user_id, version, context.fingerprint, response)
+
+def precompute_default_recommendations(db: Session, user_id: int) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Compute a user's default recommendations for the background precomputer.
+    
+    Returns:
+        Tuple of (state fingerprint, response), or (None, None) if the user is missing
+        or nothing worth storing was produced
+    """
+    context = resolve_user_context(db, user_id)
+    if context is None:
+        return None, None
+    response = _compute_default_recommendations(db, user_id, context)
+    if not response.get("course_data"):
+        return None, None
+    return context.fingerprint, response
+
+def get_default_recommendations(db: Session, user_id: int) -> dict:
+    """
+    Serve the default next-term recommendations, precomputed when possible.
+    A precomputed result is served as long as the user's state fingerprint still
+    matches the one it was computed for; otherwise it's computed now and stored.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        
+    Returns:
+        A dictionary with structured course data and a conversational message
+    """
+    version = recommendation_store.current_version(user_id)
+    context = resolve_user_context(db, user_id)
+    if context is not None:
+        with stage("precomputed_lookup") as timing:
+            precomputed = recommendation_store.get(user_id, context.fingerprint)
+            if precomputed is not None:
+                timing.cache_hit("precomputed")
+        if precomputed is not None:
+            logger.info(f"Serving precomputed recommendations for user {user_id}")
+            return precomputed
+    
+    response = _compute_default_recommendations(db, user_id, context)
+    _store_default_recommendations(user_id, version, context, response)
+    return response
+
+async def aget_default_recommendations(db: Session, user_id: int) -> dict:
+    """Async version of get_default_recommendations."""
+    version = recommendation_store.current_version(user_id)
+    context = await aresolve_user_context(db, user_id)
+    if context is not None:
+        with stage("precomputed_lookup") as timing:
+            precomputed = recommendation_store.get(user_id, context.fingerprint)
+            if precomputed is not None:
+                timing.cache_hit("precomputed")
+        if precomputed is not None:
+            logger.info(f"Serving precomputed recommendations for user {user_id}")
+            return precomputed
+    
+    response = None
+    if NEXT_TERM_FAST_PATH:
+        response = await anext_term_recommendations(db, user_id, context)
+    if not response:
+        response = await aget_cached_course_response(db, user_id, DEFAULT_QUERY, context)
+    _store_default_recommendations(user_id, version, context, response)
+    return response
+
+# Per-user store of default recommendations, refreshed in the background whenever
+# a user's courses, majors or programs change
+recommendation_store = PrecomputedRecommendations()
+recommendation_precomputer = RecommendationPrecomputer(
+    precompute_default_recommendations, recommendation_store, SessionLocal
+)
+subscribe_profile_changes(recommendation_precomputer.schedule)
+
+def get_advice(db, user_id: int, query=None, intent: Optional[str] = None):
     """
     Main function that orchestrates the entire query processing pipeline.
     Now includes user major information in the context.
@@ -751,27 +1955,183 @@ def get_advice(db, user_id: int, query=None):
         db: Database session
         user_id: The user's ID
         query: The student's query (optional)
+        intent: Intent already determined by the caller, to avoid classifying twice (optional)
         
     Returns:
         A formatted response or structured data
     """
     try:
-        # If no query is provided, use a default recommendation prompt
+        # If no query is provided, serve the (usually precomputed) default recommendations
         if not query:
-            default_query = "What courses should I take next term?"
-            return process_course_query_with_reasoning(db, user_id, default_query)
+            return get_default_recommendations(db, user_id)
         
-        # Classify the intent using LLM
-        intent = classify_intent(query)
-        logger.info(f"LLM classified intent: {intent} for query: {query[:50]}...")
+        # Direct questions about one course are answered from the catalog
+        lookup_response = course_lookup_response(query)
+        if lookup_response:
+            return lookup_response
+        
+        # Classify the intent unless the caller already did
+        if not intent:
+            intent = classify_intent(query)
+        logger.info(f"Classified intent: {intent} for query: {query[:50]}...")
         
         # Process based on intent
         if intent == "COURSE":
-            return process_course_query_with_reasoning(db, user_id, query)
+            return get_cached_course_response(db, user_id, query)
         else:
             # For general conversation, return plain text
             return process_general_query(query)
             
     except Exception as e:
         logger.error(f"Error in get_advice: {e}")
-        return "I'm sorry, I encountered an error while generating recommendations. Please try again later or try rephrasing your question."
\ No newline at end of file
+        return ADVICE_ERROR_MESSAGE
+
+async def aget_advice(db, user_id: int, query=None, intent: Optional[str] = None):
+    """
+    Async version of get_advice. LLM calls use ainvoke, embeddings and vector
+    searches are awaited, and database work runs in worker threads, so the event
+    loop is free while a request waits on I/O.
+    """
+    try:
+        if not query:
+            return await aget_default_recommendations(db, user_id)
+        
+        lookup_response = await acourse_lookup_response(query)
+        if lookup_response:
+            return lookup_response
+        
+        if not intent:
+            intent = await aclassify_intent(query)
+        logger.info(f"Classified intent: {intent} for query: {query[:50]}...")
+        
+        if intent == "COURSE":
+            return await aget_cached_course_response(db, user_id, query)
+        else:
+            return await aprocess_general_query(query)
+            
+    except Exception as e:
+        logger.error(f"Error in aget_advice: {e}")
+        return ADVICE_ERROR_MESSAGE
+
+async def astream_general_query(query: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming version of aprocess_general_query.
+    
+    Yields:
+        ("token", text) for each piece of the reply, then ("done", reply)
+    """
+    parts = []
+    async for text in _astream_model(get_response_model(), build_general_prompt(query), "respond"):
+        parts.append(text)
+        yield "token", text
+    yield "done", "".join(parts).strip()
+
+async def astream_course_response(db: Session, user_id: int, query: str,
+                                  context: Optional[UserAcademicContext] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming version of aget_cached_course_response. Course cards are sent as
+    soon as they are ranked, before the message is written, and the message is
+    sent token by token.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        query: The student's query
+        context: The user's academic context, if the caller already loaded it (optional)
+        
+    Yields:
+        ("status", {...}) as the pipeline moves between stages, ("course", course)
+        for each ranked course, ("token", text) for each piece of the message, and
+        finally ("done", response) with the same dict aget_cached_course_response returns
+    """
+    context = await aresolve_user_context(db, user_id, context)
+    query_embedding = None
+    if context is not None:
+        with stage("embed", EMBEDDING_MODEL) as timing:
+            cached, query_embedding = await asyncio.to_thread(
+                response_cache.get, context.fingerprint, query, embeddings.embed_query
+            )
+            if cached is not None:
+                timing.cache_hit("response")
+        if cached is not None:
+            logger.info(f"Response cache hit for user {user_id}: {query[:50]}...")
+            for course in cached.get("course_data", []):
+                yield "course", course
+            yield "token", cached.get("message", "")
+            yield "done", cached
+            return
+    
+    try:
+        yield "status", {"stage": "searching"}
+        search_results = await aoptimized_course_search(db, user_id, query, context)
+        if not search_results:
+            result = dict(NO_RESULTS_RESPONSE)
+            yield "token", result["message"]
+            yield "done", result
+            return
+        
+        yield "status", {"stage": "ranking", "candidates": len(search_results)}
+        course_data = format_course_data(search_results)
+        evaluated_courses = await areasoning_based_recommendations(db, user_id, query, course_data, context)
+    except Exception as e:
+        logger.error(f"Error in astream_course_response: {e}")
+        result = dict(PIPELINE_ERROR_RESPONSE)
+        yield "token", result["message"]
+        yield "done", result
+        return
+    
+    for course in evaluated_courses:
+        yield "course", course
+    
+    response_prompt = build_final_response_prompt(query, _majors(context), _count_recommended(evaluated_courses))
+    parts = []
+    async for text in _astream_model(get_response_model(), response_prompt, "respond"):
+        parts.append(text)
+        yield "token", text
+    
+    result = {
+        "type": "course_recommendations",
+        "message": "".join(parts).strip(),
+        "course_data": evaluated_courses
+    }
+    if context is not None and evaluated_courses:
+        await asyncio.to_thread(
+            response_cache.put, user_id, context.fingerprint, query, result,
+            query_embedding, embeddings.embed_query
+        )
+    yield "done", result
+
+async def astream_advice(db, user_id: int, query: str, intent: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming version of aget_advice, for the /advising/stream endpoint.
+    
+    Args:
+        db: Database session
+        user_id: The user's ID
+        query: The student's query
+        intent: Intent already determined by the caller (optional)
+        
+    Yields:
+        (event, data) pairs as described in astream_course_response; general
+        queries stream only tokens. Failures end the stream with ("error", message).
+    """
+    try:
+        lookup_response = await acourse_lookup_response(query)
+        if lookup_response:
+            for course in lookup_response["course_data"]:
+                yield "course", course
+            yield "token", lookup_response["message"]
+            yield "done", lookup_response
+            return
+        
+        if not intent:
+            intent = await aclassify_intent(query)
+        if intent == "COURSE":
+            events = astream_course_response(db, user_id, query)
+        else:
+            events = astream_general_query(query)
+        async for event in events:
+            yield event
+    except Exception as e:
+        logger.error(f"Error in astream_advice: {e}")
+        yield "error", ADVICE_ERROR_MESSAGE
@@ -0,0 +1,258 @@
+"""
+Response Cache for Academic Advisor
+Caches course recommendation responses keyed on a normalized query plus a
+fingerprint of the user's academic state, so repeated questions from students
+with an unchanged transcript skip the reasoning pipeline.
+
+Functions:
+- normalize_query: Canonical form of a query used for exact-match lookups
+- compute_state_fingerprint: Hash of a user's completed courses, majors and programs
+- invalidate_user_responses: Drops cached responses stored for a user
+"""
+
+import os
+import re
+import json
+import math
+import time
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# Cosine similarity a cached query must reach to count as the same question
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "true").lower() == "true"
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases the query and strips punctuation and repeated whitespace."""
+    text = PUNCTUATION_PATTERN.sub(" ", (query or "").lower())
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def compute_state_fingerprint(course_codes: List[str], major_names: List[str],
+                              programs: List[Tuple[str, str, Any]]) -> str:
+    """
+    Hashes an academic state independently of the order it was loaded in.
+
+    Args:
+        course_codes: Completed course codes
+        major_names: Declared major names
+        programs: (program_name, program_type, required_courses) tuples
+
+    Returns:
+        Hex digest of the state
+    """
+    state = {
+        "courses": sorted(course_codes),
+        "majors": sorted(major_names),
+        "programs": sorted(
+            [json.dumps(list(program), sort_keys=True, default=str) for program in programs]
+        ),
+    }
+    payload = json.dumps(state, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class _CacheEntry:
+    __slots__ = ("value", "embedding", "expires_at", "user_ids")
+
+    def __init__(self, value: Any, embedding: Optional[List[float]], expires_at: float):
+        self.value = value
+        self.embedding = embedding
+        self.expires_at = expires_at
+        self.user_ids: Set[int] = set()
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache with TTL expiry and optional embedding-similarity hits.
+
+    Entries are keyed by (fingerprint, normalized query), so students in identical
+    academic states share entries. A state change yields a new fingerprint, which
+    makes old entries unreachable even before they are invalidated or evicted.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+                 semantic: bool = RESPONSE_CACHE_SEMANTIC):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.semantic = semantic
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _remove(self, key: Tuple[str, str]) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for user_id in entry.user_ids:
+            keys = self._keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[user_id]
+        return True
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+
+    def _semantic_candidates(self, fingerprint: str) -> List[Tuple[Tuple[str, str], _CacheEntry]]:
+        return [
+            (key, entry) for key, entry in self._entries.items()
+            if key[0] == fingerprint and entry.embedding is not None
+        ]
+
+    def get(self, fingerprint: str, query: str,
+            embed_fn: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[Any], Optional[List[float]]]:
+        """
+        Looks up a cached response.
+
+        Args:
+            fingerprint: User state fingerprint
+            query: The student's query
+            embed_fn: Function embedding a query, enables similarity hits
+
+        Returns:
+            Tuple of (cached value or None, query embedding if one was computed).
+            The embedding can be passed to put() to avoid embedding the query twice.
+        """
+        key = (fingerprint, normalize_query(query))
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return copy.deepcopy(entry.value), entry.embedding
+            has_candidates = bool(self._semantic_candidates(fingerprint))
+
+        if not (self.semantic and embed_fn and has_candidates):
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        try:
+            embedding = embed_fn(key[1])
+        except Exception as e:
+            logger.error(f"Error embedding query for response cache: {e}")
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        with self._lock:
+            best_key, best_score = None, 0.0
+            for candidate_key, candidate in self._semantic_candidates(fingerprint):
+                score = _cosine_similarity(embedding, candidate.embedding)
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                logger.info(f"Semantic response cache hit (similarity {best_score:.3f})")
+                return copy.deepcopy(self._entries[best_key].value), embedding
+            self.misses += 1
+        return None, embedding
+
+    def put(self, user_id: int, fingerprint: str, query: str, value: Any,
+            embedding: Optional[List[float]] = None,
+            embed_fn: Optional[Callable[[str], List[float]]] = None):
+        """
+        Stores a response, evicting the least recently used entries beyond max_size.
+
+        Args:
+            user_id: ID of the user the response was generated for
+            fingerprint: User state fingerprint
+            query: The student's query
+            value: Response to cache
+            embedding: Query embedding from get(), if available
+            embed_fn: Function embedding a query, used when no embedding was passed
+        """
+        key = (fingerprint, normalize_query(query))
+        if self.semantic and embedding is None and embed_fn:
+            try:
+                embedding = embed_fn(key[1])
+            except Exception as e:
+                logger.error(f"Error embedding query for response cache: {e}")
+
+        with self._lock:
+            previous = self._entries.get(key)
+            self._remove(key)
+            entry = _CacheEntry(
+                copy.deepcopy(value), embedding if self.semantic else None, time.monotonic() + self.ttl
+            )
+            # Students in the same state share the entry, so each of them can still invalidate it
+            if previous is not None:
+                entry.user_ids.update(previous.user_ids)
+            entry.user_ids.add(user_id)
+            self._entries[key] = entry
+            for owner in entry.user_ids:
+                self._keys_by_user.setdefault(owner, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Drops every entry stored on behalf of a user. Returns the number removed."""
+        with self._lock:
+            keys = list(self._keys_by_user.get(user_id, ()))
+            return sum(1 for key in keys if self._remove(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide cache used by the query engine
+response_cache = ResponseCache()
+
+
+def invalidate_user_responses(user_id: int):
+    """
+    Drops cached responses for a user whose courses, majors or programs changed.
+
+    Args:
+        user_id: ID of the user
+    """
+    removed = response_cache.invalidate_user(user_id)
+    if removed:
+        logger.info(f"Invalidated {removed} cached responses for user {user_id}")
@@ -0,0 +1,150 @@
+"""
+Single-flight Request Coalescing for Academic Advisor
+Bursts of identical queries from students in identical states would each run
+the same LLM, embedding and vector search calls. A SingleFlight lets the first
+caller for a key run the work while concurrent callers with the same key wait
+for, and share, its result. Nothing is kept once the call finishes; caching
+finished results is the job of the response and embedding caches.
+
+Coalescing is per process. Sync and async callers share in-flight calls, so a
+thread can wait on work started by a coroutine and vice versa; sync callers
+must therefore never run on the event loop thread.
+
+Classes:
+- SingleFlight: Coalesces concurrent calls that share a key
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from backend.services.metrics import Counter, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "advisor_singleflight_calls_total", "Coalesced calls by role; followers reused a leader's result"
+)
+REGISTRY.append(SINGLE_FLIGHT_CALLS)
+
+
+class _LeaderAbandoned(Exception):
+    """Set on a call whose leader was cancelled, so its followers run the work themselves."""
+
+
+class SingleFlight:
+    """
+    Shares one execution among concurrent calls with the same key.
+
+    Errors are shared like results: if the leader's call raises, every
+    follower waiting on it raises the same exception.
+    """
+
+    def __init__(self, name: str, copy_result: Optional[Callable[[Any], Any]] = None):
+        """
+        Args:
+            name: Label for metrics and stats
+            copy_result: Applied to the result handed to each follower, for
+                results that callers go on to modify (optional)
+        """
+        self.name = name
+        self.copy_result = copy_result
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key: Hashable) -> Tuple[bool, Future]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                SINGLE_FLIGHT_CALLS.inc(flight=self.name, role="follower")
+                return False, future
+            future = Future()
+            # A running future can't be cancelled by a follower giving up on it
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.leaders += 1
+        SINGLE_FLIGHT_CALLS.inc(flight=self.name, role="leader")
+        return True, future
+
+    def _settle(self, key: Hashable, future: Future, result: Any = None,
+                error: Optional[BaseException] = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _share(self, result: Any) -> Any:
+        return self.copy_result(result) if self.copy_result else result
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Calls fn(*args) unless a call with the same key is in flight, in which
+        case waits for that call and returns its result.
+
+        Args:
+            key: Identifies calls that would produce the same result
+            fn: The work to run
+            *args: Arguments for fn
+
+        Returns:
+            fn's result, from this call or the one in flight
+        """
+        while True:
+            leader, future = self._join(key)
+            if leader:
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    self._settle(key, future, error=e)
+                    raise
+                self._settle(key, future, result)
+                return result
+            try:
+                return self._share(future.result())
+            except _LeaderAbandoned:
+                continue
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Async version of do; fn is a coroutine function."""
+        while True:
+            leader, future = self._join(key)
+            if leader:
+                try:
+                    result = await fn(*args)
+                except asyncio.CancelledError:
+                    # Don't fail the followers because this caller went away
+                    self._settle(key, future, error=_LeaderAbandoned())
+                    raise
+                except BaseException as e:
+                    self._settle(key, future, error=e)
+                    raise
+                self._settle(key, future, result)
+                return result
+            try:
+                return self._share(await asyncio.wrap_future(future))
+            except _LeaderAbandoned:
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Reports how often calls were coalesced.
+
+        Returns:
+            Dict with leader and follower counts, the share of calls that
+            followed, and the number of calls in flight now
+        """
+        with self._lock:
+            calls = self.leaders + self.followers
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "coalesced_rate": self.followers / calls if calls else 0.0,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,147 @@
+"""
+Structured Output for Academic Advisor
+The reasoning stages answer with JSON objects validated against pydantic
+schemas, instead of free text scraped for numbered lines. Output that doesn't
+validate gets a bounded repair: a cheap model with native JSON-schema output
+rewrites it, given the validation error. Each outcome is counted, so parse
+failures show up on the metrics endpoint.
+
+Classes:
+- SearchQueryPlan: Search queries generated by the "reason" stage
+- CourseSelection: Course codes picked by the "rerank" stage
+- StructuredOutputError: Raised when output doesn't match its schema
+
+Functions:
+- response_format: OpenAI response_format requesting a schema's JSON
+- supports_json_schema: Whether a model accepts a JSON-schema response_format
+- parse_structured: Validates a model's text output against a schema
+- build_repair_prompt: Prompt asking for invalid output to be rewritten
+- record_outcome: Counts a structured call's outcome
+"""
+
+import os
+import re
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+from backend.services.metrics import Counter, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Models accepting response_format={"type": "json_schema"}; o1-mini doesn't, so
+# its output is requested in the prompt and validated here
+JSON_SCHEMA_MODELS = {
+    name.strip() for name in os.getenv("JSON_SCHEMA_MODELS", "gpt-4o,gpt-4o-mini,o1,o3-mini").split(",") if name.strip()
+}
+
+# Items kept from each list; longer lists are cut by the callers' validators rather than
+# rejected, since a sixth course or query is no reason for a repair call
+MAX_SEARCH_QUERIES = 5
+MAX_SELECTED_COURSES = 5
+
+# Repair calls allowed per structured call before falling back
+STRUCTURED_REPAIR_ATTEMPTS = int(os.getenv("STRUCTURED_REPAIR_ATTEMPTS", "1"))
+
+STRUCTURED_OUTPUT_CALLS = Counter(
+    "advisor_structured_output_total",
+    "Structured model outputs by outcome: valid, repaired, or failed after repair",
+)
+REGISTRY.append(STRUCTURED_OUTPUT_CALLS)
+
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+class SearchQueryPlan(BaseModel):
+    """Search queries the reasoning model wants run for the student."""
+
+    search_queries: List[str] = Field(min_length=1)
+
+
+class CourseSelection(BaseModel):
+    """Course codes the reasoning model recommends, best first."""
+
+    course_codes: List[str] = Field(min_length=1)
+
+
+class StructuredOutputError(ValueError):
+    """A model's output that doesn't match the schema it was asked for."""
+
+
+def response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAI response_format that makes the model answer with schema's JSON."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+    }
+
+
+def supports_json_schema(model: Any) -> bool:
+    return getattr(model, "model_name", None) in JSON_SCHEMA_MODELS
+
+
+def parse_structured(text: str, schema: Type[Schema],
+                     validate: Optional[Callable[[Schema], Schema]] = None) -> Schema:
+    """
+    Validates a model's output against a schema.
+
+    Args:
+        text: The model's output; a JSON object, possibly wrapped in prose or a code fence
+        schema: Schema the object must match
+        validate: Further checks on the parsed object, raising ValueError when
+            they fail; may return a cleaned-up object (optional)
+
+    Returns:
+        The validated object
+
+    Raises:
+        StructuredOutputError: If there's no JSON object or it doesn't validate
+    """
+    match = JSON_OBJECT_PATTERN.search(text or "")
+    if not match:
+        raise StructuredOutputError("the response contains no JSON object")
+    try:
+        parsed = schema.model_validate_json(match.group(0))
+    except ValidationError as e:
+        raise StructuredOutputError(
+            "; ".join(f"{'.'.join(str(part) for part in error['loc']) or 'object'}: {error['msg']}" for error in e.errors())
+        ) from e
+    if validate is not None:
+        try:
+            parsed = validate(parsed)
+        except ValueError as e:
+            raise StructuredOutputError(str(e)) from e
+    return parsed
+
+
+def build_repair_prompt(schema: Type[BaseModel], output: str, error: str) -> str:
+    """Prompt asking a model to rewrite invalid output so it matches the schema."""
+    return f"""
+Rewrite the response below as a JSON object matching this JSON schema. Keep its content; fix only what the error describes.
+
+JSON schema:
+{json.dumps(schema.model_json_schema())}
+
+Error: {error}
+
+Response:
+{output}
+"""
+
+
+def record_outcome(stage_name: str, outcome: str, error: Optional[str] = None):
+    """
+    Counts a structured call's outcome.
+
+    Args:
+        stage_name: Stage that made the call
+        outcome: "valid", "repaired" or "failed"
+        error: Validation error of the first attempt, if any
+    """
+    STRUCTURED_OUTPUT_CALLS.inc(stage=stage_name, outcome=outcome)
+    if error:
+        logger.warning(f"Structured output from {stage_name} was invalid ({outcome}): {error}")
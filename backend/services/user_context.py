@@ -0,0 +1,134 @@
+"""
+Request-scoped academic context for the Academic Advisor query engine.
+Loads everything the advising pipeline needs about a user in one go, with
+eager loading, so the stages of query_engine don't re-query the user,
+their courses, majors and programs. The degree audit is computed here too.
+
+Functions:
+- build_user_context: Loads a UserAcademicContext for a user
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from backend.core.database import User, Major
+from backend.services.degree_audit import audit_programs, render_audit_for_rag
+from backend.services.prerequisites import get_catalog_prerequisite_graph
+from backend.services.programs import render_courses_for_rag
+from backend.services.response_cache import compute_state_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def format_major_info(majors: List[Major]) -> str:
+    """
+    Format user majors for inclusion in the RAG context.
+
+    Args:
+        majors: List of Major objects
+
+    Returns:
+        Formatted string with major information
+    """
+    if not majors:
+        return "Majors: None declared"
+
+    major_names = [major.name for major in majors]
+    if len(major_names) == 1:
+        return f"Major: {major_names[0]}"
+    else:
+        return f"Majors: {', '.join(major_names[:-1])} and {major_names[-1]}"
+
+
+@dataclass
+class UserAcademicContext:
+    """Everything the advising pipeline knows about a user for one request."""
+
+    user_id: int
+    completed_courses: List[str]
+    majors: List[Major]
+    programs: Dict[str, Dict[str, Any]]
+    rag_text: str
+    major_info: str
+    fingerprint: str
+    audit: Dict[str, Any] = field(default_factory=dict)
+    completed_set: Set[str] = field(default_factory=set)
+
+    def __post_init__(self):
+        if not self.completed_set:
+            self.completed_set = {code.strip().upper() for code in self.completed_courses}
+
+    @property
+    def major_names(self) -> List[str]:
+        return [major.name for major in self.majors]
+
+    @property
+    def user_data(self) -> str:
+        """Major, course and degree audit text used in the reasoning prompts."""
+        audit_text = render_audit_for_rag(self.audit) if self.audit else ""
+        if audit_text:
+            return f"{self.major_info}\n\n{self.rag_text}\n\n{audit_text}"
+        return f"{self.major_info}\n\n{self.rag_text}"
+
+
+def build_user_context(db: Session, user_id: int) -> Optional[UserAcademicContext]:
+    """
+    Loads a user's academic context with eager loading.
+    Majors and programs are joined into the user query and courses are fetched
+    with a single IN query, so this takes two round trips.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+
+    Returns:
+        UserAcademicContext, or None if the user doesn't exist
+    """
+    user = (
+        db.query(User)
+        .options(
+            joinedload(User.majors),
+            joinedload(User.programs),
+            selectinload(User.courses),
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
+    if not user:
+        return None
+
+    completed_courses = [course.course_code for course in user.courses]
+    majors = list(user.majors)
+    programs = {
+        program.program_name: {
+            "program_type": program.program_type,
+            "required_courses": program.required_courses,
+        }
+        for program in user.programs
+    }
+
+    rag_text = render_courses_for_rag(
+        [{"course_code": code} for code in completed_courses], programs
+    )
+    fingerprint = compute_state_fingerprint(
+        completed_courses,
+        [major.name for major in majors],
+        [(program.program_name, program.program_type, program.required_courses) for program in user.programs],
+    )
+
+    # Remaining requirements are computed here rather than left for the LLM to infer
+    audit = audit_programs(completed_courses, programs, get_catalog_prerequisite_graph().equivalents)
+
+    return UserAcademicContext(
+        user_id=user_id,
+        completed_courses=completed_courses,
+        majors=majors,
+        programs=programs,
+        rag_text=rag_text,
+        major_info=format_major_info(majors),
+        fingerprint=fingerprint,
+        audit=audit,
+    )
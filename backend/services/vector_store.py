@@ -0,0 +1,289 @@
+"""
+Local Vector Store for Academic Advisor
+In-process replacement for the Pinecone index. Course vectors live in one
+contiguous, L2-normalized float32/float16 NumPy matrix memory-mapped from disk,
+with a parallel metadata table. Exact top-k is a single matrix-vector product;
+larger catalogs can add an IVF (inverted file) index so only the nearest
+clusters are scanned.
+
+On-disk layout of an index directory:
+- manifest.json: model name, dimension, dtype, text key and IVF settings
+- vectors.npy: (n, dim) float32 or float16 matrix, rows normalized to unit length
+- metadata.json: list of n metadata dicts, row-aligned with vectors.npy
+- ivf_centroids.npy, ivf_offsets.npy, ivf_rows.npy: optional IVF index
+
+Functions:
+- save_local_index: Writes vectors and metadata to an index directory
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+LOCAL_VECTOR_INDEX_DIR = os.getenv(
+    "LOCAL_VECTOR_INDEX_DIR",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "vector_index"),
+)
+# Number of IVF clusters scanned per query
+LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", "8"))
+# Rows of a float16 matrix converted to float32 at a time while scoring
+SCORE_CHUNK_ROWS = 16384
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _train_ivf(matrix: np.ndarray, n_lists: int, iterations: int = 20, seed: int = 0):
+    """Spherical k-means over the normalized rows. Returns (centroids, offsets, rows)."""
+    rng = np.random.default_rng(seed)
+    n_lists = max(1, min(n_lists, matrix.shape[0]))
+    centroids = matrix[rng.choice(matrix.shape[0], n_lists, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        for list_id in range(n_lists):
+            members = matrix[assignments == list_id]
+            if len(members):
+                centroids[list_id] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids)
+    assignments = np.argmax(matrix @ centroids.T, axis=1)
+    rows = np.argsort(assignments, kind="stable").astype(np.int64)
+    counts = np.bincount(assignments, minlength=n_lists)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return centroids, offsets, rows
+
+
+def save_local_index(directory: str, vectors: List[List[float]], metadatas: List[Dict[str, Any]],
+                     model_name: str, text_key: str = "class_code", dtype: str = "float32",
+                     ivf_lists: int = 0):
+    """
+    Writes a local vector index.
+
+    Args:
+        directory: Index directory, created if missing
+        vectors: Embedding vectors, one per document
+        metadatas: Metadata dicts, row-aligned with vectors
+        model_name: Embedding model the vectors came from
+        text_key: Metadata field used as the document's page_content
+        dtype: "float32" or "float16" storage precision
+        ivf_lists: Number of IVF clusters to train, 0 for exact search only
+    """
+    if len(vectors) != len(metadatas):
+        raise ValueError("vectors and metadatas must have the same length")
+
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+
+    matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+    np.save(path / "vectors.npy", matrix.astype(dtype))
+    with open(path / "metadata.json", "w") as f:
+        json.dump(metadatas, f)
+
+    if ivf_lists:
+        centroids, offsets, rows = _train_ivf(matrix, ivf_lists)
+        np.save(path / "ivf_centroids.npy", centroids)
+        np.save(path / "ivf_offsets.npy", offsets)
+        np.save(path / "ivf_rows.npy", rows)
+        ivf_lists = len(centroids)
+
+    manifest = {
+        "model": model_name,
+        "dimension": int(matrix.shape[1]) if matrix.size else 0,
+        "count": int(matrix.shape[0]),
+        "dtype": dtype,
+        "text_key": text_key,
+        "ivf_lists": ivf_lists,
+    }
+    with open(path / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Saved local vector index with {manifest['count']} documents to {path}")
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Memory-mapped NumPy vector store with exact or IVF top-k search.
+    Scores are cosine similarities (higher is better).
+    """
+
+    def __init__(self, embedding: Embeddings, vectors: np.ndarray, metadatas: List[Dict[str, Any]],
+                 text_key: str = "class_code", model_name: Optional[str] = None,
+                 ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                 nprobe: int = LOCAL_VECTOR_NPROBE):
+        self._embedding = embedding
+        self.vectors = vectors
+        self.metadatas = metadatas
+        self.text_key = text_key
+        self.model_name = model_name
+        self.ivf = ivf
+        self.nprobe = nprobe
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings, nprobe: int = LOCAL_VECTOR_NPROBE) -> "LocalVectorStore":
+        """
+        Opens an index directory written by save_local_index.
+        The vector matrix is memory-mapped, so loading is near-instant and pages
+        are shared between worker processes through the OS page cache.
+        """
+        path = Path(directory)
+        with open(path / "manifest.json", "r") as f:
+            manifest = json.load(f)
+        # float16 stays memory-mapped too; _score converts it chunk by chunk
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        with open(path / "metadata.json", "r") as f:
+            metadatas = json.load(f)
+
+        ivf = None
+        if manifest.get("ivf_lists"):
+            ivf = (
+                np.load(path / "ivf_centroids.npy"),
+                np.load(path / "ivf_offsets.npy"),
+                np.load(path / "ivf_rows.npy", mmap_mode="r"),
+            )
+
+        logger.info(f"Loaded local vector index with {len(metadatas)} documents from {path}")
+        return cls(embedding, vectors, metadatas, text_key=manifest.get("text_key", "class_code"),
+                   model_name=manifest.get("model"), ivf=ivf, nprobe=nprobe)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Cosine similarity already grows with relevance
+        return lambda score: score
+
+    def _to_document(self, row: int) -> Document:
+        metadata = dict(self.metadatas[row])
+        return Document(page_content=str(metadata.get(self.text_key, "")), metadata=metadata)
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if self.ivf is None:
+            return None
+        centroids, offsets, rows = self.ivf
+        nprobe = min(self.nprobe, len(centroids))
+        probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([rows[offsets[i]:offsets[i + 1]] for i in probe])
+
+    def _score(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scores float32 queries, shaped (dim,) or (dim, m), against all rows or the given rows."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if vectors.dtype == np.float32:
+            return vectors @ queries
+        # NumPy has no fast float16 matmul, and converting the whole matrix would copy it
+        # out of the memory map, so convert one chunk at a time
+        return np.concatenate([
+            np.asarray(vectors[start:start + SCORE_CHUNK_ROWS], dtype=np.float32) @ queries
+            for start in range(0, max(len(vectors), 1), SCORE_CHUNK_ROWS)
+        ])
+
+    def _top_k(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if not len(self.metadatas) or k <= 0:
+            return []
+        rows = self._candidate_rows(query)
+        scores = self._score(query, rows)
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]) if rows is not None else int(i), float(scores[i])) for i in top]
+
+    def _prepare_query(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(self._to_document(row), score) for row, score in self._top_k(self._prepare_query(embedding), k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4,
+                                                 **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score(query, k)
+
+    def similarity_search_by_vectors_with_score(self, embeddings: List[List[float]], k: int = 4,
+                                                **kwargs: Any) -> List[List[Tuple[Document, float]]]:
+        """
+        Batch search: one matrix-matrix product scores every query at once.
+
+        Returns:
+            One (document, score) list per query, in query order
+        """
+        if not embeddings:
+            return []
+        if self.ivf is not None:
+            return [self.similarity_search_by_vector_with_score(vector, k) for vector in embeddings]
+
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        scores = self._score(queries.T).T
+        results = []
+        k = min(k, scores.shape[1])
+        for row_scores in scores:
+            if k <= 0:
+                results.append([])
+                continue
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top], kind="stable")]
+            results.append([(self._to_document(int(i)), float(row_scores[i])) for i in top])
+        return results
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4,
+                                     **kwargs: Any) -> List[List[Document]]:
+        return [[doc for doc, _ in hits] for hits in self.similarity_search_by_vectors_with_score(embeddings, k)]
+
+    async def asimilarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4,
+                                            **kwargs: Any) -> List[List[Document]]:
+        # Searches are sub-millisecond CPU work, so running inline beats a thread hop
+        return self.similarity_search_by_vectors(embeddings, k)
+
+    async def asimilarity_search_by_vectors_with_score(self, embeddings: List[List[float]], k: int = 4,
+                                                       **kwargs: Any) -> List[List[Tuple[Document, float]]]:
+        return self.similarity_search_by_vectors_with_score(embeddings, k)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                           **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(embedding, k)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        """Adds documents in memory. Use save_local_index to persist a rebuilt index."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        new_vectors = _normalize_rows(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+        start = len(self.metadatas)
+        for text, metadata in zip(texts, metadatas):
+            self.metadatas.append({**metadata, self.text_key: metadata.get(self.text_key, text)})
+        existing = np.asarray(self.vectors, dtype=np.float32).reshape(-1, new_vectors.shape[1])
+        self.vectors = np.vstack([existing, new_vectors]).astype(self.vectors.dtype)
+        # Cluster assignments no longer cover every row
+        self.ivf = None
+        return [str(i) for i in range(start, len(self.metadatas))]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   text_key: str = "class_code", **kwargs: Any) -> "LocalVectorStore":
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = _normalize_rows(np.asarray(embedding.embed_documents(list(texts)), dtype=np.float32))
+        rows = [{**metadata, text_key: metadata.get(text_key, text)} for text, metadata in zip(texts, metadatas)]
+        return cls(embedding, vectors, rows, text_key=text_key)
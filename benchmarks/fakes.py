@@ -0,0 +1,310 @@
+"""
+Deterministic Stand-ins for the Advising Pipeline's External Services
+Replaces the OpenAI chat models, the OpenAI embeddings client and the Pinecone
+vector store with local fakes, so benchmarks measure the pipeline's own
+overhead. Every fake can sleep for a configurable latency to simulate the
+network round trip of the service it replaces.
+
+Classes:
+- FakeChatModel: Chat model answering each advising prompt in the format its parser expects
+- FakeEmbeddings: Hashed bag-of-words embeddings
+- FakeVectorStore: Pinecone-like store with one round trip per query vector
+
+Functions:
+- generate_catalog: Synthetic course catalog with prerequisite chains
+- generate_program: Degree program drawn from a synthetic catalog
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.vectorstores import VectorStore
+
+from backend.services.vector_store import LocalVectorStore
+
+EMBEDDING_DIMENSION = 256
+MAX_COURSES_PER_SUBJECT = 300
+
+SUBJECTS = ["CS", "MATH", "BA", "ACTG", "FIN", "MKTG", "ECON", "DSCI"]
+TOPICS = [
+    "data structures", "algorithms", "databases", "machine learning", "statistics",
+    "linear algebra", "accounting", "corporate finance", "marketing analytics",
+    "microeconomics", "operating systems", "networks", "security", "optimization",
+    "supply chain", "entrepreneurship", "probability", "software engineering",
+]
+DAYS = ["MWF", "TR", "MW", "F"]
+TIMES = ["09:00", "10:00", "12:00", "14:00", "16:00"]
+
+COURSE_CODE_PATTERN = re.compile(r"\b([A-Z]{2,4} \d{3})\b")
+PROMPT_QUERY_PATTERN = re.compile(r"(?:Student query|STUDENT QUERY|User Query):\s*(.+)")
+
+
+def _stable_seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel:
+    """
+    Chat model stand-in. Recognizes the advising prompts by their markers and
+    answers in the format their parsers expect, reporting usage like ChatOpenAI.
+    """
+
+    def __init__(self, model_name: str, latency: float = 0.0):
+        self.model_name = model_name
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        if '"course_codes"' in prompt:
+            # Pick the first candidates that were offered, like a model following instructions
+            section = prompt.split("AVAILABLE COURSES:", 1)[-1]
+            codes = list(dict.fromkeys(COURSE_CODE_PATTERN.findall(section)))[:4]
+            return json.dumps({"course_codes": codes})
+        if '"search_queries"' in prompt:
+            match = PROMPT_QUERY_PATTERN.search(prompt)
+            query = match.group(1).strip() if match else "next term courses"
+            topic = TOPICS[_stable_seed(query) % len(TOPICS)]
+            return json.dumps({"search_queries": [
+                query,
+                f"upper division {topic} courses",
+                f"{topic} prerequisites and electives",
+            ]})
+        if '"intent"' in prompt:
+            return '{"intent": "COURSE", "category": "COURSE_RECOMMENDATION"}'
+        if "COURSE:" in prompt and "GENERAL:" in prompt:
+            return "COURSE"
+        return "Here are some courses that fit your plan and keep you on track for graduation! 📚"
+
+    def _message(self, prompt: Any) -> AIMessage:
+        self.calls += 1
+        text = str(prompt)
+        content = self._answer(text)
+        prompt_tokens, completion_tokens = _estimate_tokens(text), _estimate_tokens(content)
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+
+    def invoke(self, prompt: Any, **kwargs: Any) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._message(prompt)
+
+    async def ainvoke(self, prompt: Any, **kwargs: Any) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._message(prompt)
+
+    async def astream(self, prompt: Any, **kwargs: Any) -> AsyncIterator[AIMessageChunk]:
+        # Word-sized chunks, with usage reported on the last one like OpenAI's stream_usage
+        message = await self.ainvoke(prompt)
+        words = re.findall(r"\S+\s*", message.content)
+        for index, word in enumerate(words):
+            last = index == len(words) - 1
+            yield AIMessageChunk(
+                content=word,
+                usage_metadata=message.usage_metadata if last else None,
+                response_metadata=message.response_metadata if last else {},
+            )
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings: each word maps to a fixed random direction,
+    so texts sharing words are similar. One simulated round trip per call.
+    """
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+        self._word_vectors: Dict[str, np.ndarray] = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(_stable_seed(word))
+            vector = self._word_vectors[word] = rng.standard_normal(self.dimension).astype(np.float32)
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _words(text):
+            vector += self._word_vector(word)
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeVectorStore(VectorStore):
+    """
+    Stand-in for the Pinecone store. Scores with an in-memory exact index but,
+    like Pinecone, only offers one query vector per round trip, so the query
+    engine takes the same concurrent per-query path it takes in production.
+    """
+
+    def __init__(self, embedding: Embeddings, records: List[Dict[str, Any]], latency: float = 0.0):
+        texts = [
+            f"{record['class_code']} {record['course_name']} {record['description']}" for record in records
+        ]
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        self._index = LocalVectorStore(embedding, vectors, records)
+        # Exposed like the local index, so the hybrid retriever indexes the same corpus
+        self.metadatas = records
+        self.latency = latency
+        self.calls = 0
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._index.embeddings
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._index.similarity_search_by_vector_with_score(embedding, k=k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("FakeVectorStore is read-only")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "FakeVectorStore":
+        return cls(embedding, [dict(metadata or {}) for metadata in (metadatas or [])])
+
+
+def generate_catalog(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Builds a synthetic catalog in the vector metadata format.
+    Courses above the 100 level require one or two lower-level courses of the
+    same subject, sometimes as alternatives, like the real catalog. Records are
+    ordered level by level, so a prefix of the catalog is prerequisite-closed.
+
+    Args:
+        size: Number of courses
+        seed: Random seed; the same seed always yields the same catalog
+
+    Returns:
+        Course records ordered by level, then subject
+    """
+    rng = random.Random(seed)
+    # Extra synthetic subjects keep every subject within the 100-499 number range
+    subjects = list(SUBJECTS)
+    while len(subjects) * MAX_COURSES_PER_SUBJECT < size:
+        index = len(subjects) - len(SUBJECTS)
+        subjects.append("X" + chr(ord("A") + index // 26) + chr(ord("A") + index % 26))
+    per_subject = -(-size // len(subjects))
+
+    by_subject: Dict[str, List[str]] = {subject: [] for subject in subjects}
+    records = []
+    for index in range(per_subject):
+        number = 100 + index * 400 // per_subject
+        for subject in subjects:
+            if len(records) == size:
+                break
+            code = f"{subject} {number}"
+            lower = [prior for prior in by_subject[subject] if int(prior.split()[1]) // 100 < number // 100]
+            if not lower:
+                prerequisites = ""
+            elif len(lower) > 1 and rng.random() < 0.3:
+                first, second = rng.sample(lower[-6:], 2)
+                prerequisites = f"Prereq: {first} or {second}."
+            else:
+                prerequisites = f"Prereq: {rng.choice(lower[-6:])}."
+            topic = rng.choice(TOPICS)
+            seats = rng.randint(0, 40)
+            records.append({
+                "class_code": code,
+                "course_name": f"{topic.title()} {number // 100}",
+                "credits": "4",
+                "description": f"Covers {topic} and {rng.choice(TOPICS)} with applications in {subject.lower()}.",
+                "prerequisites": prerequisites,
+                "instructor": f"Instructor {rng.randint(1, 200)}",
+                "days": rng.choice(DAYS),
+                "time": rng.choice(TIMES),
+                "classroom": f"Room {rng.randint(100, 400)}",
+                "available_seats": str(seats),
+                "total_seats": str(max(seats, 40)),
+            })
+            by_subject[subject].append(code)
+    return records
+
+
+def generate_program(catalog: List[Dict[str, Any]], required: int = 12, groups: int = 3,
+                     group_options: int = 6, seed: int = 0) -> List[Any]:
+    """
+    Builds the required_courses of a degree program over a synthetic catalog.
+
+    Args:
+        catalog: Records from generate_catalog
+        required: Number of individually required courses
+        groups: Number of "choose 2" elective groups
+        group_options: Courses offered per elective group
+        seed: Random seed
+
+    Returns:
+        Requirement list in the UserProgram.required_courses format
+    """
+    rng = random.Random(seed)
+    codes = [record["class_code"] for record in catalog]
+    # Required courses come from the lower levels so a long history completes them first
+    requirements: List[Any] = codes[:min(required, len(codes))]
+    upper = codes[len(requirements):]
+    for index in range(groups):
+        if len(upper) < group_options:
+            break
+        requirements.append({
+            "requirement_name": f"Elective Group {index + 1}",
+            "options": rng.sample(upper, group_options),
+            "courses_needed": 2,
+        })
+    return requirements
@@ -0,0 +1,413 @@
+"""
+Offline Benchmarks for the Advising Pipeline
+Runs the query engine, the RAG formatting and the HTTP endpoints against
+deterministic fakes of OpenAI and Pinecone (see benchmarks/fakes.py), over
+synthetic catalogs and student histories of several sizes. Results are written
+as JSON and can be compared with an earlier run to catch regressions.
+
+With the default zero latency the timings are the pipeline's own overhead;
+pass --llm-latency-ms and friends to simulate the network.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --catalog-sizes 200,2000 --history-sizes 0,40 --iterations 30
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/baseline.json --threshold 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+WORK_DIR = Path(tempfile.mkdtemp(prefix="advisor-bench-"))
+
+# The backend reads its configuration at import time, so point it at throwaway
+# local resources before anything from it is imported
+os.environ["DATABASE_URL"] = os.getenv("BENCHMARK_DATABASE_URL", f"sqlite:///{WORK_DIR / 'benchmark.db'}")
+os.environ["VECTOR_BACKEND"] = "local"
+os.environ["LOCAL_VECTOR_INDEX_DIR"] = str(WORK_DIR / "vector_index")
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["ADVISING_JOB_DB_PATH"] = str(WORK_DIR / "jobs.sqlite3")
+os.environ.setdefault("JOB_POLL_INTERVAL", "0.005")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("PINECONE_API_KEY", "benchmark")
+
+from benchmarks.fakes import (  # noqa: E402
+    FakeChatModel, FakeEmbeddings, FakeVectorStore, generate_catalog, generate_program
+)
+from backend.core.database import Base, engine, SessionLocal, User, Course, Major, UserProgram  # noqa: E402
+from backend.core.auth import create_access_token  # noqa: E402
+from backend.services import query_engine  # noqa: E402
+from backend.services.embedding_cache import CachedEmbeddings  # noqa: E402
+from backend.services.metrics import start_request_trace, end_request_trace  # noqa: E402
+from backend.services.precompute import PrecomputedRecommendations  # noqa: E402
+from backend.services.programs import format_courses_for_rag  # noqa: E402
+from backend.services.response_cache import response_cache  # noqa: E402
+
+logger = logging.getLogger("benchmarks")
+
+DEFAULT_CATALOG_SIZES = "100,1000,5000"
+DEFAULT_HISTORY_SIZES = "0,20,60"
+COURSE_QUERY = "Which upper division electives should I take to finish my major?"
+GENERAL_QUERY = "Thanks, that was really helpful!"
+
+# Differences under this many milliseconds are noise, whatever the ratio
+REGRESSION_FLOOR_MS = 0.5
+
+
+class Fakes:
+    """The fake services installed into the query engine for one catalog."""
+
+    def __init__(self, catalog: List[Dict[str, Any]], llm_latency: float, embed_latency: float,
+                 vector_latency: float):
+        self.embeddings = FakeEmbeddings(latency=embed_latency)
+        # Embed the corpus without simulated latency; only queries pay the round trip
+        self.embeddings.latency = 0.0
+        self.vectorstore = FakeVectorStore(self.embeddings, catalog, latency=vector_latency)
+        self.embeddings.latency = embed_latency
+        self.models = {
+            "intent_classifier": FakeChatModel("gpt-4o-mini", llm_latency),
+            "reasoning_model": FakeChatModel("o1-mini", llm_latency),
+            "speculative_reasoning_model": FakeChatModel("o1-mini", llm_latency),
+            "response_model": FakeChatModel("gpt-4o", llm_latency),
+        }
+
+    def install(self):
+        for name, model in self.models.items():
+            setattr(query_engine, name, model)
+        query_engine.vectorstore = self.vectorstore
+        # Corpus indexes are rebuilt from the new catalog on first use
+        query_engine._hybrid_retriever = None
+        query_engine._prerequisite_graph = None
+        query_engine._course_index = None
+        reset_caches(self)
+
+
+def reset_caches(fakes: Fakes):
+    """Empties every per-request cache so the next call runs the full pipeline."""
+    response_cache.clear()
+    query_engine.recommendation_store = PrecomputedRecommendations()
+    query_engine.embeddings = CachedEmbeddings(fakes.embeddings, query_engine.EMBEDDING_MODEL, path=None)
+
+
+def seed_users(catalog: List[Dict[str, Any]], history_sizes: List[int]) -> Dict[int, Tuple[int, str]]:
+    """
+    Recreates the database with one student per history size.
+
+    Returns:
+        Map of history size to (user ID, username)
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        courses = {}
+        for record in catalog[:max(history_sizes, default=0)]:
+            course = Course(course_code=record["class_code"], course_name=record["course_name"])
+            courses[record["class_code"]] = course
+            db.add(course)
+        major = Major(name="Synthetic Studies")
+        db.add(major)
+        requirements = generate_program(catalog)
+
+        users = {}
+        for history_size in history_sizes:
+            username = f"student{history_size}"
+            user = User(email=f"{username}@example.edu", username=username, hashed_password="x")
+            user.courses = [courses[record["class_code"]] for record in catalog[:history_size]]
+            user.majors = [major]
+            db.add(user)
+            db.flush()
+            db.add(UserProgram(user_id=user.id, program_type="major", program_name="Synthetic Studies",
+                               required_courses=requirements))
+            users[history_size] = (user.id, username)
+        db.commit()
+        return users
+    finally:
+        db.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(run: Callable[[], Any], iterations: int, warmup: int,
+            before: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Times a callable and the pipeline stages it went through.
+
+    Args:
+        run: The operation to time
+        iterations: Timed repetitions
+        warmup: Untimed repetitions first, which also build the lazy corpus indexes
+        before: Untimed setup before every repetition, such as clearing caches
+
+    Returns:
+        Summary statistics in milliseconds, with the median time of each stage
+    """
+    durations = []
+    stage_times: Dict[str, List[float]] = {}
+    for index in range(warmup + iterations):
+        if before:
+            before()
+        trace, token = start_request_trace()
+        started = time.perf_counter()
+        try:
+            run()
+        finally:
+            elapsed = time.perf_counter() - started
+            end_request_trace(token)
+        if index < warmup:
+            continue
+        durations.append(elapsed * 1000)
+        per_stage: Dict[str, float] = {}
+        for record in trace.records:
+            per_stage[record.stage] = per_stage.get(record.stage, 0.0) + record.duration * 1000
+        for stage, value in per_stage.items():
+            stage_times.setdefault(stage, []).append(value)
+
+    return {
+        "iterations": iterations,
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(_percentile(durations, 0.95), 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "stages_median_ms": {
+            stage: round(statistics.median(values), 3) for stage, values in sorted(stage_times.items())
+        },
+    }
+
+
+def pipeline_cases(fakes: Fakes, user_id: int) -> Dict[str, Tuple[Callable[[], Any], Callable[[], None]]]:
+    """Benchmark cases calling the query engine and RAG formatting directly."""
+    db = SessionLocal()
+    context = query_engine.build_user_context(db, user_id)
+    search_results = query_engine.optimized_course_search(db, user_id, COURSE_QUERY, context)
+    candidates = query_engine.format_course_data(search_results)
+    lookup_query = f"Who teaches {candidates[0]['course_code']}?" if candidates else "Who teaches CS 100?"
+    cold = lambda: reset_caches(fakes)  # noqa: E731
+
+    return {
+        "get_advice.default": (lambda: query_engine.get_advice(db, user_id), cold),
+        "get_advice.course": (lambda: query_engine.get_advice(db, user_id, COURSE_QUERY, intent="COURSE"), cold),
+        "get_advice.course_cached": (
+            lambda: query_engine.get_advice(db, user_id, COURSE_QUERY, intent="COURSE"), None
+        ),
+        "get_advice.lookup": (lambda: query_engine.get_advice(db, user_id, lookup_query), None),
+        "optimized_course_search": (
+            lambda: query_engine.optimized_course_search(db, user_id, COURSE_QUERY, context), cold
+        ),
+        "reasoning_based_recommendations": (
+            lambda: query_engine.reasoning_based_recommendations(db, user_id, COURSE_QUERY, candidates, context),
+            None,
+        ),
+        "format_courses_for_rag": (lambda: format_courses_for_rag(db, user_id), None),
+    }
+
+
+_http_client = None
+
+
+def _client():
+    # One client for the whole run; entering it runs the startup hooks, which start the job workers
+    global _http_client
+    if _http_client is None:
+        from fastapi.testclient import TestClient
+        import main
+        _http_client = TestClient(main.app).__enter__()
+    return _http_client
+
+
+def http_cases(fakes: Fakes, username: str) -> Dict[str, Tuple[Callable[[], Any], Callable[[], None]]]:
+    """Benchmark cases going through the FastAPI app, authentication included."""
+    client = _client()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+    cold = lambda: reset_caches(fakes)  # noqa: E731
+
+    def post_advising(message: str):
+        response = client.post("/api/advising", json={"message": message}, headers=headers)
+        response.raise_for_status()
+        job_id = response.json().get("job_id")
+        # Course queries are queued; poll the job like the frontend does, without its 1 s interval
+        while job_id and client.get(f"/api/advising/pending/{job_id}", headers=headers).json()["pending"]:
+            time.sleep(0.001)
+
+    def stream_advising(message: str):
+        with client.stream("POST", "/api/advising/stream", json={"message": message}, headers=headers) as response:
+            response.raise_for_status()
+            for _ in response.iter_bytes():
+                pass
+
+    def get(path: str):
+        client.get(path, headers=headers).raise_for_status()
+
+    return {
+        "http.advising.general": (lambda: post_advising(GENERAL_QUERY), None),
+        "http.advising.course": (lambda: post_advising(COURSE_QUERY), cold),
+        "http.advising.stream": (lambda: stream_advising(COURSE_QUERY), cold),
+        "http.recommendations.default": (lambda: get("/api/recommendations/"), cold),
+        "http.programs.audit": (lambda: get("/api/programs/audit"), None),
+    }
+
+
+def corpus_build_case(fakes: Fakes) -> Dict[str, Any]:
+    """Times building the hybrid retriever, prerequisite graph and course index for a catalog."""
+    def build():
+        query_engine._hybrid_retriever = None
+        query_engine._prerequisite_graph = None
+        query_engine._course_index = None
+        query_engine.get_hybrid_retriever()
+        query_engine.get_prerequisite_graph()
+        query_engine.get_course_index()
+    return measure(build, iterations=3, warmup=0)
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    catalog_sizes = [int(size) for size in args.catalog_sizes.split(",")]
+    history_sizes = [int(size) for size in args.history_sizes.split(",")]
+    results = []
+
+    for catalog_size in catalog_sizes:
+        catalog = generate_catalog(catalog_size, seed=args.seed)
+        fakes = Fakes(catalog, args.llm_latency_ms / 1000, args.embed_latency_ms / 1000,
+                      args.vector_latency_ms / 1000)
+        fakes.install()
+        users = seed_users(catalog, history_sizes)
+
+        summary = corpus_build_case(fakes)
+        results.append({"name": "corpus_build", "catalog_size": catalog_size, "history_size": None, **summary})
+        print(f"[catalog {catalog_size}] corpus_build: {summary['median_ms']:.2f} ms")
+
+        for history_size in history_sizes:
+            user_id, username = users[history_size]
+            cases = pipeline_cases(fakes, user_id)
+            if not args.skip_http:
+                cases.update(http_cases(fakes, username))
+            for name, (run, before) in cases.items():
+                if args.only and not any(name.startswith(prefix) for prefix in args.only.split(",")):
+                    continue
+                summary = measure(run, args.iterations, args.warmup, before)
+                results.append({"name": name, "catalog_size": catalog_size, "history_size": history_size,
+                                **summary})
+                print(f"[catalog {catalog_size}, history {history_size}] {name}: "
+                      f"median {summary['median_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms")
+
+    if _http_client is not None:
+        # Runs the shutdown hooks, stopping the job workers
+        _http_client.__exit__(None, None, None)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "catalog_sizes": catalog_sizes,
+                "history_sizes": history_sizes,
+                "iterations": args.iterations,
+                "warmup": args.warmup,
+                "seed": args.seed,
+                "llm_latency_ms": args.llm_latency_ms,
+                "embed_latency_ms": args.embed_latency_ms,
+                "vector_latency_ms": args.vector_latency_ms,
+            },
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Finds benchmarks whose median got slower than the baseline by more than the threshold.
+
+    Args:
+        current: This run's results
+        baseline: Results of an earlier run
+        threshold: Allowed relative slowdown, 0.2 for 20%
+
+    Returns:
+        One line per regression
+    """
+    def key(result):
+        return result["name"], result["catalog_size"], result["history_size"]
+
+    previous = {key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        now_ms, before_ms = result["median_ms"], before["median_ms"]
+        if now_ms > before_ms * (1 + threshold) and now_ms - before_ms > REGRESSION_FLOOR_MS:
+            regressions.append(
+                f"{result['name']} (catalog {result['catalog_size']}, history {result['history_size']}): "
+                f"{before_ms:.2f} ms -> {now_ms:.2f} ms (+{(now_ms / before_ms - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the advising pipeline against local fakes")
+    parser.add_argument("--catalog-sizes", default=DEFAULT_CATALOG_SIZES, help="Comma-separated catalog sizes")
+    parser.add_argument("--history-sizes", default=DEFAULT_HISTORY_SIZES,
+                        help="Comma-separated numbers of completed courses per student")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per chat call")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Simulated latency per embedding call")
+    parser.add_argument("--vector-latency-ms", type=float, default=0.0, help="Simulated latency per vector query")
+    parser.add_argument("--only", help="Comma-separated benchmark name prefixes to run")
+    parser.add_argument("--skip-http", action="store_true", help="Skip the HTTP endpoint benchmarks")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown vs the baseline")
+    parser.add_argument("--log-level", default="WARNING", help="Backend log level while benchmarking")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    report = run_benchmarks(args)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare_results(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,7 @@ import TypingIndicator from './TypingIndicator';
 import ClassManagementModal from './ClassManagementModal'; // Added component
 import { useAuth } from '../context/AuthContext';
 import { useNotification } from '../context/NotificationContext';
-import { sendMessage, checkPendingResponse } from '../services/advisingService';
+import { sendMessage, checkPendingResponse, streamMessage } from '../services/advisingService';
 import './AdvisingChat.css';
 import './CourseRecommendation.css';
 
@@ -24,6 +24,7 @@ const AdvisingChat = () => {
   const messagesEndRef = useRef(null);
   const inputRef = useRef(null);
   const pollTimerRef = useRef(null);
+  const streamCountRef = useRef(0);
 
   // Debug logging for message state changes
   useEffect(() => {
@@ -70,7 +71,7 @@ const AdvisingChat = () => {
   };
 
   // Start polling for response
-  const startPollingForResponse = () => {
+  const startPollingForResponse = (jobId) => {
     setIsPolling(true);
     let pollCount = 0;
     const maxPolls = 30; // Stop after 30 attempts (30 seconds)
@@ -79,7 +80,7 @@ const AdvisingChat = () => {
       try {
         pollCount++;
         
-        const pendingResponse = await checkPendingResponse();
+        const pendingResponse = await checkPendingResponse(jobId);
         
         if (pendingResponse && pendingResponse.response && !pendingResponse.pending) {
           // Got a response, stop polling
@@ -120,6 +121,65 @@ const AdvisingChat = () => {
     }, 1000); // Check every second
   };
 
+  // Create or update the advisor message being streamed
+  const updateStreamingMessage = (streamId, update) => {
+    setMessages(prev => {
+      if (prev.some(msg => msg.streamId === streamId)) {
+        return prev.map(msg => msg.streamId === streamId ? { ...msg, content: update(msg.content) } : msg);
+      }
+      return [...prev, { content: update(null), isUser: false, streamId }];
+    });
+  };
+
+  // Stream the answer: acknowledgment, then course cards as they're ranked, then the message.
+  // Returns false if the stream couldn't be opened, so the caller can fall back to polling.
+  const streamResponse = async (message) => {
+    const streamId = ++streamCountRef.current;
+    let received = false;
+
+    try {
+      await streamMessage(message, (event, data) => {
+        received = true;
+        switch (event) {
+          case 'ack':
+            setMessages(prev => [...prev, { content: data, isUser: false, isAcknowledgment: true }]);
+            break;
+          case 'course':
+            updateStreamingMessage(streamId, content => ({
+              type: 'course_recommendations',
+              message: content && typeof content === 'object' ? content.message : '',
+              course_data: [...(content && content.course_data ? content.course_data : []), data]
+            }));
+            break;
+          case 'token':
+            updateStreamingMessage(streamId, content => (
+              content && typeof content === 'object'
+                ? { ...content, message: content.message + data }
+                : (content || '') + data
+            ));
+            break;
+          case 'done':
+          case 'error':
+            // The final response replaces whatever was assembled from the stream
+            updateStreamingMessage(streamId, () => data);
+            setIsWaitingForResponse(false);
+            break;
+          default:
+            break;
+        }
+      });
+    } catch (error) {
+      if (!received) {
+        console.warn('Streaming unavailable, falling back to polling:', error);
+        return false;
+      }
+      handleErrorResponse(`Response stream interrupted: ${error.message}`);
+    }
+
+    setIsWaitingForResponse(false);
+    return true;
+  };
+
   // Handle input change
   const handleInputChange = (e) => {
     setInputValue(e.target.value);
@@ -145,6 +205,11 @@ const AdvisingChat = () => {
     // Set waiting state
     setIsWaitingForResponse(true);
     
+    // Stream the answer when possible; otherwise queue it and poll
+    if (await streamResponse(message)) {
+      return;
+    }
+
     try {
       // Send message to API
       const response = await sendMessage(message);
@@ -160,7 +225,7 @@ const AdvisingChat = () => {
           }]);
           
           // Start polling for the full response
-          startPollingForResponse();
+          startPollingForResponse(response.job_id);
         } else {
           // This is a final response (for general conversation)
           setMessages(prev => [...prev, { content: response.response, isUser: false }]);
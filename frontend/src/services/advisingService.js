@@ -8,15 +8,67 @@ export const sendMessage = async (message) => {
   return response.data;
 };
 
-export const checkPendingResponse = async () => {
-  const response = await api.get('/advising/pending');
+// Check whether a queued advising job has finished
+export const checkPendingResponse = async (jobId) => {
+  const response = await api.get(`/advising/pending/${encodeURIComponent(jobId)}`);
   return response.data;
 };
 
-export default {
-  sendMessage,
-  checkPendingResponse
+// Parse one Server-Sent Events frame into { event, data }
+const parseEvent = (frame) => {
+  let event = 'message';
+  const dataLines = [];
+  frame.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trimStart());
+    }
+  });
+  return dataLines.length ? { event, data: JSON.parse(dataLines.join('\n')) } : null;
 };
 
+// Stream the advisor's answer, calling onEvent(event, data) for each event as it arrives.
+// Uses fetch rather than EventSource, which can't POST or send the auth header.
+export const streamMessage = async (message, onEvent) => {
+  const headers = { 'Content-Type': 'application/json', Accept: 'text/event-stream' };
+  const token = localStorage.getItem('token');
+  if (token) {
+    headers.Authorization = `Bearer ${token}`;
+  }
+
+  const response = await fetch('/api/advising/stream', {
+    method: 'POST',
+    headers,
+    body: JSON.stringify({ message })
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Streaming request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
 
+    // Frames end with a blank line; keep any partial frame for the next chunk
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const parsed = parseEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      if (parsed) {
+        onEvent(parsed.event, parsed.data);
+      }
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+};
 
+export default {
+  sendMessage,
+  checkPendingResponse,
+  streamMessage
+};
@@ -1,12 +1,20 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, JSONResponse
 import os
+import asyncio
+import json
 import logging
 from pathlib import Path
 from backend.api.routes import router
 from backend.routes import program_routes, recommendations
+from backend.services.metrics import (
+    DEBUG_TIMING_ENABLED, DEBUG_TIMING_HEADER, start_request_trace, end_request_trace, render_prometheus
+)
+from backend.services.advising_jobs import advising_jobs
+from backend.services.concurrency import aclose_openai_http_clients
+from backend.services.query_engine import awarm_up, dependency_status
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -42,6 +50,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Run queued advising jobs in this worker process
+@app.on_event("startup")
+async def start_job_workers():
+    advising_jobs.start()
+
+# Connect to Pinecone and OpenAI in the background, bounded by WARMUP_TIMEOUT,
+# so the worker accepts connections at once; /ready reports when it's done
+@app.on_event("startup")
+async def start_warm_up():
+    app.state.warm_up = asyncio.create_task(awarm_up())
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await advising_jobs.stop()
+
+# After the job workers, which may still be mid-call
+@app.on_event("shutdown")
+async def close_http_clients():
+    await aclose_openai_http_clients()
+
+# Per-request stage breakdown for requests sending the X-Debug-Timing header
+@app.middleware("http")
+async def debug_timing(request: Request, call_next):
+    if not DEBUG_TIMING_ENABLED or DEBUG_TIMING_HEADER not in request.headers:
+        return await call_next(request)
+    trace, token = start_request_trace()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_trace(token)
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers[DEBUG_TIMING_HEADER] = json.dumps(trace.summary(), separators=(",", ":"))
+    return response
+
 # API routes here if needed
 app.include_router(router, prefix="/api")
 
@@ -49,6 +91,20 @@ app.include_router(router, prefix="/api")
 app.include_router(program_routes.router, prefix="/api")
 app.include_router(recommendations.router, prefix="/api")
 
+# Prometheus scrape endpoint for the per-stage latency, token and cost metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Readiness probe: 200 once the query engine's dependencies are up, 503 until then.
+# A probe after a failed warm-up starts another, so the worker recovers on its own.
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    report = dependency_status()
+    if not report["ready"] and app.state.warm_up.done():
+        app.state.warm_up = asyncio.create_task(awarm_up())
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 # Explicitly serve the production index.html for the root path
 @app.get("/")
 async def serve_index():
@@ -0,0 +1,99 @@
+"""
+Builds the local vector index used when VECTOR_BACKEND=local.
+
+Sources:
+- pinecone: exports the vectors and metadata already ingested into the
+  duckweb-spring24 Pinecone index (no re-embedding needed)
+- catalog: embeds the courses scraped into data/business_catalog
+
+Usage:
+    python scripts/build_local_index.py --source pinecone
+    python scripts/build_local_index.py --source catalog --dtype float16 --ivf-lists 64
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+from backend.services.course_catalog import load_catalog_courses
+from backend.services.vector_store import save_local_index, LOCAL_VECTOR_INDEX_DIR
+
+load_dotenv()
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+INDEX_NAME = "duckweb-spring24"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+FETCH_BATCH_SIZE = 100
+EMBED_BATCH_SIZE = 100
+
+
+def export_from_pinecone():
+    """Reads every vector and its metadata from the Pinecone index."""
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    index = pc.Index(INDEX_NAME)
+
+    vectors, metadatas = [], []
+    for ids in index.list():
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            response = index.fetch(ids=ids[start:start + FETCH_BATCH_SIZE])
+            for vector_id, vector in response.vectors.items():
+                metadata = dict(vector.metadata or {})
+                metadata.setdefault("id", vector_id)
+                vectors.append(list(vector.values))
+                metadatas.append(metadata)
+        print(f"Exported {len(vectors)} vectors...")
+    return vectors, metadatas
+
+
+def export_from_catalog():
+    """Embeds the catalog courses with the same model the query engine uses."""
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model=EMBEDDING_MODEL)
+    metadatas = load_catalog_courses()
+    texts = [
+        f"{course['class_code']} {course['course_name']}. {course['description']} "
+        f"Prerequisites: {course['prerequisites']}"
+        for course in metadatas
+    ]
+
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        print(f"Embedded {len(vectors)}/{len(texts)} courses...")
+    return vectors, metadatas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local vector index")
+    parser.add_argument("--source", choices=["pinecone", "catalog"], default="pinecone")
+    parser.add_argument("--output", default=LOCAL_VECTOR_INDEX_DIR)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--ivf-lists", type=int, default=0,
+                        help="Number of IVF clusters; 0 keeps exact search (fine for a few thousand courses)")
+    args = parser.parse_args()
+
+    if args.source == "pinecone":
+        vectors, metadatas = export_from_pinecone()
+    else:
+        vectors, metadatas = export_from_catalog()
+
+    if not vectors:
+        print("No vectors found, nothing written")
+        return
+
+    save_local_index(args.output, vectors, metadatas, model_name=EMBEDDING_MODEL,
+                     dtype=args.dtype, ivf_lists=args.ivf_lists)
+    print(f"Wrote {len(vectors)} documents to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Shared test setup for the backend unit tests."""
+
+import os
+import tempfile
+from pathlib import Path
+
+WORK_DIR = Path(tempfile.mkdtemp(prefix="advisor-tests-"))
+
+# The backend reads its configuration at import time, so point it at throwaway
+# local resources before any test module imports it
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR / 'test.db'}"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["ADVISING_JOB_DB_PATH"] = str(WORK_DIR / "jobs.sqlite3")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
@@ -0,0 +1,72 @@
+"""Tests for recognizing and answering direct course lookups."""
+
+import pytest
+
+from backend.services.course_catalog import get_catalog_courses
+from backend.services.course_lookup import CourseIndex, CourseLookup, build_lookup_message, detect_lookup
+
+SECTIONS = CourseIndex([
+    {"class_code": "FIN 316", "course_name": "Financial Management", "description": "Corporate finance.",
+     "instructor": "Lee", "days": "MWF", "time": "10:00", "classroom": "LIL 101",
+     "available_seats": "3", "total_seats": "30", "prerequisites": "BA 101Z", "credits": "4"},
+    {"class_code": "FIN 316", "instructor": "Park", "days": "TR", "time": "14:00", "classroom": "LIL 282",
+     "available_seats": "0", "total_seats": "30"},
+])
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return CourseIndex(get_catalog_courses())
+
+
+@pytest.mark.parametrize("query, attributes", [
+    ("what is BA 101Z?", ["description"]),
+    ("What's BA 101Z about?", ["description"]),
+    ("describe ba101z", ["description"]),
+    ("how many credits is BA 101Z?", ["credits"]),
+])
+def test_catalog_lookups(catalog, query, attributes):
+    assert detect_lookup(query, catalog) == CourseLookup("BA 101Z", attributes)
+
+
+@pytest.mark.parametrize("query", [
+    "I finished BA 101Z, what is next?",
+    "what's after BA 211Z?",
+    "I'm in BA 101Z right now, what do I learn after?",
+    "what comes after BA 101Z?",
+    "what should I take with BA 101Z?",
+    "does BA 101Z count toward my major?",
+    "what can I take following BA 101Z?",
+])
+def test_planning_questions_go_to_the_pipeline(catalog, query):
+    assert detect_lookup(query, catalog) is None
+
+
+@pytest.mark.parametrize("query", [
+    # The catalog has no schedules, instructors, rooms or seats
+    "when does BA 101Z meet?",
+    "who teaches BA 101Z?",
+    "is BA 101Z full?",
+    # Not a seats question
+    "is FIN 316 open to sophomores?",
+    # Two courses, or none the catalog knows
+    "what is BA 101Z and BA 211Z?",
+    "what is ZZZ 999?",
+])
+def test_questions_the_index_cannot_answer(catalog, query):
+    assert detect_lookup(query, catalog) is None
+
+
+def test_section_lookups_and_answers():
+    lookup = detect_lookup("who teaches FIN 316 and when does it meet?", SECTIONS)
+    assert lookup == CourseLookup("FIN 316", ["instructor", "schedule"])
+    assert build_lookup_message(lookup, SECTIONS.get("FIN 316")) == (
+        "FIN 316 is taught by Lee (MWF at 10:00) and Park (TR at 14:00). "
+        "FIN 316 meets MWF at 10:00 and TR at 14:00."
+    )
+
+    lookup = detect_lookup("is FIN 316 open?", SECTIONS)
+    assert lookup == CourseLookup("FIN 316", ["seats"])
+    assert build_lookup_message(lookup, SECTIONS.get("FIN 316")) == (
+        "FIN 316 has 3 of 30 seats open in the MWF at 10:00 section and no open seats in the TR at 14:00 section."
+    )
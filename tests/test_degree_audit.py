@@ -0,0 +1,91 @@
+"""Tests for compiling program requirements and auditing completed courses against them."""
+
+from backend.services.degree_audit import _compile_requirements, audit_programs, render_audit_for_rag
+from backend.services.prerequisites import build_prerequisite_graph
+
+
+def compiled(required_courses):
+    return [(r.name, r.options, r.needed) for r in _compile_requirements(required_courses)]
+
+
+def test_plain_codes_and_course_code_entries():
+    assert compiled(["cs 210", {"course_code": "CS211"}, "", {"course_name": "no code"}]) == [
+        ("CS 210", ("CS 210",), 1),
+        ("CS 211", ("CS 211",), 1),
+    ]
+
+
+def test_option_groups():
+    requirements = compiled([
+        {"requirement_name": "Upper division", "options": ["CS 313", {"course_code": "CS 314"}, "CS 313"],
+         "courses_needed": 2},
+        {"options": ["MATH 231", "MATH 232"]},
+        {"requirement_name": "Empty", "options": []},
+    ])
+    assert requirements == [
+        ("Upper division", ("CS 313", "CS 314"), 2),
+        ("MATH 231, MATH 232", ("MATH 231", "MATH 232"), 1),
+    ]
+
+
+def test_bad_courses_needed_values():
+    def needed(value):
+        return compiled([{"options": ["CS 313", "CS 314", "CS 315"], "courses_needed": value}])[0][2]
+
+    assert needed("two") == 1
+    assert needed(None) == 1
+    assert needed(0) == 1
+    assert needed(-3) == 1
+    assert needed("2") == 2
+    assert needed(10) == 3
+
+
+def test_required_courses_not_a_list():
+    assert compiled(None) == []
+    assert compiled({"options": ["CS 210"]}) == []
+
+
+def test_audit_programs():
+    programs = {
+        "Computer Science": {
+            "program_type": "major",
+            "required_courses": [
+                "CS 210",
+                "CS 211",
+                "CS 212",
+                {"requirement_name": "Upper division", "options": ["CS 313", "CS 314", "CS 315"], "courses_needed": 2},
+            ],
+        },
+        "Mathematics": {"program_type": "minor", "required_courses": ["CS 210", "MATH 251"]},
+    }
+    audit = audit_programs(["cs 210", "CS 211", "CS 313"], programs)
+    major, minor = audit["programs"]
+
+    assert [status["name"] for status in major["satisfied"]] == ["CS 210", "CS 211"]
+    assert major["partial"][0]["completed"] == ["CS 313"]
+    assert major["partial"][0]["still_needed"] == 1
+    assert [status["name"] for status in major["remaining"]] == ["CS 212"]
+    assert major["percent_complete"] == 50.0
+    # A course shared by two programs counts toward both
+    assert [status["name"] for status in minor["satisfied"]] == ["CS 210"]
+    assert audit["remaining_courses"] == ["CS 314", "CS 315", "CS 212", "MATH 251"]
+
+    text = render_audit_for_rag(audit)
+    assert "Computer Science major: 2 of 4 requirements met" in text
+    assert "Upper division - 1 more from CS 314, CS 315" in text
+
+
+def test_equivalent_courses_count_toward_requirements():
+    graph = build_prerequisite_graph([{"class_code": "BA 101Z", "equivalent_to": "BA 101"}])
+    programs = {"Business": {"program_type": "major", "required_courses": ["BA 101"]}}
+
+    assert audit_programs(["BA 101Z"], programs)["programs"][0]["remaining"]
+    audit = audit_programs(["BA 101Z"], programs, graph.equivalents)
+    assert [status["name"] for status in audit["programs"][0]["satisfied"]] == ["BA 101"]
+    assert audit["remaining_courses"] == []
+
+
+def test_program_without_requirements_is_complete():
+    audit = audit_programs([], {"Undeclared": {"program_type": "major", "required_courses": []}})
+    assert audit["programs"][0]["percent_complete"] == 100.0
+    assert render_audit_for_rag({"programs": []}) == ""
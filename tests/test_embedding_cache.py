@@ -0,0 +1,71 @@
+"""Tests for the two-tier embedding cache."""
+
+import itertools
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from backend.services.embedding_cache import CachedEmbeddings, normalize_text
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as [its length, texts sent so far], recording every text sent."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(text)), float(len(self.calls))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite3")
+
+
+def test_normalize_text():
+    assert normalize_text("  Finance\tCourses\n") == "finance courses"
+
+
+def test_memory_hits_and_key_normalization(path):
+    client = CountingEmbeddings()
+    cache = CachedEmbeddings(client, "model-a", path=path)
+
+    first = cache.embed_query("Finance courses")
+    assert cache.embed_documents(["finance   COURSES ", "finance courses"]) == [first, first]
+    # Only the first spelling reached the client, as given
+    assert client.calls == ["Finance courses"]
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+
+def test_disk_hits_are_shared_and_keyed_by_model(path):
+    CachedEmbeddings(CountingEmbeddings(), "model-a", path=path).embed_documents(["finance", "math"])
+
+    client = CountingEmbeddings()
+    cache = CachedEmbeddings(client, "model-a", path=path)
+    assert cache.embed_documents(["math", "finance"]) == [[4.0, 2.0], [7.0, 2.0]]
+    assert (client.calls, cache.disk_hits) == ([], 2)
+    # Now in memory too
+    cache.embed_query("math")
+    assert cache.memory_hits == 1
+
+    other_model = CountingEmbeddings()
+    CachedEmbeddings(other_model, "model-b", path=path).embed_query("math")
+    assert other_model.calls == ["math"]
+
+
+def test_disk_tier_evicts_the_oldest_rows(path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr("backend.services.embedding_cache.time.time", lambda: next(clock))
+    client = CountingEmbeddings()
+    cache = CachedEmbeddings(client, "model-a", path=path, memory_size=0, max_rows=2)
+    for text in ("first", "second", "third"):
+        cache.embed_query(text)
+    assert cache._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+
+    cache.embed_documents(["second", "third", "first"])
+    assert client.calls == ["first", "second", "third", "first"]
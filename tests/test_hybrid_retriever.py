@@ -0,0 +1,93 @@
+"""Tests for the BM25 index and hybrid retrieval."""
+
+from langchain_core.documents import Document
+
+from backend.services.hybrid_retriever import (
+    BM25Index,
+    HybridRetriever,
+    maximal_marginal_relevance,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+RECORDS = [
+    {"class_code": "CS 210", "course_name": "Computer Science I", "description": "Programming with Python.",
+     "prerequisites": ""},
+    {"class_code": "CS 212", "course_name": "Computer Science III", "description": "Data structures.",
+     "prerequisites": "CS 211"},
+    {"class_code": "CS 313", "course_name": "Intermediate Data Structures", "description": "Trees and graphs.",
+     "prerequisites": "CS 212"},
+    {"class_code": "FIN 316", "course_name": "Financial Management", "description": "Corporate finance.",
+     "prerequisites": "BA 101Z"},
+]
+
+
+def codes(docs):
+    return [doc.metadata["class_code"] for doc in docs]
+
+
+def test_tokenize_drops_stopwords_and_joins_course_codes():
+    assert tokenize("What should I take after CS 212?") == ["after", "cs", "212", "cs212"]
+
+
+def test_bm25_ranks_matching_documents():
+    index = BM25Index(["data management", "financial management", "data structures"])
+    results = index.search("data structures", 5)
+    assert [doc_id for doc_id, _ in results] == [2, 0]
+    assert results[0][1] > results[1][1]
+    assert index.search("biology", 5) == []
+    assert index.search("data", 0) == []
+    assert BM25Index([]).search("data", 5) == []
+
+
+def test_exact_code_matches_come_first():
+    retriever = HybridRetriever(RECORDS)
+    results = retriever.search("what comes after CS 212?", 3)
+    assert codes(results)[0] == "CS 212"
+    # BM25 finds the course whose prerequisites mention CS 212
+    assert "CS 313" in codes(results)
+
+
+def test_vector_results_are_fused_and_deduplicated():
+    retriever = HybridRetriever(RECORDS)
+    vector_docs = [
+        Document(page_content="FIN 316", metadata={"course_code": "FIN 316", "available_seats": "3"}),
+        Document(page_content="CS 313", metadata={"course_code": "CS 313"}),
+    ]
+    results = retriever.search("data structures", 3, vector_docs)
+    assert len({doc.metadata.get("class_code") or doc.metadata["course_code"] for doc in results}) == 3
+    # The vector copy of a course wins over the lexical one since it may carry section details
+    fin = [doc for doc in results if doc.page_content == "FIN 316"]
+    assert fin and fin[0].metadata["available_seats"] == "3"
+
+
+def test_needs_vector_search_only_skipped_over_the_vector_corpus():
+    catalog = HybridRetriever(RECORDS)
+    assert catalog.needs_vector_search("what comes after CS 212?")
+
+    sections = HybridRetriever(RECORDS, covers_vector_corpus=True)
+    assert not sections.needs_vector_search("what comes after CS 212?")
+    assert sections.needs_vector_search("a data structures course")
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+    scores = dict(fused)
+    assert scores["b"] == 1 / 62 + 1 / 61
+    assert scores["a"] == 1 / 61
+
+
+def test_reciprocal_rank_fusion_weights_and_ties():
+    assert [item for item, _ in reciprocal_rank_fusion([["a"], ["b"]])] == ["a", "b"]
+    assert [item for item, _ in reciprocal_rank_fusion([["a"], ["b"]], weights=[1.0, 2.0])] == ["b", "a"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_maximal_marginal_relevance_trades_relevance_for_novelty():
+    relevance = [1.0, 0.95, 0.5]
+    terms = [{"data", "structures"}, {"data", "structures"}, {"finance"}]
+    assert maximal_marginal_relevance(relevance, terms, 2, lambda_mult=1.0) == [0, 1]
+    assert maximal_marginal_relevance(relevance, terms, 2, lambda_mult=0.5) == [0, 2]
+    assert maximal_marginal_relevance(relevance, terms, 5, lambda_mult=0.5) == [0, 2, 1]
+    assert maximal_marginal_relevance([], [], 3) == []
@@ -0,0 +1,81 @@
+"""Tests for the local intent and category classifier."""
+
+import pytest
+
+from backend.services import intent
+from backend.services.intent import (
+    IntentStats,
+    classify_category_locally,
+    classify_intent_locally,
+    get_intent_stats,
+    record_llm_fallback,
+)
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    stats = IntentStats()
+    monkeypatch.setattr(intent, "intent_stats", stats)
+    monkeypatch.setattr(intent, "_linear_model", None)
+    return stats
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What courses should I take next term?", "COURSE"),
+    ("what electives count toward my minor?", "COURSE"),
+    ("do I have the prereqs for that?", "COURSE"),
+    ("hi there!", "GENERAL"),
+    ("thanks so much", "GENERAL"),
+    # Nothing either way, or conversational words in a long message
+    ("what do you think about it all then, honestly, if you had to say", None),
+    ("", None),
+])
+def test_labeled_queries(query, expected):
+    assert classify_intent_locally(query) == expected
+
+
+@pytest.mark.parametrize("query", ["hello, is CS 212 hard?", "thanks! what about math252", "BA 101Z?"])
+def test_course_codes_force_the_course_path(query):
+    assert classify_intent_locally(query) == "COURSE"
+
+
+def test_numbers_after_ordinary_words_are_not_course_codes():
+    assert classify_intent_locally("I have 100 questions") is None
+
+
+def test_scores_below_the_threshold_go_to_the_llm():
+    # "graduate" and "term" are academic words, but weigh less than COURSE_SCORE_THRESHOLD
+    assert classify_intent_locally("when will I graduate?") is None
+    assert classify_intent_locally("tell me about the term") is None
+
+
+def test_linear_model_decides_only_outside_its_confidence_band(monkeypatch):
+    monkeypatch.setattr(intent, "_linear_model", {"bias": 0.0, "weights": {"graduate": 3.0, "maybe": 0.5}})
+    assert classify_intent_locally("when will I graduate?") == "COURSE"
+    assert classify_intent_locally("when will I maybe finish?") is None
+
+
+def test_stats_count_local_hits_and_fallbacks():
+    classify_intent_locally("What courses should I take next term?")
+    classify_intent_locally("hi there!")
+    if classify_intent_locally("when will I graduate?") is None:
+        record_llm_fallback()
+    assert get_intent_stats() == {
+        "local_course": 1, "local_general": 1, "local_hits": 2,
+        "llm_fallbacks": 1, "total": 3, "hit_ratio": 2 / 3,
+    }
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("what electives should I take next term?", "COURSE_RECOMMENDATION"),
+    ("can i take CS 313 without the prereq?", "PREREQUISITE_CHECK"),
+    ("what time does MATH 251 meet", "SCHEDULE_PLANNING"),
+    ("am I on track to graduate?", "DEGREE_PROGRESS"),
+    ("who teaches CS 212?", "COURSE_DETAILS"),
+    ("what is the major requirement", "MAJOR_REQUIREMENTS"),
+    # No phrase at all, or a tie between categories
+    ("CS 212", None),
+    ("who teaches the intro course for my major?", None),
+])
+def test_categories(query, expected):
+    assert classify_category_locally(query) == expected
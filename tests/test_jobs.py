@@ -0,0 +1,151 @@
+"""Tests for the SQLite job store and the job queue running on it."""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.services.jobs import (
+    JOB_STATUS_DONE,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    Job,
+    JobQueue,
+    QueueFullError,
+    SQLiteJobStore,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def make_job(job_id, user_id=1, created_at=None):
+    return Job(id=job_id, user_id=user_id, kind="test", payload={"query": job_id},
+               created_at=created_at if created_at is not None else time.time())
+
+
+def test_jobs_are_claimed_oldest_first(store):
+    store.add(make_job("second", created_at=2.0), 0, 0)
+    store.add(make_job("first", created_at=1.0), 0, 0)
+
+    job = store.claim_next("worker")
+    assert (job.id, job.status, job.attempts, job.payload) == ("first", JOB_STATUS_RUNNING, 1, {"query": "first"})
+    assert store.claim_next("worker").id == "second"
+    assert store.claim_next("worker") is None
+
+
+def test_per_user_limit_counts_queued_and_running_jobs(store):
+    store.add(make_job("a"), 2, 0)
+    store.claim_next("worker")
+    store.add(make_job("b"), 2, 0)
+    with pytest.raises(QueueFullError):
+        store.add(make_job("c"), 2, 0)
+    # Other users aren't affected, and finished jobs free a slot
+    store.add(make_job("d", user_id=2), 2, 0)
+    store.finish("a", JOB_STATUS_DONE, {"courses": []})
+    store.add(make_job("c"), 2, 0)
+    assert store.get("c").status == JOB_STATUS_QUEUED
+
+
+def test_queue_limit_counts_only_queued_jobs(store):
+    store.add(make_job("a", user_id=1), 0, 2)
+    store.add(make_job("b", user_id=2), 0, 2)
+    with pytest.raises(QueueFullError):
+        store.add(make_job("c", user_id=3), 0, 2)
+    store.claim_next("worker")
+    store.add(make_job("c", user_id=3), 0, 2)
+    assert store.counts() == {JOB_STATUS_QUEUED: 2, JOB_STATUS_RUNNING: 1}
+
+
+def test_results_expire(store):
+    store.add(make_job("a"), 0, 0)
+    store.claim_next("worker")
+    store.finish("a", JOB_STATUS_DONE, {"courses": ["CS 212"]}, ttl=60)
+    assert store.get("a").result == {"courses": ["CS 212"]}
+
+    store.finish("a", JOB_STATUS_DONE, {"courses": ["CS 212"]}, ttl=-1)
+    assert store.get("a") is None
+    assert store.evict_expired() == 1
+    assert store.counts() == {}
+
+
+def test_stale_jobs_are_requeued_then_failed(store):
+    store.add(make_job("a"), 0, 0)
+    store.claim_next("worker")
+    # Running jobs started within the timeout are left alone
+    assert store.requeue_stale(timeout=60, max_attempts=2) == 0
+
+    assert store.requeue_stale(timeout=-1, max_attempts=2) == 1
+    job = store.get("a")
+    assert (job.status, job.started_at, job.attempts) == (JOB_STATUS_QUEUED, None, 1)
+
+    assert store.claim_next("worker").attempts == 2
+    assert store.requeue_stale(timeout=-1, max_attempts=2) == 1
+    job = store.get("a")
+    assert (job.status, job.error) == (JOB_STATUS_FAILED, "Job timed out")
+
+
+def test_only_the_owning_worker_records_the_outcome(store):
+    store.add(make_job("a"), 0, 0)
+    assert store.claim_next("first").worker == "first"
+    store.requeue_stale(timeout=-1, max_attempts=2)
+    store.claim_next("second")
+
+    # The first worker lost the job when it was requeued
+    assert not store.finish("a", JOB_STATUS_FAILED, error="late", worker="first")
+    assert store.get("a").status == JOB_STATUS_RUNNING
+    assert store.finish("a", JOB_STATUS_DONE, {"courses": []}, worker="second")
+    assert store.get("a").status == JOB_STATUS_DONE
+    assert not store.finish("a", JOB_STATUS_FAILED, error="twice", worker="second")
+
+
+def test_queue_runs_jobs_and_records_failures(store):
+    async def handler(job):
+        if job.payload["query"] == "bad":
+            raise ValueError("no courses")
+        return {"answer": job.payload["query"].upper()}
+
+    async def scenario():
+        queue = JobQueue(store, handler, "test", concurrency=2, poll_interval=0.01)
+        queue.start()
+        try:
+            good = await queue.submit(1, {"query": "next term"})
+            bad = await queue.submit(2, {"query": "bad"})
+            for _ in range(500):
+                jobs = [await queue.get(good), await queue.get(bad)]
+                if all(job.finished for job in jobs):
+                    return jobs, await queue.stats()
+                await asyncio.sleep(0.01)
+            raise AssertionError("jobs did not finish")
+        finally:
+            await queue.stop()
+
+    (good, bad), stats = asyncio.run(scenario())
+    assert (good.status, good.result) == (JOB_STATUS_DONE, {"answer": "NEXT TERM"})
+    assert (bad.status, bad.error) == (JOB_STATUS_FAILED, "no courses")
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+
+
+def test_handlers_past_the_timeout_are_failed(store):
+    async def handler(job):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        queue = JobQueue(store, handler, "test", concurrency=1, poll_interval=0.01, timeout=0.05)
+        queue.start()
+        try:
+            job_id = await queue.submit(1, {"query": "slow"})
+            for _ in range(500):
+                job = await queue.get(job_id)
+                if job.finished:
+                    return job, queue.failed
+                await asyncio.sleep(0.01)
+            raise AssertionError("job did not time out")
+        finally:
+            await queue.stop()
+
+    job, failed = asyncio.run(scenario())
+    assert (job.status, job.error, failed) == (JOB_STATUS_FAILED, "Job timed out", 1)
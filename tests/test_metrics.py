@@ -0,0 +1,30 @@
+"""Tests for the Prometheus metrics registry."""
+
+from backend.services import metrics
+from backend.services.metrics import Counter, Gauge, Histogram, render_prometheus
+
+
+def test_label_values_are_escaped(monkeypatch):
+    counter = Counter("test_requests_total", "Requests")
+    counter.inc(query='say "hi"\\n\nnow')
+    monkeypatch.setattr(metrics, "REGISTRY", [counter])
+
+    assert render_prometheus() == (
+        "# HELP test_requests_total Requests\n"
+        "# TYPE test_requests_total counter\n"
+        'test_requests_total{query="say \\"hi\\"\\\\n\\nnow"} 1\n'
+    )
+
+
+def test_gauges_and_histograms_render(monkeypatch):
+    histogram = Histogram("test_latency_seconds", "Latency", [0.1, 1])
+    histogram.observe(0.5, stage="plan")
+    gauge = Gauge("test_in_flight", "In flight", lambda: [({"lane": 'open"ai'}, 2)])
+    monkeypatch.setattr(metrics, "REGISTRY", [histogram, gauge])
+
+    lines = render_prometheus().splitlines()
+    assert 'test_latency_seconds_bucket{stage="plan",le="0.1"} 0' in lines
+    assert 'test_latency_seconds_bucket{stage="plan",le="1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="plan",le="+Inf"} 1' in lines
+    assert 'test_latency_seconds_sum{stage="plan"} 0.5' in lines
+    assert 'test_in_flight{lane="open\\"ai"} 2' in lines
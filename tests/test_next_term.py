@@ -0,0 +1,94 @@
+"""Tests for ranking next-term recommendations from the degree audit."""
+
+from backend.services.next_term import recommend_next_term
+from backend.services.prerequisites import build_prerequisite_graph
+from backend.services.user_context import UserAcademicContext
+
+RECORDS = [
+    {"class_code": "CS 210", "course_name": "Computer Science I", "prerequisites": ""},
+    {"class_code": "CS 211", "course_name": "Computer Science II", "prerequisites": "CS 210",
+     "available_seats": "5"},
+    {"class_code": "CS 212", "course_name": "Computer Science III", "prerequisites": "CS 211",
+     "available_seats": "5"},
+    {"class_code": "CS 313", "course_name": "Data Structures", "prerequisites": "CS 211",
+     "available_seats": "5"},
+    {"class_code": "CS 322", "course_name": "Software Engineering", "prerequisites": "",
+     "available_seats": "0"},
+    {"class_code": "CS 322", "course_name": "Software Engineering", "prerequisites": "",
+     "available_seats": "2"},
+    {"class_code": "CS 330", "course_name": "C/C++", "prerequisites": "", "available_seats": "0"},
+    {"class_code": "CS 333", "course_name": "Applied Cryptography", "prerequisites": "",
+     "available_seats": "4"},
+    {"class_code": "CS 415", "course_name": "Operating Systems", "prerequisites": "CS 212 and CS 313"},
+]
+GRAPH = build_prerequisite_graph(RECORDS)
+
+
+def requirement(name, options, still_needed=1):
+    return {"name": name, "options": options, "still_needed": still_needed}
+
+
+def make_context(completed, remaining, partial=()):
+    audit = {"programs": [{
+        "program_name": "Computer Science", "program_type": "major",
+        "remaining": list(remaining), "partial": list(partial),
+    }]}
+    return UserAcademicContext(
+        user_id=1, completed_courses=completed, majors=[], programs={},
+        rag_text="", major_info="", fingerprint="", audit=audit,
+    )
+
+
+def codes(courses):
+    return [course["course_code"] for course in courses]
+
+
+def test_only_eligible_untaken_courses_with_records_are_recommended():
+    context = make_context(["CS 210"], [
+        requirement("Computer Science I", ["CS 210"]),
+        requirement("Computer Science II", ["CS 211"]),
+        requirement("Computer Science III", ["CS 212"]),
+        requirement("Operating Systems", ["CS 415"]),
+        requirement("Capstone", ["CS 499"]),
+    ])
+    # CS 210 is done, CS 212 and CS 415 are blocked, CS 499 has no record
+    assert codes(recommend_next_term(context, RECORDS, GRAPH)) == ["CS 211"]
+
+
+def test_required_courses_that_unlock_others_rank_first():
+    context = make_context(["CS 210"], [
+        requirement("Computer Science II", ["CS 211"]),
+        requirement("Computer Science III", ["CS 212"]),
+        requirement("Data Structures", ["CS 313"]),
+        requirement("Upper-division elective", ["CS 322", "CS 330", "CS 333"], still_needed=2),
+    ])
+    courses = recommend_next_term(context, RECORDS, GRAPH)
+    # CS 211 is required and unblocks two more requirements; among the electives,
+    # a full section ranks last and ties go to the lower course level
+    assert codes(courses) == ["CS 211", "CS 322", "CS 333", "CS 330"]
+    assert courses[0]["recommendation"] == {
+        "is_recommended": True,
+        "reason": "Required for your Computer Science major.",
+        "priority": "High",
+    }
+    assert courses[1]["recommendation"]["priority"] == "Medium"
+    # The section with open seats is the one shown
+    assert courses[1]["availability"]["available_seats"] == "2"
+
+
+def test_partially_finished_groups_win_ties_and_limit_applies():
+    context = make_context(["CS 210"], [
+        requirement("Systems elective", ["CS 322"]),
+    ], partial=[
+        requirement("Upper-division elective", ["CS 333", "CS 330"]),
+    ])
+    courses = recommend_next_term(context, RECORDS, GRAPH, limit=2)
+    assert codes(courses) == ["CS 322", "CS 333"]
+    assert courses[1]["recommendation"]["priority"] == "High"
+    assert courses[1]["recommendation"]["reason"] == (
+        "Counts toward Upper-division elective (1 more needed) in your Computer Science major."
+    )
+
+
+def test_no_unmet_requirements_means_no_recommendations():
+    assert recommend_next_term(make_context(["CS 210"], []), RECORDS, GRAPH) == []
@@ -0,0 +1,141 @@
+"""Tests for debounced background precomputation of default recommendations."""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.core.database import DATABASE_URL, Base, Course, SessionLocal, User, engine
+from backend.models.schemas import UserProgramCreate
+from backend.services import profile_events
+from backend.services.courses import remove_course_from_user
+from backend.services.precompute import PrecomputedRecommendations, RecommendationPrecomputer
+from backend.services.profile_events import subscribe_profile_changes
+from backend.services.programs import create_user_program, delete_user_program, update_user_program
+from backend.services.user_context import build_user_context
+
+
+class InlineExecutor:
+    """Runs precompute tasks on the debounce timer's thread."""
+
+    def submit(self, lane, fn, *args):
+        fn(*args)
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for precomputation")
+        time.sleep(0.01)
+
+
+def make_precomputer(compute_fn, store, session_factory=FakeSession, debounce_seconds=0.05):
+    return RecommendationPrecomputer(compute_fn, store, session_factory,
+                                     debounce_seconds=debounce_seconds, executor=InlineExecutor())
+
+
+def test_rapid_changes_trigger_one_recompute():
+    store = PrecomputedRecommendations()
+    calls = []
+
+    def compute(db, user_id):
+        calls.append(store.current_version(user_id))
+        return "state", {"courses": ["CS 212"]}
+
+    precomputer = make_precomputer(compute, store)
+    for _ in range(5):
+        precomputer.schedule(1)
+    wait_for(lambda: precomputer.completed == 1)
+    time.sleep(0.1)
+
+    assert calls == [5]
+    assert precomputer.pending() == 0
+    assert store.get(1, "state") == {"courses": ["CS 212"]}
+
+
+def test_stale_versions_never_overwrite_newer_results():
+    store = PrecomputedRecommendations()
+    first, second = store.bump(1), store.bump(1)
+    assert store.put(1, second, "new state", "new")
+    assert not store.put(1, first, "old state", "old")
+    assert store.get(1, "new state") == "new"
+    assert store.get(1, "old state") is None
+
+
+def test_changes_during_a_recompute_discard_its_result():
+    store = PrecomputedRecommendations()
+
+    def compute(db, user_id):
+        # The profile changes again while this result is being computed
+        store.bump(user_id)
+        return "old state", "old"
+
+    precomputer = make_precomputer(compute, store)
+    precomputer.schedule(1)
+    wait_for(lambda: precomputer.skipped == 1)
+    assert (precomputer.completed, store.get(1, "old state")) == (0, None)
+
+
+@pytest.fixture
+def student(monkeypatch):
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(profile_events, "_listeners", [])
+    db = SessionLocal()
+    user = User(email="precompute@example.com", username="precompute", hashed_password="x")
+    user.courses = [Course(course_code="PRE 210", course_name="Intro")]
+    db.add(user)
+    db.commit()
+    yield db, user
+    db.delete(user)
+    db.query(Course).filter(Course.course_code == "PRE 210").delete()
+    db.commit()
+    db.close()
+
+
+def test_profile_hooks_invalidate_the_stored_recommendation(student):
+    db, user = student
+    # The precomputer opens sessions on its own threads
+    worker_sessions = sessionmaker(bind=create_engine(DATABASE_URL, connect_args={"check_same_thread": False}))
+    store = PrecomputedRecommendations()
+
+    def compute(session, user_id):
+        context = build_user_context(session, user_id)
+        return context.fingerprint, {"programs": sorted(context.programs), "courses": context.completed_courses}
+
+    precomputer = make_precomputer(compute, store, worker_sessions, debounce_seconds=0.01)
+    subscribe_profile_changes(precomputer.schedule)
+
+    def recompute_after(change):
+        previous = build_user_context(db, user.id).fingerprint
+        completed = precomputer.completed
+        change()
+        wait_for(lambda: precomputer.completed > completed)
+        db.expire_all()
+        current = build_user_context(db, user.id).fingerprint
+        # The result for the previous state is no longer served
+        assert current != previous and store.get(user.id, previous) is None
+        return store.get(user.id, current)
+
+    program = UserProgramCreate(program_type="major", program_name="Computer Science", required_courses=["PRE 210"])
+    assert recompute_after(lambda: create_user_program(db, user.id, program)) == {
+        "programs": ["Computer Science"], "courses": ["PRE 210"],
+    }
+    assert recompute_after(lambda: update_user_program(
+        db, user.id, "Computer Science", {"required_courses": ["PRE 210", "PRE 211"]}
+    )) == {"programs": ["Computer Science"], "courses": ["PRE 210"]}
+    assert recompute_after(lambda: delete_user_program(db, user.id, "Computer Science")) == {
+        "programs": [], "courses": ["PRE 210"],
+    }
+    course_id = db.query(Course).filter(Course.course_code == "PRE 210").one().id
+    assert recompute_after(lambda: remove_course_from_user(db, user.id, course_id)) == {
+        "programs": [], "courses": [],
+    }
+    precomputer.shutdown()
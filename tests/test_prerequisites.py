@@ -0,0 +1,101 @@
+"""Tests for the prerequisite parser and graph, using prerequisite strings from the catalog."""
+
+from backend.services.prerequisites import (
+    build_prerequisite_graph,
+    filter_eligible_courses,
+    parse_requisites,
+)
+
+
+def satisfied(text, completed, standing=None):
+    return parse_requisites(text).satisfied(set(completed), standing)
+
+
+def test_one_from_is_any_of():
+    text = "one from BA 317, MKTG 311, MKTG 311H."
+    assert parse_requisites(text).codes() == {"BA 317", "MKTG 311", "MKTG 311H"}
+    assert satisfied(text, ["MKTG 311H"])
+    assert not satisfied(text, ["BA 101Z"])
+
+
+def test_one_from_after_semicolon_is_anded_with_the_rest():
+    text = "EC 311; one from EC 320, EC 423."
+    assert satisfied(text, ["EC 311", "EC 423"])
+    assert not satisfied(text, ["EC 320", "EC 423"])
+    assert not satisfied(text, ["EC 311"])
+
+
+def test_subject_carries_forward_to_bare_numbers():
+    text = "ACTG 213 or 211"
+    assert parse_requisites(text).codes() == {"ACTG 213", "ACTG 211"}
+    assert satisfied(text, ["ACTG 211"])
+    assert parse_requisites("MKTG 311 or 311H").codes() == {"MKTG 311", "MKTG 311H"}
+
+
+def test_commas_and_semicolons_are_anded_and_or_binds_tighter():
+    text = "BA 101Z; WR 122Z or WR 123. Sophomore standing required"
+    assert satisfied(text, ["BA 101Z", "WR 123"])
+    assert not satisfied(text, ["WR 122Z", "WR 123"])
+    assert not satisfied("BA 101Z, BA 240, EC 201, MATH 241, STAT 243Z", ["BA 101Z", "BA 240", "EC 201", "MATH 241"])
+
+
+def test_standing_blocks_only_when_known():
+    text = "BA 101Z; WR 122Z or WR 123. Sophomore standing required"
+    completed = ["BA 101Z", "WR 122Z"]
+    assert satisfied(text, completed)
+    assert satisfied(text, completed, standing=2)
+    assert not satisfied(text, completed, standing=1)
+    assert not satisfied("junior standing.", [], standing=2)
+
+
+def test_repeatable_text_is_ignored():
+    text = "FIN 316 or FIN 316H.Repeatable 99 times when topic changes"
+    assert parse_requisites(text).codes() == {"FIN 316", "FIN 316H"}
+    assert satisfied("BA 101Z, BA 213Z; one from MATH 241, MATH 246.Repeatable 99 times", ["BA 101Z", "BA 213Z", "MATH 246"])
+
+
+def test_grade_clauses_are_stripped():
+    assert parse_requisites("CS 111 with a grade of B- or higher.").codes() == {"CS 111"}
+    text = "J 211, J 212, J 213, J 342 with a grade better than C-.Repeatable 3 times for a maximum of 16 credits"
+    assert parse_requisites(text).codes() == {"J 211", "J 212", "J 213", "J 342"}
+    assert satisfied(text, ["J 211", "J 212", "J 213", "J 342"])
+
+
+def test_bare_grade_clause_is_not_an_alternative():
+    text = "CS 210 and CS 211 with a C- or better"
+    assert not satisfied(text, ["CS 210"])
+    assert satisfied(text, ["CS 210", "CS 211"])
+    assert not satisfied("MATH 111 (C- or better); WR 121Z", ["WR 121Z"])
+    assert not satisfied("ACTG 213 or 211 with a minimum grade of C-", [])
+
+
+def test_corequisites_and_unverifiable_text_do_not_block():
+    text = "ARCH 201 or IARC 204; coreq: ARCH 283."
+    assert parse_requisites(text).codes() == {"ARCH 201", "IARC 204"}
+    assert satisfied(text, ["IARC 204"])
+    assert satisfied("instructor's approval.Repeatable 2 times for a maximum of 12 credits", [])
+    assert satisfied("OBA 311 or equivalent. Sophomore standing required", [])
+
+
+def test_graph_expands_equivalents():
+    graph = build_prerequisite_graph([
+        {"class_code": "BA 101Z", "prerequisites": "", "equivalent_to": "BA 101"},
+        {"class_code": "BA 240", "prerequisites": "BA 101"},
+    ])
+    completed = graph.expand_completed(["ba 101z"])
+    assert completed == {"BA 101Z", "BA 101"}
+    assert graph.is_eligible("BA 240", completed)
+    assert not graph.is_eligible("BA 240", graph.expand_completed([]))
+
+
+def test_filter_eligible_courses_drops_taken_and_blocked():
+    graph = build_prerequisite_graph([
+        {"class_code": "CS 211", "prerequisites": "CS 210"},
+        {"class_code": "CS 212", "prerequisites": "CS 211 with a C- or better"},
+    ])
+    courses = [{"course_code": code} for code in ("CS 210", "CS 211", "CS 212", "CS 313")]
+    eligible, blocked = filter_eligible_courses(
+        courses + [{"course_code": "CS 314", "prerequisites": "CS 313"}], ["CS 210"], graph
+    )
+    assert [course["course_code"] for course in eligible] == ["CS 211", "CS 313"]
+    assert [course["course_code"] for course in blocked] == ["CS 210", "CS 212", "CS 314"]
@@ -0,0 +1,76 @@
+"""Tests for fitting the reasoning prompts to their token budgets."""
+
+import sys
+import types
+
+import pytest
+
+from backend.services import prompt_budget
+from backend.services.prompt_budget import (
+    MIN_PROMPT_CANDIDATES,
+    _courses_text,
+    count_tokens,
+    fit_recommendation_prompt,
+    get_encoding,
+    truncate_to_tokens,
+)
+
+STUDENT = "Major: Computer Science\nCompleted courses: CS 210, CS 211"
+COURSES = [
+    {"course_code": f"CS {300 + i}", "course_name": f"Topic {i}", "prerequisites": "CS 211",
+     "description": " ".join(["Covers algorithms, systems and their analysis in depth."] * 8)}
+    for i in range(8)
+]
+
+
+def render(data, courses):
+    return f"Student:\n{data}\n\nCandidates:\n{courses}\n\nPick the best courses."
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Character estimates keep the counts the same with or without tiktoken
+    monkeypatch.setattr(prompt_budget, "_encoding", None)
+    monkeypatch.setattr(prompt_budget, "_encoding_loaded", True)
+
+
+def test_fallback_when_tiktoken_cannot_load(monkeypatch):
+    def unavailable(name):
+        raise OSError("no network")
+
+    monkeypatch.setattr(prompt_budget, "_encoding_loaded", False)
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=unavailable))
+    assert get_encoding() is None
+    assert count_tokens("abcdefghi") == 3
+    assert count_tokens("") == 0
+    assert truncate_to_tokens("alpha beta gamma delta", 3) == "alpha beta..."
+    assert truncate_to_tokens("alpha beta", 3) == "alpha beta"
+
+
+def test_halving_descriptions_fits_the_budget(monkeypatch):
+    # Fits once descriptions are halved from 30 to 15 tokens, not at 30
+    budget = count_tokens(render(STUDENT, _courses_text(COURSES, 15)))
+    assert count_tokens(render(STUDENT, _courses_text(COURSES, 30))) > budget
+    monkeypatch.setitem(prompt_budget.PROMPT_TOKEN_BUDGETS, "rerank", budget)
+
+    fitted = fit_recommendation_prompt(render, STUDENT, COURSES)
+    assert fitted.tokens <= budget
+    assert fitted.text == render(STUDENT, _courses_text(COURSES, 15))
+    assert fitted.tokens_saved == count_tokens(render(STUDENT, _courses_text(COURSES, None))) - fitted.tokens
+
+
+def test_dropping_candidates_stops_at_the_minimum(monkeypatch):
+    monkeypatch.setitem(prompt_budget.PROMPT_TOKEN_BUDGETS, "rerank", 50)
+
+    fitted = fit_recommendation_prompt(render, STUDENT, COURSES)
+    assert fitted.text.count("Prerequisites:") == MIN_PROMPT_CANDIDATES
+    assert f"{MIN_PROMPT_CANDIDATES}. CS {299 + MIN_PROMPT_CANDIDATES}" in fitted.text
+    assert "Covers algorithms" not in fitted.text
+    # With the candidates at their floor, the student data is cut last
+    assert "Completed courses: CS 210, CS 211" not in fitted.text
+
+
+def test_prompts_within_budget_are_untouched(monkeypatch):
+    monkeypatch.setitem(prompt_budget.PROMPT_TOKEN_BUDGETS, "rerank", 100000)
+    fitted = fit_recommendation_prompt(render, STUDENT, COURSES[:2])
+    assert fitted.text == render(STUDENT, _courses_text(COURSES[:2], prompt_budget.DESCRIPTION_TOKENS))
@@ -0,0 +1,115 @@
+"""Tests for the course response cache."""
+
+import pytest
+
+from backend.services.response_cache import ResponseCache, compute_state_fingerprint, normalize_query
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("backend.services.response_cache.time.monotonic", clock)
+    return clock
+
+
+def embed(query):
+    # Queries about the same subject land on the same axis
+    if "finance" in query:
+        return [1.0, 0.0]
+    if "fin" in query:
+        return [0.99, 0.1]
+    return [0.0, 1.0]
+
+
+def test_normalize_query():
+    assert normalize_query("  What should I take NEXT?? ") == "what should i take next"
+
+
+def test_state_fingerprint_ignores_load_order():
+    programs = [("Finance", "major", ["FIN 316"]), ("Math", "minor", ["MATH 251"])]
+    first = compute_state_fingerprint(["CS 210", "BA 101Z"], ["Finance"], programs)
+    assert first == compute_state_fingerprint(["BA 101Z", "CS 210"], ["Finance"], programs[::-1])
+    assert first != compute_state_fingerprint(["CS 210"], ["Finance"], programs)
+
+
+def test_exact_hit_returns_a_copy(clock):
+    cache = ResponseCache(semantic=False)
+    cache.put(1, "state", "What next?", {"courses": ["CS 212"]})
+    value, _ = cache.get("state", "what next")
+    assert value == {"courses": ["CS 212"]}
+    value["courses"].append("CS 313")
+    assert cache.get("state", "What next?")[0] == {"courses": ["CS 212"]}
+    assert cache.get("other state", "What next?")[0] is None
+    assert cache.stats()["exact_hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=60, semantic=False)
+    cache.put(1, "state", "what next", "response")
+    clock.now += 59
+    assert cache.get("state", "what next")[0] == "response"
+    clock.now += 1
+    assert cache.get("state", "what next")[0] is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_size=2, semantic=False)
+    cache.put(1, "state", "first", 1)
+    cache.put(1, "state", "second", 2)
+    cache.get("state", "first")
+    cache.put(1, "state", "third", 3)
+    assert cache.get("state", "second")[0] is None
+    assert cache.get("state", "first")[0] == 1
+    assert cache.get("state", "third")[0] == 3
+
+
+def test_semantic_hit_within_the_same_state(clock):
+    cache = ResponseCache(similarity_threshold=0.95)
+    cache.put(1, "state", "finance courses", "finance response", embed_fn=embed)
+
+    value, embedding = cache.get("state", "fin courses", embed_fn=embed)
+    assert value == "finance response"
+    assert embedding == embed("fin courses")
+    assert cache.get("state", "art courses", embed_fn=embed)[0] is None
+    # Another academic state never shares an entry, however similar the query
+    assert cache.get("other state", "fin courses", embed_fn=embed)[0] is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_semantic_lookup_survives_embedding_errors(clock):
+    def failing(query):
+        raise RuntimeError("embeddings unavailable")
+
+    cache = ResponseCache()
+    cache.put(1, "state", "finance courses", "finance response", embedding=[1.0, 0.0])
+    assert cache.get("state", "fin courses", embed_fn=failing) == (None, None)
+
+
+def test_invalidate_user(clock):
+    cache = ResponseCache(semantic=False)
+    cache.put(1, "state", "what next", "response")
+    cache.put(2, "state", "electives", "response")
+    assert cache.invalidate_user(1) == 1
+    assert cache.get("state", "what next")[0] is None
+    assert cache.get("state", "electives")[0] == "response"
+    assert cache.invalidate_user(1) == 0
+
+
+def test_shared_entry_is_invalidated_by_any_owner(clock):
+    cache = ResponseCache(semantic=False)
+    cache.put(1, "state", "what next", "first response")
+    cache.put(2, "state", "what next", "second response")
+    # The second put replaced the value but kept the first user's ownership
+    assert cache.invalidate_user(1) == 1
+    assert cache.get("state", "what next")[0] is None
+    assert cache.invalidate_user(2) == 0
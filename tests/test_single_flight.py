@@ -0,0 +1,88 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test", copy_result=list)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ["CS 212"]
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "key", work) for _ in range(3)]
+        while flight.stats()["followers"] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert len(calls) == 1
+    assert results == [["CS 212"]] * 4
+    # Followers get copies, not the leader's object
+    assert all(result is not results[0] for result in results[1:])
+    assert flight.stats() == {"leaders": 1, "followers": 3, "coalesced_rate": 0.75, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("no courses")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_cancelled_leader_hands_the_work_to_a_follower():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def scenario():
+        leader = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    # The follower isn't failed by the leader's cancellation; it runs the work itself
+    assert asyncio.run(scenario()) == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_followers_share_the_leader_result():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "response"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["response"] * 5
+    assert len(calls) == 1
@@ -0,0 +1,57 @@
+"""Tests for validating structured model output."""
+
+import json
+
+import pytest
+
+from backend.services.structured_output import (
+    CourseSelection,
+    SearchQueryPlan,
+    StructuredOutputError,
+    build_repair_prompt,
+    parse_structured,
+)
+
+
+def test_parses_json_wrapped_in_prose_and_fences():
+    text = 'Here are my picks:\n```json\n{"course_codes": ["CS 212", "CS 313"]}\n```\nGood luck!'
+    assert parse_structured(text, CourseSelection).course_codes == ["CS 212", "CS 313"]
+
+
+def test_long_lists_are_not_rejected():
+    codes = [f"CS {number}" for number in range(310, 317)]
+    assert parse_structured(json.dumps({"course_codes": codes}), CourseSelection).course_codes == codes
+    queries = [f"query {i}" for i in range(7)]
+    assert len(parse_structured(json.dumps({"search_queries": queries}), SearchQueryPlan).search_queries) == 7
+
+
+@pytest.mark.parametrize("text, message", [
+    ("1. CS 212\n2. CS 313", "no JSON object"),
+    ("", "no JSON object"),
+    ('{"course_codes": []}', "course_codes"),
+    ('{"courses": ["CS 212"]}', "course_codes"),
+    ('{"course_codes": "CS 212"', "no JSON object"),
+])
+def test_invalid_output_raises(text, message):
+    with pytest.raises(StructuredOutputError, match=message):
+        parse_structured(text, CourseSelection)
+
+
+def test_validator_can_clean_up_or_reject():
+    def known_only(selection):
+        codes = [code for code in selection.course_codes if code.startswith("CS")]
+        if not codes:
+            raise ValueError("course_codes: none of the codes is offered")
+        return CourseSelection(course_codes=codes)
+
+    text = '{"course_codes": ["FIN 316", "CS 212"]}'
+    assert parse_structured(text, CourseSelection, known_only).course_codes == ["CS 212"]
+    with pytest.raises(StructuredOutputError, match="none of the codes"):
+        parse_structured('{"course_codes": ["FIN 316"]}', CourseSelection, known_only)
+
+
+def test_repair_prompt_carries_schema_output_and_error():
+    prompt = build_repair_prompt(CourseSelection, "1. CS 212", "the response contains no JSON object")
+    assert '"course_codes"' in prompt
+    assert "1. CS 212" in prompt
+    assert "Error: the response contains no JSON object" in prompt
@@ -0,0 +1,38 @@
+"""Tests for the memory-mapped local vector store."""
+
+import numpy as np
+import pytest
+
+from backend.services import vector_store
+from backend.services.vector_store import LocalVectorStore, save_local_index
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).tolist()
+    metadatas = [{"class_code": f"CS {100 + i}"} for i in range(300)]
+    queries = rng.normal(size=(3, 16)).tolist()
+    return vectors, metadatas, queries
+
+
+def codes(hits):
+    return [doc.page_content for doc, _ in hits]
+
+
+def test_float16_index_is_scored_from_the_memory_map(tmp_path, corpus, monkeypatch):
+    vectors, metadatas, queries = corpus
+    save_local_index(str(tmp_path / "f32"), vectors, metadatas, "test-model")
+    save_local_index(str(tmp_path / "f16"), vectors, metadatas, "test-model", dtype="float16")
+    exact = LocalVectorStore.load(str(tmp_path / "f32"), None)
+    half = LocalVectorStore.load(str(tmp_path / "f16"), None)
+    assert isinstance(half.vectors, np.memmap) and half.vectors.dtype == np.float16
+
+    # Several chunks, the last one partial
+    monkeypatch.setattr(vector_store, "SCORE_CHUNK_ROWS", 64)
+    batch = half.similarity_search_by_vectors_with_score(queries, k=5)
+    for query, hits in zip(queries, batch):
+        expected = exact.similarity_search_by_vector_with_score(query, k=5)
+        assert codes(half.similarity_search_by_vector_with_score(query, k=5)) == codes(expected)
+        assert codes(hits) == codes(expected)
+        assert [score for _, score in hits] == pytest.approx([score for _, score in expected], abs=1e-2)